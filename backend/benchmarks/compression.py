@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: CPU cost against bytes saved for each available response
+encoding and level, on a product listing with translations and on a cart with
+embedded products.
+
+Run from the backend directory:
+
+    python -m benchmarks.compression [--products 100] [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import timeit
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from benchmarks.serialization import make_products  # noqa: E402
+from compression import CompressionSettings, available_encodings, compress  # noqa: E402
+from serialization import encode_json  # noqa: E402
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 5, 11), "zstd": (1, 3, 10)}
+
+
+def make_cart(products):
+    return {
+        "_id": ObjectId(),
+        "session_id": "sess_benchmark",
+        "items": [
+            {"product_id": str(p["_id"]), "quantity": 1, "size": "M", "color": "Black", "product": p}
+            for p in products[:20]
+        ],
+        "total": 1999.8,
+    }
+
+
+def settings_for(encoding, level):
+    options = {"gzip": "gzip_level", "br": "brotli_quality", "zstd": "zstd_level"}
+    return CompressionSettings(encodings=[encoding], **{options[encoding]: level})
+
+
+def measure(body, encoding, level, repeat):
+    settings = settings_for(encoding, level)
+    compressed = compress(body, encoding, settings)
+    best = min(timeit.repeat(lambda: compress(body, encoding, settings), number=repeat, repeat=3)) / repeat
+    return {
+        "encoding": encoding,
+        "level": level,
+        "bytes": len(compressed),
+        "ratio": round(len(compressed) / len(body), 4),
+        "usec_per_call": round(best * 1e6, 1),
+        # What a cached variant saves: compression CPU per KiB of bandwidth saved
+        "usec_per_kib_saved": round(best * 1e6 / max((len(body) - len(compressed)) / 1024, 1e-9), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    payloads = {"product_listing": encode_json(products), "cart": encode_json(make_cart(products))}
+    results = {}
+    for name, body in payloads.items():
+        results[name] = {
+            "bytes": len(body),
+            "encodings": [
+                measure(body, encoding, level, args.repeat)
+                for encoding in available_encodings()
+                for level in LEVELS[encoding]
+            ],
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
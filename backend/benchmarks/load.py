@@ -0,0 +1,358 @@
+"""
+Offline load test: boots server:app in-process and drives a traffic mix of
+browsing, cart edits and checkouts through the full ASGI stack (middleware
+included) with concurrent virtual users. Prints latency percentiles and
+throughput per endpoint as JSON.
+
+Mongo is the in-memory fake from tests/fakes.py unless --mongo-url points at
+a local mongod, in which case a throwaway database is created and dropped.
+Payments always go through the fake gateway. The request mix, carts and
+catalog are fixed by --seed, so results from two commits can be compared
+with --baseline.
+
+Run from the backend directory:
+
+    python -m benchmarks.load [--users 20] [--duration 10] [--mix browse=6,cart=3,checkout=1]
+                              [--products 200] [--mongo-url mongodb://localhost:27017] [--seed 97]
+                              [--output results.json] [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+SCENARIOS = ("browse", "cart", "checkout")
+DEFAULT_MIX = "browse=6,cart=3,checkout=1"
+LANGUAGES = ("en", "cs", "es", "de")
+SEARCH_TERMS = ("hoodie", "black", "tee", "cargo", "jacket", "premium")
+CATEGORIES = ("Hoodies", "T-Shirts", "Pants", "Jackets")
+DISCOUNT_CODES = (None, None, "WELCOME10", "SAVE20")
+
+SHIPPING_INFO = {
+    "full_name": "Load Test", "email": "load@example.com", "address": "1 Bench St",
+    "city": "Prague", "postal_code": "11000", "country": "CZ",
+}
+
+
+def configure_environment(args):
+    """Settings server.py reads at import time"""
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = f"benchmark_{uuid.uuid4().hex[:8]}"
+    os.environ["PAYMENT_GATEWAY"] = "fake"
+    os.environ["FAKE_GATEWAY_LATENCY_MS"] = str(args.gateway_latency_ms)
+    os.environ["FAKE_GATEWAY_AUTO_PAY_AFTER"] = "1"
+    os.environ["IMAGE_STORE"] = "local"
+    os.environ["IMAGE_STORE_PATH"] = tempfile.mkdtemp(prefix="benchmark-images-")
+    # Per-request logging would dominate the timings
+    logging.disable(logging.INFO)
+
+
+def use_fake_database(server):
+    """Have the lifespan handler bind the in-memory fake instead of opening a client"""
+    sys.path.insert(0, str(ROOT_DIR))
+    from tests.fakes import FakeDatabase
+
+    async def connect_database():
+        server.use_database(FakeDatabase())
+
+    server.connect_database = connect_database
+    server._transactions_supported = False
+
+
+class AsgiClient:
+    """Just enough of an HTTP client to call an ASGI app in-process"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, json_body=None, content=None, headers=None):
+        path, _, query = path.partition("?")
+        headers = {"accept-encoding": "gzip", **(headers or {})}
+        if json_body is not None:
+            content = json.dumps(json_body).encode()
+            headers["content-type"] = "application/json"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query.encode(), "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        messages = [{"type": "http.request", "body": content or b"", "more_body": False}]
+        response = {"status": None, "headers": {}, "chunks": []}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {k.decode().lower(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        body = b"".join(response["chunks"])
+        if response["headers"].get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        return response["status"], response["headers"], body
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def call(self, client, name, method, path, json_body=None):
+        """Time one request under an endpoint name; returns the decoded JSON or None on error"""
+        start = time.perf_counter()
+        status, _, body = await client.request(method, path, json_body)
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if status != 200:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+        return json.loads(body)
+
+
+class VirtualUser:
+    def __init__(self, client, recorder, product_ids, rng):
+        self.client = client
+        self.recorder = recorder
+        self.product_ids = product_ids
+        self.rng = rng
+
+    async def call(self, name, method, path, json_body=None):
+        return await self.recorder.call(self.client, name, method, path, json_body)
+
+    async def browse(self):
+        lang = self.rng.choice(LANGUAGES)
+        await self.call("GET /api/products", "GET", f"/api/products?lang={lang}")
+        await self.call("GET /api/categories", "GET", "/api/categories")
+        category = self.rng.choice(CATEGORIES)
+        await self.call("GET /api/products?category", "GET", f"/api/products?category={category}&lang={lang}")
+        for product_id in self.rng.sample(self.product_ids, min(3, len(self.product_ids))):
+            await self.call("GET /api/products/{product_id}", "GET", f"/api/products/{product_id}?lang={lang}")
+        term = self.rng.choice(SEARCH_TERMS)
+        await self.call("GET /api/products/search", "GET", f"/api/products/search?q={term}&limit=20&lang={lang}")
+
+    async def fill_cart(self, session_id):
+        for _ in range(self.rng.randint(1, 4)):
+            await self.call("POST /api/cart/{session_id}/items", "POST", f"/api/cart/{session_id}/items", {
+                "product_id": self.rng.choice(self.product_ids),
+                "quantity": self.rng.randint(1, 3),
+                "size": self.rng.choice(["S", "M", "L"]),
+                "color": self.rng.choice(["Black", "White"]),
+            })
+
+    async def cart(self):
+        session_id = self.new_session_id()
+        await self.call("GET /api/cart/{session_id}", "GET", f"/api/cart/{session_id}")
+        await self.fill_cart(session_id)
+        cart = await self.call("GET /api/cart/{session_id}", "GET", f"/api/cart/{session_id}")
+        if cart and cart.get("items"):
+            item = self.rng.choice(cart["items"])
+            await self.call("PUT /api/cart/{session_id}/items", "PUT", f"/api/cart/{session_id}/items",
+                            {**item, "quantity": item["quantity"] + 1})
+            await self.call("GET /api/shipping-methods", "GET", "/api/shipping-methods")
+
+    async def checkout(self):
+        session_id = self.new_session_id()
+        await self.fill_cart(session_id)
+        session = await self.call("POST /api/checkout/create-session", "POST", "/api/checkout/create-session", {
+            "session_id": session_id,
+            "shipping_info": SHIPPING_INFO,
+            "origin_url": "http://localhost:3000",
+            "discount_code": self.rng.choice(DISCOUNT_CODES),
+            "shipping_method": self.rng.choice(["standard", "express"]),
+        })
+        if session is None:
+            return
+        # The success page polls until the payment settles
+        for _ in range(3):
+            status = await self.call("GET /api/checkout/status/{stripe_session_id}", "GET",
+                                     f"/api/checkout/status/{session['session_id']}")
+            if status is None or status.get("payment_status") == "paid":
+                break
+
+    def new_session_id(self):
+        return f"session_{self.rng.getrandbits(64):016x}"
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name.strip()!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    rank = -(-len(sorted_values) * pct // 100)
+    return sorted_values[max(int(rank) - 1, 0)]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+        }
+    requests = sum(e["requests"] for e in endpoints.values())
+    totals = {
+        "requests": requests,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "rps": round(requests / elapsed, 2),
+    }
+    return endpoints, totals
+
+
+def compare(result, baseline):
+    """Relative change per endpoint against an earlier run (+0.1 = 10% higher)"""
+    def change(current, previous):
+        return round((current - previous) / previous, 4) if previous else None
+
+    changes = {"totals": {"rps": change(result["totals"]["rps"], baseline["totals"]["rps"])}}
+    for name, current in result["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if previous:
+            changes[name] = {key: change(current[key], previous[key]) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+    return changes
+
+
+def make_products(count, rng):
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        name = f"{rng.choice(['Urban', 'Classic', 'Street', 'Night'])} {category.rstrip('s')} {i}"
+        yield {
+            "name": name,
+            "description": f"{name} in premium cotton with a relaxed fit.",
+            "price": round(rng.uniform(15, 150), 2),
+            "category": category,
+            "sizes": ["S", "M", "L", "XL"],
+            "colors": ["Black", "White"],
+            "translations": {
+                "cs": {"name": f"{name} (CZ)", "description": "Prémiová bavlna, volný střih."},
+                "es": {"name": f"{name} (ES)", "description": "Algodón premium, corte holgado."},
+            },
+        }
+
+
+async def seed_catalog(client, count, rng):
+    """Seed the sample catalog plus generated products; returns every product id"""
+    status, _, body = await client.request("POST", "/api/seed")
+    if status != 200:
+        raise SystemExit(f"Seeding failed with HTTP {status}: {body[:200]!r}")
+    if count:
+        ndjson = "\n".join(json.dumps(p) for p in make_products(count, rng)).encode()
+        status, _, body = await client.request("POST", "/api/products/bulk", content=ndjson,
+                                               headers={"content-type": "application/x-ndjson"})
+        if status != 200:
+            raise SystemExit(f"Bulk import failed with HTTP {status}: {body[:200]!r}")
+
+    product_ids = []
+    cursor = None
+    while True:
+        path = "/api/products?fields=name&limit=500" + (f"&after={cursor}" if cursor else "")
+        _, headers, body = await client.request("GET", path)
+        product_ids += [p["id"] for p in json.loads(body)]
+        cursor = headers.get("x-next-cursor")
+        if not cursor:
+            return product_ids
+
+
+async def run(args):
+    configure_environment(args)
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    import server
+
+    if not args.mongo_url:
+        use_fake_database(server)
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    client = AsgiClient(server.app)
+    recorder = Recorder()
+
+    async with server.app.router.lifespan_context(server.app):
+        try:
+            product_ids = await seed_catalog(client, args.products, rng)
+            users = [VirtualUser(client, recorder, product_ids, random.Random(rng.getrandbits(64)))
+                     for _ in range(args.users)]
+            deadline = time.perf_counter() + args.duration
+
+            async def drive(user):
+                while time.perf_counter() < deadline:
+                    scenario = user.rng.choices(list(weights), list(weights.values()))[0]
+                    await getattr(user, scenario)()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(drive(user) for user in users))
+            elapsed = time.perf_counter() - started
+        finally:
+            if args.mongo_url:
+                await server.client.drop_database(server.DB_NAME)
+
+    endpoints, totals = summarize(recorder, elapsed)
+    result = {
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "mix": weights,
+            "seed": args.seed,
+            "products": len(product_ids),
+            "database": "mongod" if args.mongo_url else "in-memory fake",
+            "gateway_latency_ms": args.gateway_latency_ms,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "totals": totals,
+        "endpoints": endpoints,
+    }
+    if args.baseline:
+        result["vs_baseline"] = compare(result, json.loads(Path(args.baseline).read_text()))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the API")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--products", type=int, default=200, help="products generated on top of the seed catalog")
+    parser.add_argument("--mongo-url", default=None, help="local mongod to use instead of the in-memory fake")
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0, help="fake payment gateway latency")
+    parser.add_argument("--seed", type=int, default=97)
+    parser.add_argument("--output", default=None, help="also write the result to this file")
+    parser.add_argument("--baseline", default=None, help="earlier result to compare against")
+    args = parser.parse_args()
+
+    result = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        Path(args.output).write_text(result + "\n")
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
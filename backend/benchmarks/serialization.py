@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: serialize_doc + jsonable_encoder + JSONResponse against the
+single-pass encode_json, on a 100-product listing with translations.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization [--products 100] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import timeit
+from datetime import datetime
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from serialization import encode_json  # noqa: E402
+from server import serialize_doc  # noqa: E402
+
+
+def make_products(count):
+    products = []
+    for i in range(count):
+        products.append({
+            "_id": ObjectId(),
+            "name": f"Urban Black Hoodie {i}",
+            "description": "Premium cotton hoodie with minimalist design. Perfect for everyday streetwear.",
+            "price": 89.99 + i,
+            "category": ["Hoodies", "T-Shirts", "Pants", "Jackets"][i % 4],
+            "sizes": ["S", "M", "L", "XL", "XXL"],
+            "colors": ["Black", "White", "Gray"],
+            "image": f"/api/products/{i}/image?v=0123456789abcdef",
+            "image_hash": "0123456789abcdef" * 4,
+            "translations": {
+                lang: {"name": f"Městská Černá Mikina {i}", "description": "Prémiová bavlněná mikina s minimalistickým designem."}
+                for lang in ("cs", "es", "de")
+            },
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        })
+    return products
+
+
+def legacy(docs):
+    return JSONResponse(jsonable_encoder(serialize_doc(docs))).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_products(args.products)
+    assert legacy(docs) == encode_json(docs), "outputs differ"
+
+    results = {}
+    for name, fn in (("serialize_doc+jsonable_encoder", legacy), ("encode_json", encode_json)):
+        best = min(timeit.repeat(lambda: fn(docs), number=args.repeat, repeat=5)) / args.repeat
+        results[name] = round(best * 1e6, 1)
+    speedup = round(results["serialize_doc+jsonable_encoder"] / results["encode_json"], 2)
+    print(json.dumps({
+        "products": args.products,
+        "bytes": len(encode_json(docs)),
+        "usec_per_call": results,
+        "speedup": speedup,
+    }))
+
+
+if __name__ == "__main__":
+    main()
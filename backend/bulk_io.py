@@ -0,0 +1,157 @@
+"""
+Streaming NDJSON/CSV helpers for bulk product import and for product and
+order exports.
+
+Imports are parsed line by line straight off the request body, so a catalog
+of any size is never held in memory as a whole. Product CSV files have one
+column per product field; sizes and colors are "|" separated and translations
+is a JSON object, which is also how exports write them. Order CSV exports
+flatten each order to one row for reconciliation.
+"""
+
+import codecs
+import csv
+import io
+import json
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+CSV_FIELDS = ["id", "name", "description", "price", "category", "image", "sizes", "colors", "translations"]
+LIST_SEPARATOR = "|"
+
+ORDER_CSV_FIELDS = [
+    "order_number", "created_at", "status", "customer_email", "item_count", "subtotal",
+    "discount_code", "discount_amount", "shipping_method", "shipping_cost", "total",
+    "stripe_session_id", "cart_session_id",
+]
+# Only what an order CSV row needs
+ORDER_CSV_PROJECTION = {
+    "_id": 0, "items.quantity": 1, "shipping_info.email": 1,
+    **{field: 1 for field in ORDER_CSV_FIELDS if field not in ("customer_email", "item_count")},
+}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def detect_format(content_type, requested=None):
+    if requested:
+        return requested
+    if content_type and "csv" in content_type.lower():
+        return CSV
+    return NDJSON
+
+
+async def iter_lines(chunks):
+    """Decode an async stream of byte chunks into lines (without line endings)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _csv_value(field, value):
+    if field in ("sizes", "colors"):
+        return [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()]
+    if field == "translations":
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            raise RecordError(f"translations is not valid JSON: {e}")
+    return value
+
+
+async def iter_records(lines, fmt):
+    """Yield (line number, record dict or RecordError) for each non-blank record"""
+    header = None
+    record_lines = []
+    start = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if fmt == NDJSON:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, RecordError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield line_no, RecordError("Expected a JSON object")
+                continue
+            yield line_no, record
+            continue
+
+        # CSV: a quoted field may span lines, so gather until quotes balance
+        if not record_lines:
+            start = line_no
+        record_lines.append(line)
+        text = "\n".join(record_lines)
+        if text.count('"') % 2:
+            continue
+        record_lines = []
+        if not text.strip():
+            continue
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        if len(row) != len(header):
+            yield start, RecordError(f"Expected {len(header)} columns, got {len(row)}")
+            continue
+        try:
+            yield start, {
+                field: _csv_value(field, value)
+                for field, value in zip(header, row)
+                if value != "" and field != "id"
+            }
+        except RecordError as e:
+            yield start, e
+    if record_lines:
+        yield start, RecordError("Unterminated quoted field")
+
+
+def csv_header(fields=CSV_FIELDS):
+    return _csv_line(fields)
+
+
+def csv_row(product):
+    values = []
+    for field in CSV_FIELDS:
+        value = product.get("_id") if field == "id" else product.get(field)
+        if value is None:
+            values.append("")
+        elif field in ("sizes", "colors"):
+            values.append(LIST_SEPARATOR.join(value))
+        elif field == "translations":
+            values.append(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        else:
+            values.append(str(value))
+    return _csv_line(values)
+
+
+def order_csv_row(order):
+    values = {
+        **order,
+        "customer_email": (order.get("shipping_info") or {}).get("email"),
+        "item_count": sum(item.get("quantity", 0) for item in order.get("items") or []),
+    }
+    created_at = values.get("created_at")
+    if created_at is not None:
+        values["created_at"] = created_at.isoformat()
+    return _csv_line(["" if values.get(f) is None else values[f] for f in ORDER_CSV_FIELDS])
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode("utf-8")
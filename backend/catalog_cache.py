@@ -0,0 +1,95 @@
+"""
+In-process cache for serialized catalog reads (product lists, single products
+and categories). Entries expire after a TTL and the cache is bounded with LRU
+eviction. Product writes invalidate the affected entries; each worker process
+holds its own cache, so the TTL bounds staleness across workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CatalogCache:
+    def __init__(self, max_entries=1024, ttl_seconds=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Drop entries whose key matches predicate, or everything when omitted"""
+        with self._lock:
+            if predicate is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Cache key helpers. Lists are keyed by category (None for the full catalog)
+# plus any paging/shaping options that change the response; single products
+# by id and language (None for the document with every translation).
+def product_key(product_id, lang=None):
+    return ("product", product_id, lang)
+
+
+def is_product_key(key, product_id):
+    """Any language view of one product"""
+    return key[:2] == ("product", product_id)
+
+
+def product_list_key(category=None, *options):
+    return ("products", category) + options
+
+
+CATEGORIES_KEY = ("categories",)
+
+
+def is_listing_key(key):
+    """Keys derived from more than one product (lists and categories)"""
+    return key[0] != "product"
@@ -0,0 +1,191 @@
+"""
+Response compression for JSON payloads.
+
+CompressionMiddleware compresses complete (non-streamed) JSON and text
+responses above a size threshold with the best encoding the client accepts:
+brotli or zstd when their packages are installed, otherwise gzip. Responses
+that already carry a Content-Encoding pass through untouched.
+
+Responses with an ETag (the cached catalog endpoints) have a content-hash tag,
+so their compressed variants are kept in a small LRU keyed by (ETag,
+encoding) and the same catalog bytes are not recompressed on every request.
+The ETag of a compressed response is marked weak; If-None-Match comparison is
+weak anyway, so revalidation keeps working.
+
+Settings: COMPRESSION_ENCODINGS (preference order, default "br,zstd,gzip"),
+COMPRESSION_MIN_SIZE (bytes, default 1024), COMPRESSION_GZIP_LEVEL (6),
+COMPRESSION_BROTLI_QUALITY (5), COMPRESSION_ZSTD_LEVEL (3),
+COMPRESSION_CACHE_SIZE (variants kept, default 256; 0 disables).
+"""
+
+import gzip
+import os
+
+from catalog_cache import CatalogCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+
+
+class CompressionSettings:
+    def __init__(self, encodings=None, min_size=None, gzip_level=None, brotli_quality=None,
+                 zstd_level=None, cache_size=None):
+        env = os.environ
+        if encodings is None:
+            encodings = env.get('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(',')
+        self.encodings = [e.strip() for e in encodings if e.strip() in available_encodings()]
+        self.min_size = int(min_size if min_size is not None else env.get('COMPRESSION_MIN_SIZE', '1024'))
+        self.gzip_level = int(gzip_level if gzip_level is not None else env.get('COMPRESSION_GZIP_LEVEL', '6'))
+        self.brotli_quality = int(
+            brotli_quality if brotli_quality is not None else env.get('COMPRESSION_BROTLI_QUALITY', '5')
+        )
+        self.zstd_level = int(zstd_level if zstd_level is not None else env.get('COMPRESSION_ZSTD_LEVEL', '3'))
+        self.cache_size = int(cache_size if cache_size is not None else env.get('COMPRESSION_CACHE_SIZE', '256'))
+
+
+def available_encodings():
+    encodings = ["gzip"]
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+def compress(body, encoding, settings):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.gzip_level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.brotli_quality)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.zstd_level).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _accepted(accept_encoding):
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate(accept_encoding, encodings):
+    """Pick the first of `encodings` the client accepts, or None for identity"""
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def variant_cache(settings):
+    """LRU for compressed variants of ETagged responses"""
+    return CatalogCache(max_entries=max(settings.cache_size, 1), ttl_seconds=3600)
+
+
+def _is_compressible(content_type):
+    return content_type.split(";")[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, settings=None, variants=None):
+        self.app = app
+        self.settings = settings or CompressionSettings()
+        if variants is None:
+            variants = variant_cache(self.settings)
+        self.variants = variants
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.settings.encodings:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"), self.settings.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            if message["type"] != "http.response.body" or message.get("more_body", False):
+                # Streaming responses go out as they are
+                await send(pending)
+                await send(message)
+                return
+            await self._send(pending, message["body"], encoding, send)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send(self, start, body, encoding, send):
+        headers = [(k, v) for k, v in start["headers"]]
+        names = {k.lower(): v for k, v in headers}
+        content_type = names.get(b"content-type", b"").decode("latin-1")
+        if (b"content-encoding" in names or len(body) < self.settings.min_size
+                or not _is_compressible(content_type)):
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = names.get(b"etag", b"").decode("latin-1")
+        compressed = self._variant(etag, encoding, body)
+
+        rewritten = []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            if lower == b"vary":
+                continue
+            rewritten.append((name, value))
+        vary = names.get(b"vary")
+        rewritten += [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(compressed)).encode()),
+            (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+        ]
+        await send({**start, "headers": rewritten})
+        await send({"type": "http.response.body", "body": compressed})
+
+    def _variant(self, etag, encoding, body):
+        if not etag or not self.settings.cache_size:
+            return compress(body, encoding, self.settings)
+        key = (etag.removeprefix("W/"), encoding)
+        compressed = self.variants.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, self.settings)
+            self.variants.set(key, compressed)
+        return compressed
@@ -0,0 +1,162 @@
+"""
+Motor client construction, connection pre-warming and pool statistics.
+
+The client is opened by the app's lifespan handler from MongoSettings, so the
+pool can be sized for the number of workers: MONGO_MAX_POOL_SIZE (default
+100) caps connections per worker and server, MONGO_MIN_POOL_SIZE (default 0)
+is kept open by the driver. At startup MONGO_WARM_CONNECTIONS (default: the
+min pool size) connections are opened with concurrent pings, so the first
+requests after a deploy don't pay for TCP/TLS handshakes and authentication.
+
+Timeouts (MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+MONGO_SOCKET_TIMEOUT_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_MAX_IDLE_TIME_MS),
+MONGO_READ_PREFERENCE and MONGO_COMPRESSORS ("zstd,snappy,zlib", limited to
+what is installed) are passed to the driver only when set, so unset values
+keep the driver defaults and anything in MONGO_URL itself.
+
+PoolMonitor listens to connection pool events and keeps per-server counts of
+open, checked out and waiting connections for the health endpoint.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+try:
+    import snappy
+except ImportError:
+    snappy = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Environment variable -> driver option, passed through when set
+TIMEOUT_OPTIONS = {
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+}
+
+
+def available_compressors():
+    compressors = ["zlib"]
+    if snappy is not None:
+        compressors.append("snappy")
+    if zstandard is not None:
+        compressors.append("zstd")
+    return compressors
+
+
+class MongoSettings:
+    def __init__(self, url=None, max_pool_size=None, min_pool_size=None, warm_connections=None,
+                 timeouts=None, read_preference=None, compressors=None):
+        env = os.environ
+        self.url = url or env['MONGO_URL']
+        self.max_pool_size = int(max_pool_size if max_pool_size is not None else env.get('MONGO_MAX_POOL_SIZE', '100'))
+        self.min_pool_size = int(min_pool_size if min_pool_size is not None else env.get('MONGO_MIN_POOL_SIZE', '0'))
+        self.warm_connections = min(
+            int(warm_connections if warm_connections is not None
+                else env.get('MONGO_WARM_CONNECTIONS', self.min_pool_size)),
+            self.max_pool_size,
+        )
+        if timeouts is None:
+            timeouts = {option: int(env[name]) for name, option in TIMEOUT_OPTIONS.items() if env.get(name)}
+        self.timeouts = timeouts
+        self.read_preference = read_preference or env.get('MONGO_READ_PREFERENCE') or None
+        if compressors is None:
+            compressors = env.get('MONGO_COMPRESSORS', '').split(',')
+        self.compressors = [c.strip() for c in compressors if c.strip() in available_compressors()]
+
+    def client_options(self):
+        options = {'maxPoolSize': self.max_pool_size, 'minPoolSize': self.min_pool_size, **self.timeouts}
+        if self.read_preference:
+            options['readPreference'] = self.read_preference
+        if self.compressors:
+            options['compressors'] = ",".join(self.compressors)
+        return options
+
+
+def create_client(settings, event_listeners=()):
+    return AsyncIOMotorClient(settings.url, event_listeners=list(event_listeners), **settings.client_options())
+
+
+async def warm_pool(client, connections):
+    """Open up to `connections` pooled connections; returns seconds taken"""
+    start = time.perf_counter()
+    # The first ping discovers the topology; the rest run concurrently, so
+    # each needs a connection of its own
+    await client.admin.command("ping")
+    if connections > 1:
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(connections - 1)))
+    return time.perf_counter() - start
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Per-server connection pool counters, fed by driver pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "open": 0, "checked_out": 0, "waiting": 0,
+                "created_total": 0, "closed_total": 0, "checkout_failures_total": 0,
+            }
+        return pool
+
+    def _update(self, address, **changes):
+        with self._lock:
+            pool = self._pool(address)
+            for name, amount in changes.items():
+                pool[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1, created_total=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1, closed_total=1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1, checkout_failures_total=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
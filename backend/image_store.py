@@ -0,0 +1,208 @@
+"""
+Blob storage for product images. Images are stored once per content hash
+(sha256) so product documents only carry a URL and the hash. Two backends
+share the same interface: GridFS (default, lives in the app database) and a
+local-disk store for single-node deployments.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from gridfs.errors import FileExists, NoFile
+from pymongo.errors import DuplicateKeyError
+
+CHUNK_SIZE = 64 * 1024
+
+_DATA_URL_RE = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+)?(;[^,]*)?,", re.IGNORECASE)
+
+_MAGIC_TYPES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+class ImageInfo:
+    def __init__(self, size, content_type):
+        self.size = size
+        self.content_type = content_type
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def sniff_content_type(data):
+    for magic, content_type in _MAGIC_TYPES:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def decode_image_data(value):
+    """Decode a base64 string or data URL into (bytes, content_type)"""
+    content_type = None
+    match = _DATA_URL_RE.match(value)
+    if match:
+        content_type = match.group("type")
+        value = value[match.end():]
+    try:
+        # Whitespace (MIME line wrapping) is ignored, any other non-base64 character rejected
+        data = base64.b64decode(re.sub(r"\s+", "", value), validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidImage(f"Invalid base64 image: {e}")
+    if not data:
+        raise InvalidImage("Empty image")
+    content_type = (content_type or sniff_content_type(data)).lower()
+    if not content_type.startswith("image/"):
+        raise InvalidImage(f"Not an image: {content_type}")
+    return data, content_type
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_range(header, size):
+    """Parse a single-range Range header into inclusive (start, end), or None"""
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if not start_text:
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - suffix, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+class LocalDiskImageStore:
+    """Images as files under root, sharded by the first two hash characters"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, key):
+        return self.root / key[:2] / key
+
+    async def put(self, key, data, content_type):
+        path = self._path(key)
+        if path.exists():
+            return
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            path.with_suffix(".type").write_text(content_type)
+            os.replace(tmp, path)
+
+        await asyncio.to_thread(write)
+
+    async def stat(self, key):
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            content_type = path.with_suffix(".type").read_text()
+        except FileNotFoundError:
+            return None
+        return ImageInfo(size, content_type)
+
+    async def stream(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        handle = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            await asyncio.to_thread(handle.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(handle.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            handle.close()
+
+    async def delete(self, key):
+        path = self._path(key)
+        for p in (path, path.with_suffix(".type")):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class GridFSImageStore:
+    """Images in a GridFS bucket, using the content hash as the file id"""
+
+    def __init__(self, database, bucket_name="product_images"):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name)
+
+    async def put(self, key, data, content_type):
+        try:
+            await self.bucket.upload_from_stream_with_id(
+                key, key, data, metadata={"contentType": content_type}
+            )
+        except (FileExists, DuplicateKeyError):
+            pass
+
+    async def stat(self, key):
+        try:
+            grid_out = await self.bucket.open_download_stream(key)
+        except NoFile:
+            return None
+        metadata = grid_out.metadata or {}
+        return ImageInfo(grid_out.length, metadata.get("contentType", "application/octet-stream"))
+
+    async def stream(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        grid_out = await self.bucket.open_download_stream(key)
+        grid_out.seek(start)
+        remaining = (grid_out.length if end is None else end + 1) - start
+        while remaining > 0:
+            chunk = await grid_out.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, key):
+        try:
+            await self.bucket.delete(key)
+        except NoFile:
+            pass
+
+
+def create_image_store(database):
+    """Build the image store configured by IMAGE_STORE (gridfs or local)"""
+    backend = os.environ.get("IMAGE_STORE", "gridfs").lower()
+    if backend == "local":
+        root = os.environ.get("IMAGE_STORE_PATH", str(Path(__file__).parent / "images"))
+        return LocalDiskImageStore(root)
+    if backend == "gridfs":
+        return GridFSImageStore(database)
+    raise ValueError(f"Unknown IMAGE_STORE backend: {backend}")
@@ -0,0 +1,158 @@
+"""
+Declared MongoDB indexes for every query pattern the API uses.
+
+ensure_indexes() runs at app startup: it compares the declared indexes with
+what exists, creates the missing ones and reports extra or conflicting ones
+without dropping anything. Set INDEX_DRY_RUN=1 to only report. Carts not
+touched for CART_TTL_DAYS (default 30) are expired by a TTL index, as are
+webhook events WEBHOOK_EVENT_TTL_DAYS (default 7) after they were processed;
+pending and failed events are kept. The module can also be run directly
+against MONGO_URL/DB_NAME:
+
+    python indexes.py [--dry-run]
+"""
+
+import logging
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+CART_TTL_SECONDS = int(float(os.environ.get('CART_TTL_DAYS', '30')) * 86400)
+# Long enough to still deduplicate the provider's retries of an event
+WEBHOOK_EVENT_TTL_SECONDS = int(float(os.environ.get('WEBHOOK_EVENT_TTL_DAYS', '7')) * 86400)
+
+
+class IndexSpec:
+    def __init__(self, collection, keys, unique=False, **options):
+        self.collection = collection
+        self.keys = [(field, direction) for field, direction in keys]
+        self.unique = unique
+        self.options = options
+
+    @property
+    def name(self):
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def model(self):
+        return IndexModel(self.keys, name=self.name, unique=self.unique, **self.options)
+
+    def describe(self):
+        flags = " unique" if self.unique else ""
+        if "expireAfterSeconds" in self.options:
+            flags += f" ttl={self.options['expireAfterSeconds']}s"
+        return f"{self.collection}.{self.name}{flags}"
+
+
+REQUIRED_INDEXES = [
+    # Catalog listing by category, keyset-paginated on _id
+    IndexSpec("products", [("category", ASCENDING), ("_id", ASCENDING)]),
+    # One cart per session
+    IndexSpec("carts", [("session_id", ASCENDING)], unique=True),
+    # Abandoned carts expire; every cart write sets updated_at
+    IndexSpec("carts", [("updated_at", ASCENDING)], expireAfterSeconds=CART_TTL_SECONDS),
+    IndexSpec("orders", [("order_number", ASCENDING)], unique=True),
+    IndexSpec("orders", [("stripe_session_id", ASCENDING)], unique=True),
+    # Order history per cart session, newest first
+    IndexSpec("orders", [("cart_session_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # Admin order listing, newest first
+    IndexSpec("orders", [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("payment_transactions", [("stripe_session_id", ASCENDING)], unique=True),
+    # Webhook worker claims pending events oldest first
+    IndexSpec("webhook_events", [("status", ASCENDING), ("received_at", ASCENDING)]),
+    # Processed events expire; only they have processed_at
+    IndexSpec("webhook_events", [("processed_at", ASCENDING)], expireAfterSeconds=WEBHOOK_EVENT_TTL_SECONDS),
+]
+
+
+def _existing_matches(info, spec):
+    return [tuple(k) for k in info["key"]] == [tuple(k) for k in spec.keys]
+
+
+def _options_match(info, spec):
+    return (bool(info.get("unique")) == spec.unique
+            and info.get("expireAfterSeconds") == spec.options.get("expireAfterSeconds"))
+
+
+async def plan_indexes(db, specs=None):
+    """Compare declared indexes with the database.
+
+    Returns a dict with "present", "missing", "conflicting" (same keys but
+    different options) and "extra" (existing but undeclared) entries.
+    """
+    specs = REQUIRED_INDEXES if specs is None else specs
+    report = {"present": [], "missing": [], "conflicting": [], "extra": []}
+    by_collection = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection, collection_specs in by_collection.items():
+        existing = await db[collection].index_information()
+        matched = set()
+        for spec in collection_specs:
+            found = [name for name, info in existing.items() if _existing_matches(info, spec)]
+            if not found:
+                report["missing"].append(spec)
+                continue
+            matched.update(found)
+            if any(_options_match(existing[name], spec) for name in found):
+                report["present"].append(spec)
+            else:
+                report["conflicting"].append(spec)
+        for name in existing:
+            if name != "_id_" and name not in matched:
+                report["extra"].append(f"{collection}.{name}")
+    return report
+
+
+async def ensure_indexes(db, dry_run=False, specs=None):
+    """Create missing indexes and log what differs from the declaration"""
+    report = await plan_indexes(db, specs)
+    for name in report["extra"]:
+        logger.warning(f"Undeclared index {name} (not dropped)")
+    for spec in report["conflicting"]:
+        logger.warning(f"Index {spec.describe()} exists with different options")
+
+    report["created"] = []
+    report["failed"] = []
+    for spec in report["missing"]:
+        if dry_run:
+            logger.info(f"[dry run] would create index {spec.describe()}")
+            continue
+        try:
+            await db[spec.collection].create_indexes([spec.model()])
+        except OperationFailure as e:
+            # e.g. duplicate values already present for a unique index
+            logger.error(f"Could not create index {spec.describe()}: {e}")
+            report["failed"].append(spec)
+            continue
+        logger.info(f"Created index {spec.describe()}")
+        report["created"].append(spec)
+    return report
+
+
+def format_report(report):
+    lines = []
+    for section in ("present", "missing", "created", "failed", "conflicting", "extra"):
+        for entry in report.get(section, []):
+            label = entry if isinstance(entry, str) else entry.describe()
+            lines.append(f"{section:<12} {label}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import os
+    import sys
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO)
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    result = asyncio.run(ensure_indexes(client[os.environ['DB_NAME']], dry_run="--dry-run" in sys.argv))
+    print(format_report(result))
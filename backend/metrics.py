@@ -0,0 +1,213 @@
+"""
+Prometheus-style request and MongoDB metrics without extra dependencies.
+
+MetricsMiddleware times every HTTP request and labels it with the matched
+route template (e.g. /api/products/{product_id}), so cardinality stays
+bounded. MongoCommandListener is registered on the Motor client and counts
+commands, their durations and the documents they return. Motor runs pymongo
+calls with the caller's context copied, so each command is attributed to the
+route of the request that issued it; the per-request round-trip histogram
+makes N+1 query patterns stand out. render() produces the text exposition
+format served at /metrics.
+"""
+
+import contextvars
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_string(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Registry:
+    """Counters, gauges and histograms keyed by name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}       # (name, labels) -> number
+        self._histograms = {}   # (name, labels) -> [bucket counts, sum, count]
+        self._buckets = {}
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._types[name] = kind
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self._buckets[name]
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def get(self, name, **labels):
+        return self._values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, **labels):
+        """(bucket counts, sum, count) for one label set, or None"""
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: (list(e[0]), e[1], e[2]) for key, e in self._histograms.items()}
+        lines = []
+        for name in sorted(self._types):
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {self._types[name]}")
+            if self._types[name] == "histogram":
+                buckets = self._buckets[name]
+                for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_label_string(labels + (('le', bound),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_label_string(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_label_string(labels)} {total}")
+                    lines.append(f"{name}_count{_label_string(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_label_string(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.describe("http_requests_total", "counter", "HTTP requests by method, route and status")
+registry.describe("http_request_duration_seconds", "histogram", "HTTP request latency", LATENCY_BUCKETS)
+registry.describe("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+registry.describe("mongo_commands_total", "counter", "MongoDB commands by route and command")
+registry.describe("mongo_command_failures_total", "counter", "Failed MongoDB commands by route and command")
+registry.describe("mongo_command_duration_seconds", "histogram", "MongoDB command latency", LATENCY_BUCKETS)
+registry.describe("mongo_documents_returned_total", "counter", "Documents returned by MongoDB commands")
+registry.describe(
+    "mongo_round_trips_per_request", "histogram", "MongoDB commands issued per HTTP request", ROUND_TRIP_BUCKETS
+)
+
+
+class RequestStats:
+    def __init__(self, scope):
+        self.scope = scope
+        self.round_trips = 0
+        self.mongo_seconds = 0.0
+
+    @property
+    def route(self):
+        # Routing stores the matched route in the (shared) scope
+        route = self.scope.get("route")
+        return route.path if route is not None else UNMATCHED_ROUTE
+
+
+# Stats of the request the current task/thread is serving
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def route_label():
+    stats = current_request.get()
+    return BACKGROUND_ROUTE if stats is None else stats.route
+
+
+def _documents_returned(reply):
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:
+        return 1 if reply["value"] is not None else 0
+    if "values" in reply:
+        return len(reply["values"])
+    return 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Count MongoDB round trips per route"""
+
+    def __init__(self, registry=registry):
+        self.registry = registry
+
+    def _record(self, event):
+        stats = current_request.get()
+        if stats is not None:
+            stats.round_trips += 1
+            stats.mongo_seconds += event.duration_micros / 1e6
+        route = route_label()
+        self.registry.inc("mongo_commands_total", route=route, command=event.command_name)
+        self.registry.observe("mongo_command_duration_seconds", event.duration_micros / 1e6,
+                              command=event.command_name)
+        return route
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        route = self._record(event)
+        documents = _documents_returned(event.reply)
+        if documents:
+            self.registry.inc("mongo_documents_returned_total", documents, route=route, command=event.command_name)
+
+    def failed(self, event):
+        route = self._record(event)
+        self.registry.inc("mongo_command_failures_total", route=route, command=event.command_name)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.inc("http_requests_in_flight")
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.inc("http_requests_in_flight", -1)
+            current_request.reset(token)
+            route = stats.route
+            method = scope["method"]
+            self.registry.inc("http_requests_total", method=method, route=route, status=status)
+            self.registry.observe("http_request_duration_seconds", time.perf_counter() - start,
+                                  method=method, route=route)
+            self.registry.observe("mongo_round_trips_per_request", stats.round_trips, route=route)
@@ -0,0 +1,50 @@
+"""
+Collision-free order numbers.
+
+A counter document in the counters collection is advanced by a whole block
+per round trip. Each worker process then hands out numbers from its block
+locally, so allocation needs no coordination per order. Numbers are unique
+and increase per worker; unused blocks left by restarts become gaps.
+Counting starts above the legacy random ORD-100000..999999 range.
+"""
+
+import asyncio
+import os
+
+from pymongo import ReturnDocument
+
+COUNTER_ID = "order_number"
+PREFIX = "ORD-"
+
+
+class OrderNumberAllocator:
+    def __init__(self, collection, block_size=None, start=None):
+        self.collection = collection
+        self.block_size = block_size or int(os.environ.get('ORDER_NUMBER_BLOCK', '50'))
+        self.start = start if start is not None else int(os.environ.get('ORDER_NUMBER_START', '1000000'))
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+        self._initialized = False
+
+    async def _reserve_block(self):
+        if not self._initialized:
+            await self.collection.update_one(
+                {"_id": COUNTER_ID}, {"$setOnInsert": {"value": self.start}}, upsert=True
+            )
+            self._initialized = True
+        counter = await self.collection.find_one_and_update(
+            {"_id": COUNTER_ID},
+            {"$inc": {"value": self.block_size}},
+            return_document=ReturnDocument.AFTER,
+        )
+        self._end = counter["value"]
+        self._next = self._end - self.block_size + 1
+
+    async def allocate(self):
+        async with self._lock:
+            if self._next == 0 or self._next > self._end:
+                await self._reserve_block()
+            number = self._next
+            self._next += 1
+        return f"{PREFIX}{number}"
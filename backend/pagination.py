@@ -0,0 +1,155 @@
+"""
+Keyset (cursor) pagination and response shaping helpers for listing endpoints.
+
+Cursors are opaque url-safe base64 JSON blobs holding the sort key of the last
+returned document. Listings fetch one document past the page size to know
+whether another page exists, and hand the cursor back in X-Next-Cursor so the
+response body stays a plain list.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Languages with localized catalog views; the first is the base language the
+# untranslated name/description fields are written in
+LANGUAGES = [lang.strip() for lang in os.environ.get('CATALOG_LANGUAGES', 'en,cs,es,de').split(',') if lang.strip()]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc, sort_field=None):
+    payload = {"id": str(doc["_id"])}
+    if sort_field:
+        value = doc.get(sort_field)
+        payload["v"] = value.isoformat() if isinstance(value, datetime) else value
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_field=None):
+    """Return (ObjectId, sort value) from a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        oid = ObjectId(payload["id"])
+        value = None
+        if sort_field:
+            value = payload["v"]
+            if sort_field.endswith("_at") and value is not None:
+                value = datetime.fromisoformat(value)
+        return oid, value
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(after, descending=False, sort_field=None):
+    """Mongo filter selecting documents strictly after the cursor position"""
+    if not after:
+        return {}
+    oid, value = decode_cursor(after, sort_field)
+    op = "$lt" if descending else "$gt"
+    if not sort_field:
+        return {"_id": {op: oid}}
+    return {"$or": [
+        {sort_field: {op: value}},
+        {sort_field: value, "_id": {op: oid}},
+    ]}
+
+
+def sort_spec(descending=False, sort_field=None):
+    direction = -1 if descending else 1
+    keys = [(sort_field, direction)] if sort_field else []
+    return keys + [("_id", direction)]
+
+
+def parse_fields(fields, always=()):
+    """Turn a comma separated fields= value into an inclusion projection"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    names.discard("id")
+    names.discard("_id")
+    names.update(always)
+    return {name: 1 for name in sorted(names)} or None
+
+
+def next_cursor_headers(next_cursor):
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+
+
+# lang value that opts in to negotiating the language from Accept-Language
+AUTO_LANG = "auto"
+
+
+def resolve_lang(lang=None, accept_language=None):
+    """Language to localize a response to, or None for full documents.
+
+    Only an explicit lang flattens documents. Accept-Language is consulted
+    only for lang=auto, since browsers send it on every request and clients
+    that edit products need the base fields and every translation.
+    """
+    if not lang:
+        return None
+    lang = lang.strip().lower()
+    if lang != AUTO_LANG:
+        return lang if lang in LANGUAGES else None
+    best, best_q = None, 0.0
+    for part in (accept_language or "").split(","):
+        tag, _, params = part.strip().partition(";")
+        code = tag.strip().lower().split("-")[0]
+        if code not in LANGUAGES:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > best_q:
+            best, best_q = code, q
+    return best
+
+
+def localize(doc, lang):
+    """Flatten a document to one language.
+
+    name/description are replaced by the lang translation where there is one
+    and the translations map is dropped. With no lang the document is returned
+    unchanged.
+    """
+    if not lang or "translations" not in doc:
+        return doc
+    translations = doc.pop("translations")
+    translation = translations.get(lang) if isinstance(translations, dict) else None
+    if isinstance(translation, dict):
+        for key in ("name", "description"):
+            if key in doc and translation.get(key):
+                doc[key] = translation[key]
+    return doc
+
+
+async def fetch_page(collection, query, limit, after=None, descending=False,
+                     sort_field=None, projection=None):
+    """Fetch one keyset page, returning (docs, next_cursor)"""
+    query = dict(query)
+    position = keyset_filter(after, descending, sort_field)
+    if position:
+        query = {"$and": [query, position]} if query else position
+    docs = await collection.find(query, projection).sort(
+        sort_spec(descending, sort_field)
+    ).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
@@ -0,0 +1,212 @@
+"""
+Payment gateway abstraction.
+
+One gateway is created at app startup and kept on app.state. StripeGateway
+uses a single StripeCheckout client for the process, with STRIPE_WEBHOOK_URL
+or else the webhook URL of the first checkout, and installs a pooled
+keep-alive HTTP client for the Stripe SDK. FakeGateway keeps sessions in
+memory so the checkout flow can run (and be load tested) offline.
+
+Gateways expose:
+    create_checkout_session(amount, currency, success_url, cancel_url, metadata, webhook_url=None)
+        -> CheckoutSession
+    get_checkout_status(session_id) -> CheckoutStatus
+    handle_webhook(body, signature) -> WebhookEvent
+    close()
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutSession:
+    def __init__(self, session_id, url):
+        self.session_id = session_id
+        self.url = url
+
+
+class CheckoutStatus:
+    def __init__(self, status, payment_status, amount_total, currency, metadata=None):
+        self.status = status
+        self.payment_status = payment_status
+        self.amount_total = amount_total
+        self.currency = currency
+        self.metadata = metadata or {}
+
+
+class WebhookEvent:
+    def __init__(self, event_id, event_type, session_id, payment_status, metadata=None):
+        self.event_id = event_id
+        self.event_type = event_type
+        self.session_id = session_id
+        self.payment_status = payment_status
+        self.metadata = metadata or {}
+
+
+class GatewaySettings:
+    def __init__(self, timeout=None, pool_size=None, max_retries=None):
+        env = os.environ
+        self.timeout = float(timeout if timeout is not None else env.get('PAYMENT_TIMEOUT_SECONDS', '15'))
+        self.pool_size = int(pool_size if pool_size is not None else env.get('PAYMENT_POOL_SIZE', '20'))
+        self.max_retries = int(max_retries if max_retries is not None else env.get('PAYMENT_MAX_RETRIES', '2'))
+
+
+def _install_stripe_http_client(settings):
+    """Point the Stripe SDK at a pooled keep-alive session with our timeouts"""
+    try:
+        import requests
+        import stripe
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        logger.warning("stripe/requests not installed; using the SDK's default HTTP client")
+        return None
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.pool_size)
+    session.mount("https://", adapter)
+    stripe.default_http_client = stripe.RequestsClient(timeout=settings.timeout, session=session)
+    stripe.max_network_retries = settings.max_retries
+    return session
+
+
+class StripeGateway:
+    def __init__(self, api_key, webhook_url=None, settings=None):
+        self.api_key = api_key
+        self.webhook_url = webhook_url
+        self.settings = settings or GatewaySettings()
+        self._checkout = None
+        self._checkout_webhook_url = None
+        if not webhook_url:
+            logger.warning("STRIPE_WEBHOOK_URL not set; the first checkout's host will receive Stripe webhooks")
+        self._http_session = _install_stripe_http_client(self.settings)
+
+    def _client(self, webhook_url=None):
+        webhook_url = self.webhook_url or webhook_url
+        # Request webhook URLs come from the client-supplied Host header, so
+        # they never create further clients; a client built before any URL
+        # was known (a status check) is replaced once
+        if self._checkout is None or (self._checkout_webhook_url is None and webhook_url):
+            from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+            self._checkout = StripeCheckout(api_key=self.api_key, webhook_url=webhook_url)
+            self._checkout_webhook_url = webhook_url
+        return self._checkout
+
+    async def create_checkout_session(self, amount, currency, success_url, cancel_url,
+                                      metadata, webhook_url=None):
+        from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
+
+        request = CheckoutSessionRequest(
+            amount=float(amount),
+            currency=currency,
+            success_url=success_url,
+            cancel_url=cancel_url,
+            metadata=metadata,
+        )
+        session = await self._client(webhook_url).create_checkout_session(request)
+        return CheckoutSession(session.session_id, session.url)
+
+    async def get_checkout_status(self, session_id):
+        status = await self._client().get_checkout_status(session_id)
+        return CheckoutStatus(
+            status.status, status.payment_status, status.amount_total, status.currency,
+            getattr(status, "metadata", None),
+        )
+
+    async def handle_webhook(self, body, signature):
+        response = await self._client().handle_webhook(body, signature)
+        return WebhookEvent(
+            getattr(response, "event_id", None),
+            getattr(response, "event_type", None),
+            response.session_id,
+            response.payment_status,
+            getattr(response, "metadata", None),
+        )
+
+    async def close(self):
+        if self._http_session is not None:
+            self._http_session.close()
+
+
+class FakeGateway:
+    """In-memory gateway for offline development and load tests.
+
+    Sessions start unpaid; they become paid after `auto_pay_after` status
+    checks (0 disables) or when mark_paid() is called. `latency` adds an
+    artificial delay in seconds to every call. Webhook bodies are JSON with
+    session_id and payment_status; the signature is ignored.
+    """
+
+    def __init__(self, latency=0.0, auto_pay_after=1):
+        self.latency = latency
+        self.auto_pay_after = auto_pay_after
+        self.sessions = {}
+        self.calls = []
+
+    async def _delay(self, call):
+        self.calls.append(call)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_checkout_session(self, amount, currency, success_url, cancel_url,
+                                      metadata, webhook_url=None):
+        await self._delay("create_checkout_session")
+        session_id = f"cs_fake_{uuid.uuid4().hex}"
+        self.sessions[session_id] = {
+            "amount_total": int(round(float(amount) * 100)),
+            "currency": currency,
+            "metadata": dict(metadata),
+            "payment_status": "unpaid",
+            "checks": 0,
+        }
+        url = success_url.replace("{CHECKOUT_SESSION_ID}", session_id)
+        return CheckoutSession(session_id, url)
+
+    def mark_paid(self, session_id):
+        self.sessions[session_id]["payment_status"] = "paid"
+
+    async def get_checkout_status(self, session_id):
+        await self._delay("get_checkout_status")
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"No such checkout session: {session_id}")
+        session["checks"] += 1
+        if self.auto_pay_after and session["checks"] >= self.auto_pay_after:
+            session["payment_status"] = "paid"
+        paid = session["payment_status"] == "paid"
+        return CheckoutStatus(
+            "complete" if paid else "open", session["payment_status"],
+            session["amount_total"], session["currency"], session["metadata"],
+        )
+
+    async def handle_webhook(self, body, signature):
+        await self._delay("handle_webhook")
+        payload = json.loads(body)
+        return WebhookEvent(
+            payload.get("id") or f"evt_fake_{uuid.uuid4().hex}",
+            payload.get("type", "checkout.session.completed"),
+            payload["session_id"],
+            payload.get("payment_status", "paid"),
+            payload.get("metadata"),
+        )
+
+    async def close(self):
+        pass
+
+
+def create_payment_gateway(api_key):
+    """Build the gateway selected by PAYMENT_GATEWAY (stripe or fake)"""
+    backend = os.environ.get("PAYMENT_GATEWAY", "stripe").lower()
+    if backend == "fake":
+        return FakeGateway(
+            latency=float(os.environ.get("FAKE_GATEWAY_LATENCY_MS", "0")) / 1000,
+            auto_pay_after=int(os.environ.get("FAKE_GATEWAY_AUTO_PAY_AFTER", "1")),
+        )
+    if backend == "stripe":
+        return StripeGateway(api_key, webhook_url=os.environ.get("STRIPE_WEBHOOK_URL"))
+    raise ValueError(f"Unknown PAYMENT_GATEWAY: {backend}")
@@ -0,0 +1,258 @@
+"""
+Opt-in statistical profiling of individual requests.
+
+A request is profiled when it carries the PROFILING_TOKEN in an
+X-Profile-Token header (or a profile_token query parameter), or at random
+for PROFILING_SAMPLE_RATE of live traffic (default 0). Nothing is profiled
+while neither is configured.
+
+A sampler thread captures the event loop thread's Python stack every
+PROFILING_INTERVAL_MS (default 2) and keeps the samples taken while the
+profiled request's task was the one running. That on-CPU time is reported
+next to the Mongo time recorded by the metrics command listener; the rest of
+the wall time was spent awaiting other I/O (the payment provider, etc.) or
+waiting for the loop. Profiles are written to PROFILING_DIR as JSON holding a
+summary and a speedscope (https://www.speedscope.app) sampled profile; only
+the newest PROFILING_MAX_PROFILES (default 500, 0 for no limit) are kept.
+Token-triggered responses carry X-Profile-Id and a Server-Timing header.
+"""
+
+import asyncio
+import heapq
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from metrics import current_request
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class ProfilingSettings:
+    def __init__(self, token=None, sample_rate=None, interval_ms=None, directory=None, max_profiles=None):
+        env = os.environ
+        self.token = token if token is not None else env.get('PROFILING_TOKEN', '')
+        self.sample_rate = float(sample_rate if sample_rate is not None else env.get('PROFILING_SAMPLE_RATE', '0'))
+        self.interval = float(interval_ms if interval_ms is not None else env.get('PROFILING_INTERVAL_MS', '2')) / 1000
+        self.directory = Path(directory or env.get('PROFILING_DIR') or Path(tempfile.gettempdir()) / 'profiles')
+        self.max_profiles = int(max_profiles if max_profiles is not None else env.get('PROFILING_MAX_PROFILES', '500'))
+
+    @property
+    def enabled(self):
+        return bool(self.token) or self.sample_rate > 0
+
+    def token_matches(self, candidate):
+        return bool(self.token) and bool(candidate) and hmac.compare_digest(candidate, self.token)
+
+
+class Profile:
+    def __init__(self, task):
+        # Sortable by creation time, which retention and listing rely on
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        self.task = task
+        self.started = time.perf_counter()
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.weights = []
+
+    def add_sample(self, frame, weight):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(stack)
+        self.weights.append(weight)
+
+    @property
+    def cpu_seconds(self):
+        return sum(self.weights)
+
+    def speedscope(self, name, wall_seconds):
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "backend profiling",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(wall_seconds * 1000, 3),
+                "samples": self.samples,
+                "weights": [round(w * 1000, 3) for w in self.weights],
+            }],
+        }
+
+
+class Sampler:
+    """One background thread sampling the event loop thread for active profiles"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = set()
+        self._thread = None
+        self._loop = None
+        self._loop_thread_id = None
+
+    def start(self, profile):
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile):
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                running = asyncio.current_task(self._loop)
+                frame = sys._current_frames().get(self._loop_thread_id)
+                for profile in self._active:
+                    if profile.task is running and frame is not None:
+                        profile.add_sample(frame, elapsed)
+
+
+def _query_token(scope):
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile_token")
+    return values[0] if values else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, settings=None):
+        self.app = app
+        self.settings = settings or ProfilingSettings()
+        self.sampler = Sampler(self.settings.interval)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(b"x-profile-token", b"").decode("latin-1") or _query_token(scope)
+        requested = self.settings.token_matches(token)
+        if not requested and random.random() >= self.settings.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(asyncio.current_task())
+        status = 500
+
+        async def send_with_profile(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    summary = self._summary(profile)
+                    timing = ", ".join(
+                        f"{name};dur={summary[key]}"
+                        for name, key in (("cpu", "cpu_ms"), ("mongo", "mongo_ms"), ("wait", "other_wait_ms"))
+                    )
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (PROFILE_ID_HEADER.lower().encode(), profile.id.encode()),
+                        (b"server-timing", timing.encode()),
+                    ]}
+            await send(message)
+
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.sampler.stop(profile)
+            summary = self._summary(profile)
+            route = scope.get("route")
+            summary.update({
+                "id": profile.id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "status": status,
+                "requested": requested,
+                "samples": len(profile.samples),
+                "interval_ms": self.settings.interval * 1000,
+            })
+            name = f"{scope['method']} {scope['path']}"
+            document = {"summary": summary, "speedscope": profile.speedscope(name, summary["wall_ms"] / 1000)}
+            await asyncio.get_running_loop().run_in_executor(None, self._write, profile.id, document)
+
+    def _summary(self, profile):
+        wall = time.perf_counter() - profile.started
+        stats = current_request.get()
+        mongo = stats.mongo_seconds if stats is not None else 0.0
+        cpu = min(profile.cpu_seconds, wall)
+        return {
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "mongo_ms": round(mongo * 1000, 3),
+            "mongo_round_trips": stats.round_trips if stats is not None else 0,
+            # Awaiting the payment provider/other I/O, or other tasks holding the loop
+            "other_wait_ms": round(max(wall - cpu - mongo, 0.0) * 1000, 3),
+        }
+
+    def _write(self, profile_id, document):
+        self.settings.directory.mkdir(parents=True, exist_ok=True)
+        path = self.settings.directory / f"{profile_id}.json"
+        path.write_text(json.dumps(document))
+        if self.settings.max_profiles:
+            prune_profiles(self.settings.directory, self.settings.max_profiles)
+
+
+def load_profile(directory, profile_id):
+    """Read a stored profile document, or None"""
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    path = Path(directory) / f"{profile_id}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def prune_profiles(directory, keep):
+    """Delete all but the newest `keep` stored profiles (ids sort by creation time)"""
+    paths = sorted(Path(directory).glob("*.json"))
+    for path in paths[:-keep]:
+        # Another worker sharing the directory may have pruned it already
+        path.unlink(missing_ok=True)
+
+
+def list_profiles(directory, limit=50):
+    """Summaries of the most recent stored profiles"""
+    paths = heapq.nlargest(limit, Path(directory).glob("*.json"))
+    summaries = []
+    for path in paths:
+        try:
+            summaries.append(json.loads(path.read_text())["summary"])
+        except FileNotFoundError:
+            # Pruned between listing and reading
+            continue
+    return summaries
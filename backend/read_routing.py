@@ -0,0 +1,104 @@
+"""
+Per-endpoint read routing to replica set secondaries.
+
+Read-only endpoints declare which kind of read they do by asking the router
+for a handle: CATALOG (product listings, search, categories, catalog export)
+and HISTORY (the admin order list, order reports) tolerate a little staleness
+and may be served by secondaries. Everything else (carts, checkout, webhooks,
+a shopper's own orders and every write) keeps using the primary handle, which
+reads with the client's default read preference (MONGO_READ_PREFERENCE,
+primary unless set).
+
+Settings: READ_PREFERENCE_CATALOG and READ_PREFERENCE_HISTORY take a read
+preference mode (default secondaryPreferred; "primary" turns routing off for
+that kind of read). READ_MAX_STALENESS_SECONDS (default 90, the smallest the
+driver accepts; 0 for no bound) keeps reads off secondaries that lag further
+behind. After a catalog or order write this worker reads that kind of data
+from the primary for READ_PIN_AFTER_WRITE_SECONDS (default: the staleness
+bound), so a change is not read back, and cached, from a secondary that
+hasn't replicated it yet.
+
+On a standalone server or a single node every mode reads from that node.
+"""
+
+import os
+import time
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+CATALOG = "catalog"
+HISTORY = "history"
+READ_KINDS = (CATALOG, HISTORY)
+
+MODES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+class ReadRoutingSettings:
+    def __init__(self, modes=None, max_staleness=None, pin_after_write=None):
+        env = os.environ
+        if modes is None:
+            modes = {kind: env.get(f'READ_PREFERENCE_{kind.upper()}', 'secondaryPreferred') for kind in READ_KINDS}
+        for kind, mode in modes.items():
+            if mode.lower() not in MODES:
+                raise ValueError(f"Unknown read preference for {kind} reads: {mode}")
+        self.modes = modes
+        self.max_staleness = int(
+            max_staleness if max_staleness is not None else env.get('READ_MAX_STALENESS_SECONDS', '90')
+        )
+        if 0 < self.max_staleness < MIN_MAX_STALENESS_SECONDS:
+            raise ValueError(f"READ_MAX_STALENESS_SECONDS must be 0 or at least {MIN_MAX_STALENESS_SECONDS}")
+        if pin_after_write is None:
+            pin_after_write = env.get('READ_PIN_AFTER_WRITE_SECONDS', self.max_staleness or MIN_MAX_STALENESS_SECONDS)
+        self.pin_after_write = float(pin_after_write)
+
+    def read_preference(self, kind):
+        mode = MODES[self.modes.get(kind, 'primary').lower()]
+        if mode is Primary:
+            return Primary()
+        return mode(max_staleness=self.max_staleness or -1)
+
+
+class ReadRouter:
+    """Database handles per kind of read, bound to the database at startup"""
+
+    def __init__(self, settings=None, clock=time.monotonic):
+        self.settings = settings or ReadRoutingSettings()
+        self._clock = clock
+        self._primary = None
+        self._handles = {}
+        self._pinned_until = {}
+
+    def bind(self, database):
+        self._primary = database
+        self._handles = {
+            kind: database.with_options(read_preference=self.settings.read_preference(kind))
+            for kind in READ_KINDS
+        }
+        self._pinned_until = {}
+
+    def database(self, kind):
+        """Handle to read `kind` data through: a secondary-routed one unless pinned after a write"""
+        if self._clock() < self._pinned_until.get(kind, 0):
+            return self._primary
+        return self._handles.get(kind, self._primary)
+
+    def wrote(self, kind):
+        """Read `kind` data from the primary for a while after this worker changed it"""
+        self._pinned_until[kind] = self._clock() + self.settings.pin_after_write
+
+    def describe(self):
+        now = self._clock()
+        return {
+            kind: {
+                "read_preference": self.settings.read_preference(kind).document,
+                "pinned_to_primary_seconds": round(max(self._pinned_until.get(kind, 0) - now, 0), 3),
+            }
+            for kind in READ_KINDS
+        }
@@ -0,0 +1,248 @@
+"""
+In-process inverted index for product search.
+
+Every worker keeps the whole catalog's searchable fields in memory: text
+postings over name, description and every translation (accent-folded, so
+"cerna" finds "Černá"), plus postings for the category/size/color facets.
+Queries AND the query terms together, treating the last one as a prefix for
+search-as-you-type, and never touch Mongo.
+
+Product writes mark ids dirty through invalidate_catalog(); the next search
+re-reads just those products with one $in query. Writes handled by another
+worker are picked up by a full rebuild once the index is older than
+SEARCH_INDEX_TTL seconds (default 60), the same bound the catalog cache has.
+"""
+
+import asyncio
+import bisect
+import os
+import re
+import time
+import unicodedata
+
+from bson import ObjectId
+
+# Products are kept in the index without bulky or internal fields
+INDEX_PROJECTION = {"image_hash": 0}
+
+# Relevance weight of a term by the field it appears in
+FIELD_WEIGHTS = {"name": 3.0, "translated_name": 2.0, "description": 1.0, "category": 1.0}
+
+FACETS = ("category", "size", "color")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """Lowercase and strip accents"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text or ""))
+
+
+def _weighted_terms(product):
+    terms = {}
+
+    def add(text, field):
+        for token in tokenize(text):
+            terms[token] = max(terms.get(token, 0.0), FIELD_WEIGHTS[field])
+
+    add(product.get("name"), "name")
+    add(product.get("description"), "description")
+    add(product.get("category"), "category")
+    for translation in (product.get("translations") or {}).values():
+        if isinstance(translation, dict):
+            add(translation.get("name"), "translated_name")
+            add(translation.get("description"), "description")
+    return terms
+
+
+def _facet_values(product):
+    return {
+        "category": [product["category"]] if product.get("category") else [],
+        "size": list(product.get("sizes") or []),
+        "color": list(product.get("colors") or []),
+    }
+
+
+class ProductSearchIndex:
+    def __init__(self, ttl_seconds=None, clock=time.monotonic):
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('SEARCH_INDEX_TTL', '60'))
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._built_at = None
+        self._dirty = set()
+        self._lock = asyncio.Lock()
+        self.products = {}
+        self._terms = {}        # product id -> {term: weight}
+        self._postings = {}     # term -> {product id: weight}
+        self._sorted_terms = []
+        self._facets = {facet: {} for facet in FACETS}  # facet -> value -> {product ids}
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    # ----- maintenance -----
+
+    def add(self, product):
+        product_id = str(product["_id"])
+        self.remove(product_id)
+        self.products[product_id] = product
+        terms = _weighted_terms(product)
+        self._terms[product_id] = terms
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._sorted_terms, term)
+            postings[product_id] = weight
+        for facet, values in _facet_values(product).items():
+            for value in values:
+                self._facets[facet].setdefault(value, set()).add(product_id)
+
+    def remove(self, product_id):
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        for term in self._terms.pop(product_id):
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect.bisect_left(self._sorted_terms, term)]
+        for facet, values in _facet_values(product).items():
+            for value in values:
+                ids = self._facets[facet][value]
+                ids.discard(product_id)
+                if not ids:
+                    del self._facets[facet][value]
+
+    def build(self, products):
+        self.products = {}
+        self._terms = {}
+        self._postings = {}
+        self._sorted_terms = []
+        self._facets = {facet: {} for facet in FACETS}
+        for product in products:
+            self.add(product)
+        self._built_at = self._clock()
+        self.rebuilds += 1
+
+    def mark_dirty(self, product_id=None):
+        """Schedule a product (or, with no id, the whole index) for reloading"""
+        if product_id is None:
+            self._built_at = None
+            self._dirty.clear()
+        else:
+            self._dirty.add(product_id)
+
+    async def ensure_fresh(self, collection):
+        """Rebuild when stale, otherwise reload only the products marked dirty"""
+        async with self._lock:
+            if self._built_at is None or self._clock() - self._built_at >= self.ttl_seconds:
+                self._dirty.clear()
+                self.build(await collection.find({}, INDEX_PROJECTION).to_list(None))
+                return
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            found = await collection.find(
+                {"_id": {"$in": [ObjectId(pid) for pid in dirty]}}, INDEX_PROJECTION
+            ).to_list(len(dirty))
+            for product in found:
+                self.add(product)
+            for product_id in dirty - {str(p["_id"]) for p in found}:
+                self.remove(product_id)
+            self.refreshes += 1
+
+    # ----- queries -----
+
+    def _match_text(self, query):
+        """Scores of products containing every query term (the last as a prefix)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        scores = None
+        for i, token in enumerate(tokens):
+            if i == len(tokens) - 1:
+                matched = {}
+                terms = self._sorted_terms
+                position = bisect.bisect_left(terms, token)
+                while position < len(terms) and terms[position].startswith(token):
+                    term = terms[position]
+                    position += 1
+                    # Exact matches outrank completions
+                    factor = 1.0 if term == token else 0.5
+                    for pid, weight in self._postings[term].items():
+                        matched[pid] = max(matched.get(pid, 0.0), weight * factor)
+            else:
+                matched = self._postings.get(token, {})
+            if scores is None:
+                scores = dict(matched)
+            else:
+                scores = {pid: score + matched[pid] for pid, score in scores.items() if pid in matched}
+            if not scores:
+                break
+        return scores
+
+    def _facet_filter(self, facet, values):
+        ids = set()
+        for value in values:
+            ids |= self._facets[facet].get(value, set())
+        return ids
+
+    def search(self, query=None, filters=None, min_price=None, max_price=None, limit=20, offset=0):
+        """Return (product ids page, total, facet counts)
+
+        filters maps a facet name to the accepted values (OR within a facet,
+        AND across facets). Facet counts for each facet ignore that facet's
+        own filter, so the client can show how many results every
+        alternative would give.
+        """
+        scores = self._match_text(query)
+        base = set(self.products) if scores is None else set(scores)
+        if min_price is not None or max_price is not None:
+            base = {
+                pid for pid in base
+                if (min_price is None or self.products[pid].get("price", 0) >= min_price)
+                and (max_price is None or self.products[pid].get("price", 0) <= max_price)
+            }
+
+        filters = {facet: values for facet, values in (filters or {}).items() if values}
+        allowed = {facet: self._facet_filter(facet, values) for facet, values in filters.items()}
+        matched = base
+        for ids in allowed.values():
+            matched = matched & ids
+
+        facets = {}
+        for facet in FACETS:
+            candidates = base
+            for other, ids in allowed.items():
+                if other != facet:
+                    candidates = candidates & ids
+            facets[facet] = {
+                value: len(ids & candidates)
+                for value, ids in sorted(self._facets[facet].items())
+                if ids & candidates
+            }
+        prices = [self.products[pid].get("price", 0) for pid in matched]
+        facets["price"] = {"min": min(prices), "max": max(prices)} if prices else {"min": None, "max": None}
+
+        def rank(pid):
+            score = scores[pid] if scores is not None else 0.0
+            return (-score, fold(self.products[pid].get("name") or ""), pid)
+
+        ordered = sorted(matched, key=rank)
+        return ordered[offset:offset + limit], len(ordered), facets
+
+    def stats(self):
+        return {
+            "products": len(self.products),
+            "terms": len(self._postings),
+            "dirty": len(self._dirty),
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
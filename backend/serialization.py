@@ -0,0 +1,98 @@
+"""
+Fast-path JSON encoding for Mongo documents.
+
+The default response path walks every document twice in Python
+(serialize_doc, then FastAPI's jsonable_encoder) before json.dumps runs.
+encode_json does a single lean pass that only rebuilds containers and renames
+"_id" to "id"; ObjectId and datetime values are converted by the C encoder's
+default hook. The output is byte-identical to serialize_doc + JSONResponse,
+which uses the same json.dumps settings.
+
+Cacheable responses carry a strong ETag computed from the encoded bytes, so
+every worker derives the same tag for the same content; conditional_response
+answers a matching If-None-Match with an empty 304.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    allow_nan=False,
+    indent=None,
+    separators=(",", ":"),
+    default=_default,
+)
+
+
+def _prepare(value):
+    """Rename _id keys throughout; leave scalars for the encoder"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key == "_id":
+                result["id"] = str(item)
+            elif isinstance(item, (dict, list)):
+                result[key] = _prepare(item)
+            else:
+                result[key] = item
+        return result
+    if isinstance(value, list):
+        return [_prepare(item) if isinstance(item, (dict, list)) else item for item in value]
+    return value
+
+
+def encode_json(content):
+    """Encode Mongo documents straight to JSON bytes"""
+    return _encoder.encode(_prepare(content)).encode("utf-8")
+
+
+class MongoJSONResponse(Response):
+    """JSON response that encodes Mongo documents without jsonable_encoder.
+
+    Pass raw documents (ObjectId/datetime included) or already-encoded bytes.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return encode_json(content)
+
+
+def make_etag(body):
+    """Strong ETag for an encoded response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match comparison (weak, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def conditional_response(request, body, etag, cache_control, headers=None):
+    """MongoJSONResponse for body, or a 304 when the client already has it"""
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return MongoJSONResponse(body, headers=headers)
@@ -1,29 +1,153 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import re
+import asyncio
 import logging
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from compression import CompressionMiddleware, CompressionSettings, variant_cache
+from bulk_io import (
+    CSV, NDJSON, ORDER_CSV_FIELDS, ORDER_CSV_PROJECTION, RecordError, csv_header, csv_row,
+    detect_format, iter_lines, iter_records, order_csv_row
+)
+from catalog_cache import (
+    CatalogCache, CATEGORIES_KEY, is_listing_key, is_product_key, product_key, product_list_key
+)
+from database import MongoSettings, PoolMonitor, create_client, warm_pool
+from indexes import ensure_indexes
+from metrics import MetricsMiddleware, MongoCommandListener, registry as metrics_registry
+from order_numbers import OrderNumberAllocator
+from payments import create_payment_gateway
+from profiling import ProfilingMiddleware, ProfilingSettings, list_profiles, load_profile
+from read_routing import CATALOG, HISTORY, ReadRouter
+from search_index import ProductSearchIndex
+from singleflight import SingleFlight
+from webhooks import WebhookQueue
+from serialization import (
+    MongoJSONResponse, conditional_response, encode_json, etag_matches, make_etag
+)
+from pagination import (
+    LANGUAGES, NEXT_CURSOR_HEADER, InvalidCursor, fetch_page, localize, next_cursor_headers,
+    parse_fields, resolve_lang
+)
+from image_store import (
+    InvalidImage, RangeNotSatisfiable, content_hash, create_image_store,
+    decode_image_data, parse_range
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, opened by the lifespan handler (see database.py)
+mongo_settings = MongoSettings()
+DB_NAME = os.environ['DB_NAME']
+pool_monitor = PoolMonitor()
+client = None
+db = None
+# Catalog and order history reads may go to secondaries (see read_routing.py)
+read_router = ReadRouter()
 
 # Stripe setup
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', 'sk_test_emergent')
 
+# Product image blob store (GridFS or local disk), bound to the database at startup
+image_store = None
+# Public base URL prepended to image URLs in product payloads
+IMAGE_BASE_URL = os.environ.get('IMAGE_BASE_URL', '').rstrip('/')
+
+# Pending checkout statuses are served from memory for this long while the
+# success page polls; terminal statuses come from payment_transactions
+checkout_status_cache = CatalogCache(
+    max_entries=10000,
+    ttl_seconds=float(os.environ.get('CHECKOUT_STATUS_CACHE_SECONDS', '3')),
+)
+checkout_status_lookups = SingleFlight()
+
+# Order numbers are handed out from blocks reserved on a counter document
+order_numbers = None
+
+# Seconds the health endpoint waits for a MongoDB ping
+HEALTH_PING_TIMEOUT = float(os.environ.get('HEALTH_PING_TIMEOUT', '2'))
+
+# Only report index differences at startup instead of creating indexes
+INDEX_DRY_RUN = os.environ.get('INDEX_DRY_RUN', '').lower() in ('1', 'true', 'yes')
+
+# Largest page a listing endpoint will return
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+
+# Bulk product import: rows per insert_many and row errors reported back
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '500'))
+MAX_BULK_ERRORS = int(os.environ.get('MAX_BULK_ERRORS', '1000'))
+
+# Catalog read cache
+catalog_cache = CatalogCache(
+    max_entries=int(os.environ.get('CATALOG_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.environ.get('CATALOG_CACHE_TTL', '60')),
+)
+# Opt-in request profiling (PROFILING_TOKEN / PROFILING_SAMPLE_RATE)
+profiling_settings = ProfilingSettings()
+
+# In-memory text and facet index behind /products/search
+search_index = ProductSearchIndex()
+
+# gzip/brotli/zstd for JSON responses; compressed catalog variants are cached
+compression_settings = CompressionSettings()
+compressed_variants = variant_cache(compression_settings)
+
+# Clients and proxies may store catalog responses but revalidate them with
+# their ETag on every use, so admin edits show up at once (304s stay cheap)
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'no-cache')
+
+def use_database(database):
+    """Point the handlers, image store and order number allocator at a database"""
+    global db, image_store, order_numbers
+    db = database
+    read_router.bind(database)
+    image_store = create_image_store(database)
+    order_numbers = OrderNumberAllocator(database.counters)
+
+async def connect_database():
+    """Open the pooled client from mongo_settings and pre-warm its connections"""
+    global client
+    # The command listener attributes every Mongo round trip to the route that issued it
+    client = create_client(mongo_settings, event_listeners=[MongoCommandListener(), pool_monitor])
+    use_database(client[DB_NAME])
+    try:
+        elapsed = await warm_pool(client, mongo_settings.warm_connections)
+        logger.info(f"Warmed MongoDB pool in {elapsed * 1000:.0f}ms: {pool_monitor.stats()}")
+    except Exception as e:
+        logger.error(f"MongoDB pool warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    await connect_database()
+    await provision_indexes()
+    app.state.payment_gateway = create_payment_gateway(STRIPE_API_KEY)
+    app.state.webhook_queue = WebhookQueue(db.webhook_events, apply_webhook_events)
+    app.state.webhook_queue.start()
+    try:
+        yield
+    finally:
+        await app.state.webhook_queue.stop()
+        await app.state.payment_gateway.close()
+        if client is not None:
+            client.close()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -59,6 +183,118 @@ def serialize_doc(doc):
         return result
     return doc
 
+# ===================== PRODUCT RESOLUTION =====================
+
+# Pricing paths only need the price, not the full product document
+PRICE_PROJECTION = {"price": 1}
+
+def to_object_id(value):
+    """Parse an ObjectId, returning None for malformed ids"""
+    try:
+        return ObjectId(value)
+    except Exception:
+        return None
+
+async def fetch_products_by_ids(product_ids, projection=None, database=None):
+    """Fetch every requested product with one $in query, keyed by string id"""
+    object_ids = {oid for oid in map(to_object_id, product_ids) if oid is not None}
+    if not object_ids:
+        return {}
+    products = await (database or db).products.find(
+        {"_id": {"$in": list(object_ids)}}, projection
+    ).to_list(len(object_ids))
+    return {str(product["_id"]): product for product in products}
+
+def resolve_product(products, product_id):
+    """Look up a line item's product in a dict from fetch_products_by_ids"""
+    oid = to_object_id(product_id)
+    return products.get(str(oid)) if oid is not None else None
+
+# Checkout snapshots the name and price of every line item
+ORDER_ITEM_PROJECTION = {"name": 1, "price": 1}
+
+def snapshot_order_items(items, products):
+    """Line items priced at checkout time, dropping unknown products"""
+    snapshot = []
+    for item in items:
+        product = resolve_product(products, item.get("product_id"))
+        if not product:
+            continue
+        snapshot.append({
+            **item,
+            "name": product.get("name"),
+            "unit_price": product["price"],
+            "line_total": round(product["price"] * item["quantity"], 2),
+        })
+    return snapshot
+
+def populate_items(items, products):
+    """Attach product details to line items, dropping unknown products"""
+    populated_items = []
+    for item in items:
+        product = resolve_product(products, item.get("product_id"))
+        if product:
+            populated_items.append({**item, "product": product})
+    return populated_items
+
+def invalidate_catalog(product_id=None):
+    """Drop cached catalog reads and search entries affected by a product write"""
+    search_index.mark_dirty(product_id)
+    read_router.wrote(CATALOG)
+    if product_id is None:
+        catalog_cache.invalidate()
+        return
+    catalog_cache.invalidate(lambda k: is_product_key(k, product_id) or is_listing_key(k))
+
+def cache_catalog_views(key_for, content, lang, *extra):
+    """Encode and cache content for lang, returning (body, etag, *extra).
+
+    Localized requests precompute every language's flattened view from the
+    same documents, so switching language is a cache hit too.
+    """
+    entry = None
+    for view_lang in (LANGUAGES if lang else [None]):
+        if isinstance(content, list):
+            view = [localize(dict(doc), view_lang) for doc in content]
+        else:
+            view = localize(dict(content), view_lang)
+        body = encode_json(view)
+        cached = (body, make_etag(body), *extra)
+        catalog_cache.set(key_for(view_lang), cached)
+        if view_lang == lang:
+            entry = cached
+    return entry
+
+def catalog_headers(next_cursor=None):
+    # lang=auto responses differ by Accept-Language
+    return {"Vary": "Accept-Language", **(next_cursor_headers(next_cursor) or {})}
+
+# ===================== PRODUCT IMAGES =====================
+
+def product_image_url(product_id, image_hash):
+    """Versioned URL of a product's image, so clients can cache it forever"""
+    return f"{IMAGE_BASE_URL}/api/products/{product_id}/image?v={image_hash[:16]}"
+
+async def store_product_image(product_id, image):
+    """Move an inline base64 image into the image store, returning the fields that reference it"""
+    try:
+        data, content_type = decode_image_data(image)
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    image_hash = content_hash(data)
+    await image_store.put(image_hash, data, content_type)
+    url = product_image_url(product_id, image_hash)
+    # `image` keeps carrying the URL for clients that read it directly
+    return {"image": url, "image_url": url, "image_hash": image_hash}
+
+def is_inline_image(image):
+    return bool(image) and not image.startswith(("http://", "https://", "/"))
+
+async def release_product_image(image_hash):
+    """Delete a stored image once no product references it any more"""
+    if image_hash and not await db.products.count_documents({"image_hash": image_hash}):
+        await image_store.delete(image_hash)
+
 # ===================== MODELS =====================
 
 class ProductTranslation(BaseModel):
@@ -70,7 +306,7 @@ class ProductCreate(BaseModel):
     description: str
     price: float
     category: str
-    image: Optional[str] = None  # base64 image
+    image: Optional[str] = None  # base64 image, moved into the image store on write
     sizes: List[str] = ["S", "M", "L", "XL"]
     colors: List[str] = ["Black", "White"]
     translations: Optional[Dict[str, ProductTranslation]] = None
@@ -117,23 +353,102 @@ async def root():
     return {"message": "SIERRA 97 SX API", "status": "running"}
 
 @api_router.get("/products")
-async def get_products(category: Optional[str] = None):
-    """Get all products, optionally filtered by category"""
-    query = {}
-    if category:
-        query["category"] = category
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None,
+    lang: Optional[str] = None,
+):
+    """Get products, optionally filtered by category, one keyset page at a time"""
+    lang = resolve_lang(lang, request.headers.get("accept-language"))
+    cache_key = product_list_key(category or None, limit, after, sort, fields, lang)
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        query = {}
+        if category:
+            query["category"] = category
+        
+        try:
+            docs, next_cursor = await fetch_page(
+                read_router.database(CATALOG).products, query, limit, after, descending=sort == "desc",
+                # Translations are needed to flatten the requested fields
+                projection=parse_fields(fields, always=("translations",) if lang else ()),
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        cached = cache_catalog_views(
+            lambda view_lang: product_list_key(category or None, limit, after, sort, fields, view_lang),
+            docs, lang, next_cursor,
+        )
     
-    products = await db.products.find(query).to_list(100)
-    return serialize_doc(products)
+    body, etag, next_cursor = cached
+    return conditional_response(request, body, etag, CATALOG_CACHE_CONTROL, catalog_headers(next_cursor))
+
+def split_values(values):
+    """Facet values from repeated and/or comma separated query parameters"""
+    return [v.strip() for value in values or [] for v in value.split(",") if v.strip()]
+
+@api_router.get("/products/search")
+async def search_products(
+    request: Request,
+    q: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    size: Optional[List[str]] = Query(None),
+    color: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    lang: Optional[str] = None,
+):
+    """Full-text product search with category/size/color/price facets"""
+    lang = resolve_lang(lang, request.headers.get("accept-language"))
+    await search_index.ensure_fresh(read_router.database(CATALOG).products)
+    ids, total, facets = search_index.search(
+        q,
+        filters={"category": split_values(category), "size": split_values(size), "color": split_values(color)},
+        min_price=min_price, max_price=max_price, limit=limit, offset=offset,
+    )
+    results = [localize(dict(search_index.products[pid]), lang) for pid in ids]
+    return MongoJSONResponse(
+        {"total": total, "results": results, "facets": facets}, headers={"Vary": "Accept-Language"}
+    )
+
+@api_router.get("/products/export")
+async def export_products(format: str = Query(NDJSON, pattern="^(ndjson|csv)$")):
+    """Stream the whole catalog as NDJSON or CSV (Admin)"""
+    catalog = read_router.database(CATALOG)
+    cursor = catalog.products.find({}, {"image_hash": 0}).sort("_id", 1).batch_size(BULK_CHUNK_SIZE)
+    
+    async def rows():
+        if format == CSV:
+            yield csv_header()
+        async for product in cursor:
+            yield csv_row(product) if format == CSV else encode_json(product) + b"\n"
+    
+    media_type = "text/csv" if format == CSV else "application/x-ndjson"
+    return StreamingResponse(
+        rows(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
 
 @api_router.get("/products/{product_id}")
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request, lang: Optional[str] = None):
     """Get a single product by ID"""
     try:
-        product = await db.products.find_one({"_id": ObjectId(product_id)})
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-        return serialize_doc(product)
+        oid = ObjectId(product_id)
+        lang = resolve_lang(lang, request.headers.get("accept-language"))
+        cached = catalog_cache.get(product_key(str(oid), lang))
+        if cached is None:
+            product = await read_router.database(CATALOG).products.find_one({"_id": oid})
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            cached = cache_catalog_views(lambda view_lang: product_key(str(oid), view_lang), product, lang)
+        body, etag = cached
+        return conditional_response(request, body, etag, CATALOG_CACHE_CONTROL, catalog_headers())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -141,12 +456,74 @@ async def get_product(product_id: str):
 async def create_product(product: ProductCreate):
     """Create a new product (Admin)"""
     product_dict = product.dict()
+    product_dict["_id"] = ObjectId()
+    if is_inline_image(product_dict["image"]):
+        product_dict.update(await store_product_image(product_dict["_id"], product_dict["image"]))
     product_dict["created_at"] = datetime.utcnow()
     product_dict["updated_at"] = datetime.utcnow()
     
     result = await db.products.insert_one(product_dict)
     product_dict["id"] = str(result.inserted_id)
-    return serialize_doc(product_dict)
+    invalidate_catalog(product_dict["id"])
+    return MongoJSONResponse(product_dict)
+
+@api_router.post("/products/bulk")
+async def bulk_import_products(request: Request, format: Optional[str] = Query(None, pattern="^(ndjson|csv)$")):
+    """Create products from an NDJSON or CSV upload, streamed and inserted in chunks (Admin)"""
+    fmt = detect_format(request.headers.get("content-type"), format)
+    inserted = 0
+    failed = 0
+    errors = []
+    chunk = []
+    
+    def record_error(line, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_BULK_ERRORS:
+            errors.append({"line": line, "error": message})
+    
+    async def flush():
+        nonlocal inserted
+        if not chunk:
+            return
+        docs = [doc for _, doc in chunk]
+        try:
+            result = await db.products.insert_many(docs, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            inserted += len(docs) - len(write_errors)
+            for write_error in write_errors:
+                record_error(chunk[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+        chunk.clear()
+    
+    async for line, record in iter_records(iter_lines(request.stream()), fmt):
+        if isinstance(record, RecordError):
+            record_error(line, str(record))
+            continue
+        try:
+            product = ProductCreate(**record).dict()
+        except ValidationError as e:
+            record_error(line, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        product["_id"] = ObjectId()
+        if is_inline_image(product["image"]):
+            try:
+                product.update(await store_product_image(product["_id"], product["image"]))
+            except HTTPException as e:
+                record_error(line, e.detail)
+                continue
+        product["created_at"] = product["updated_at"] = datetime.utcnow()
+        chunk.append((line, product))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await flush()
+    await flush()
+    
+    if inserted:
+        invalidate_catalog()
+    return {"inserted": inserted, "failed": failed, "errors": errors}
 
 @api_router.put("/products/{product_id}")
 async def update_product(product_id: str, product: ProductUpdate):
@@ -155,16 +532,34 @@ async def update_product(product_id: str, product: ProductUpdate):
         update_data = {k: v for k, v in product.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow()
         
+        previous_hash = None
+        unset = {}
+        image = update_data.get("image")
+        if image is not None:
+            previous = await db.products.find_one({"_id": ObjectId(product_id)}, {"image": 1, "image_hash": 1})
+            if not previous:
+                raise HTTPException(status_code=404, detail="Product not found")
+            if is_inline_image(image):
+                previous_hash = previous.get("image_hash")
+                update_data.update(await store_product_image(product_id, image))
+            elif image != previous.get("image"):
+                # An external URL replaces the stored blob; drop the fields pointing at it
+                previous_hash = previous.get("image_hash")
+                unset = {"image_hash": "", "image_url": ""}
+        
         result = await db.products.update_one(
             {"_id": ObjectId(product_id)},
-            {"$set": update_data}
+            {"$set": update_data, **({"$unset": unset} if unset else {})}
         )
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Product not found")
+        invalidate_catalog(str(ObjectId(product_id)))
+        if previous_hash and previous_hash != update_data.get("image_hash"):
+            await release_product_image(previous_hash)
         
         updated_product = await db.products.find_one({"_id": ObjectId(product_id)})
-        return serialize_doc(updated_product)
+        return MongoJSONResponse(updated_product)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -172,18 +567,190 @@ async def update_product(product_id: str, product: ProductUpdate):
 async def delete_product(product_id: str):
     """Delete a product (Admin)"""
     try:
-        result = await db.products.delete_one({"_id": ObjectId(product_id)})
-        if result.deleted_count == 0:
+        deleted = await db.products.find_one_and_delete(
+            {"_id": ObjectId(product_id)}, projection={"image_hash": 1}
+        )
+        if not deleted:
             raise HTTPException(status_code=404, detail="Product not found")
+        invalidate_catalog(str(ObjectId(product_id)))
+        await release_product_image(deleted.get("image_hash"))
         return {"message": "Product deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.get("/products/{product_id}/image")
+async def get_product_image(product_id: str, request: Request):
+    """Stream a product's image, honouring single byte-range requests"""
+    oid = to_object_id(product_id)
+    product = await db.products.find_one({"_id": oid}, {"image_hash": 1}) if oid else None
+    if not product or not product.get("image_hash"):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    image_hash = product["image_hash"]
+    info = await image_store.stat(image_hash)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{image_hash}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    try:
+        byte_range = parse_range(request.headers.get("range"), info.size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{info.size}"}
+        )
+    
+    if byte_range is None:
+        start, end, status_code = 0, info.size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    return StreamingResponse(
+        image_store.stream(image_hash, start, end),
+        status_code=status_code,
+        media_type=info.content_type,
+        headers=headers,
+    )
+
+@api_router.post("/images/migrate")
+async def migrate_inline_images(batch_size: int = 50):
+    """Move inline base64 images from existing products into the image store (Admin)"""
+    migrated = 0
+    failed = []
+    while True:
+        query = {"image": {"$ne": None}, "image_hash": {"$exists": False}, "_id": {"$nin": failed}}
+        products = await db.products.find(query, {"image": 1}).to_list(batch_size)
+        if not products:
+            break
+        for product in products:
+            if not is_inline_image(product["image"]):
+                # Already an external URL, nothing to move
+                await db.products.update_one({"_id": product["_id"]}, {"$set": {"image_hash": None}})
+                continue
+            try:
+                fields = await store_product_image(product["_id"], product["image"])
+            except HTTPException as e:
+                logger.warning(f"Skipping image of product {product['_id']}: {e.detail}")
+                failed.append(product["_id"])
+                continue
+            await db.products.update_one({"_id": product["_id"]}, {"$set": fields})
+            migrated += 1
+    
+    invalidate_catalog()
+    return {"migrated": migrated, "failed": [str(oid) for oid in failed]}
+
+# Per-category summary in one pass over the products collection
+CATEGORY_SUMMARY_PIPELINE = [
+    {"$match": {"category": {"$nin": [None, ""]}}},
+    {"$group": {
+        "_id": "$category",
+        "product_count": {"$sum": 1},
+        "min_price": {"$min": "$price"},
+        "max_price": {"$max": "$price"},
+        # Distinct size/color lists, merged into one list per category below
+        "sizes": {"$addToSet": "$sizes"},
+        "colors": {"$addToSet": "$colors"},
+    }},
+    {"$sort": {"_id": 1}},
+]
+
+def merge_values(lists):
+    merged = []
+    for values in lists:
+        for value in values or []:
+            if value not in merged:
+                merged.append(value)
+    return merged
+
 @api_router.get("/categories")
-async def get_categories():
-    """Get all unique categories"""
-    categories = await db.products.distinct("category")
-    return categories
+async def get_categories(request: Request):
+    """Get every category with its product count, price range, sizes and colors"""
+    cached = catalog_cache.get(CATEGORIES_KEY)
+    if cached is None:
+        catalog = read_router.database(CATALOG)
+        groups = await catalog.products.aggregate(CATEGORY_SUMMARY_PIPELINE).to_list(None)
+        categories = [
+            {
+                "name": group["_id"],
+                "product_count": group["product_count"],
+                "min_price": group["min_price"],
+                "max_price": group["max_price"],
+                "sizes": merge_values(group["sizes"]),
+                "colors": merge_values(group["colors"]),
+            }
+            for group in groups
+        ]
+        body = encode_json(categories)
+        cached = (body, make_etag(body))
+        catalog_cache.set(CATEGORIES_KEY, cached)
+    
+    body, etag = cached
+    return conditional_response(request, body, etag, CATALOG_CACHE_CONTROL)
+
+def require_profiling_token(request):
+    token = request.headers.get("x-profile-token") or request.query_params.get("profile_token")
+    if not profiling_settings.token_matches(token):
+        raise HTTPException(status_code=404, detail="Not found")
+
+@api_router.get("/debug/profiles")
+async def get_profiles(request: Request, limit: int = Query(50, ge=1, le=500)):
+    """Summaries of recently stored request profiles (requires the profiling token)"""
+    require_profiling_token(request)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, list_profiles, profiling_settings.directory, limit
+    )
+
+@api_router.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, format: str = Query("full", pattern="^(full|speedscope)$")):
+    """One stored profile; format=speedscope returns a file speedscope.app opens (requires the profiling token)"""
+    require_profiling_token(request)
+    document = await asyncio.get_running_loop().run_in_executor(
+        None, load_profile, profiling_settings.directory, profile_id
+    )
+    if document is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return document["speedscope"] if format == "speedscope" else document
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Catalog cache hit/miss/eviction counters"""
+    stats = catalog_cache.stats()
+    stats["compressed_variants"] = compressed_variants.stats()
+    stats["search_index"] = search_index.stats()
+    return stats
+
+@api_router.get("/health")
+async def health():
+    """MongoDB reachability and connection pool usage; 503 when the ping fails"""
+    pool = {
+        "max_pool_size": mongo_settings.max_pool_size,
+        "min_pool_size": mongo_settings.min_pool_size,
+        "servers": pool_monitor.stats(),
+    }
+    routing = read_router.describe()
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), HEALTH_PING_TIMEOUT)
+    except Exception as e:
+        return MongoJSONResponse(
+            {"status": "unavailable", "error": str(e) or type(e).__name__, "pool": pool, "read_routing": routing},
+            status_code=503,
+        )
+    return {
+        "status": "ok",
+        "ping_ms": round((time.perf_counter() - start) * 1000, 3),
+        "pool": pool,
+        "read_routing": routing,
+    }
 
 # ===================== CART ENDPOINTS =====================
 
@@ -192,47 +759,39 @@ async def get_cart(session_id: str):
     """Get cart by session ID"""
     cart = await db.carts.find_one({"session_id": session_id})
     if not cart:
-        # Create empty cart
-        cart = {
-            "session_id": session_id,
-            "items": [],
-            "total": 0.0,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        await db.carts.insert_one(cart)
-    
-    # Populate product details for each item
-    populated_items = []
-    for item in cart.get("items", []):
-        try:
-            product = await db.products.find_one({"_id": ObjectId(item["product_id"])})
-            if product:
-                populated_items.append({
-                    **item,
-                    "product": serialize_doc(product)
-                })
-        except:
-            continue
+        # Carts are created on first write; unknown sessions read as empty
+        return await cart_response(empty_cart(session_id))
     
-    cart["items"] = populated_items
-    return serialize_doc(cart)
+    return await cart_response(cart)
+
+def empty_cart(session_id):
+    now = datetime.utcnow()
+    return {"session_id": session_id, "items": [], "total": 0.0, "created_at": now, "updated_at": now}
+
+async def cart_response(cart):
+    """Cart with product details populated for every item in a single query"""
+    items = cart.get("items", [])
+    products = await fetch_products_by_ids(item.get("product_id") for item in items)
+    cart["items"] = populate_items(items, products)
+    # Totals maintained with $inc can pick up float noise
+    cart["total"] = round(cart.get("total", 0.0), 2)
+    return MongoJSONResponse(cart)
 
 @api_router.post("/cart/{session_id}")
 async def update_cart(session_id: str, cart_update: CartUpdate):
-    """Update cart items"""
+    """Replace all cart items"""
     # Calculate total
     total = 0.0
     items_data = []
     
+    products = await fetch_products_by_ids(
+        (item.product_id for item in cart_update.items), PRICE_PROJECTION
+    )
     for item in cart_update.items:
-        try:
-            product = await db.products.find_one({"_id": ObjectId(item.product_id)})
-            if product:
-                total += product["price"] * item.quantity
-                items_data.append(item.dict())
-        except:
-            continue
+        product = resolve_product(products, item.product_id)
+        if product:
+            total += product["price"] * item.quantity
+            items_data.append({**item.dict(), "unit_price": product["price"]})
     
     cart_data = {
         "session_id": session_id,
@@ -241,13 +800,118 @@ async def update_cart(session_id: str, cart_update: CartUpdate):
         "updated_at": datetime.utcnow()
     }
     
-    result = await db.carts.update_one(
+    cart = await db.carts.find_one_and_update(
         {"session_id": session_id},
         {"$set": cart_data, "$setOnInsert": {"created_at": datetime.utcnow()}},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    return await cart_response(cart)
+
+def cart_line_filter(product_id, size, color):
+    """Identifies one line of a cart: the same product in the same size and color"""
+    return {"product_id": product_id, "size": size, "color": color}
+
+async def cart_line_price(line):
+    """Unit price cached on a cart line, falling back to the product for older carts"""
+    if line.get("unit_price") is not None:
+        return line["unit_price"]
+    products = await fetch_products_by_ids([line["product_id"]], PRICE_PROJECTION)
+    product = resolve_product(products, line["product_id"])
+    return product["price"] if product else 0.0
+
+async def adjust_cart_total(session_id, amount):
+    """Apply a total delta and return the updated cart"""
+    return await db.carts.find_one_and_update(
+        {"session_id": session_id},
+        {"$inc": {"total": amount}, "$set": {"updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+@api_router.post("/cart/{session_id}/items")
+async def add_cart_item(session_id: str, item: CartItem):
+    """Add a quantity of one product/size/color to the cart"""
+    if item.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
+    products = await fetch_products_by_ids([item.product_id], PRICE_PROJECTION)
+    product = resolve_product(products, item.product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    line = cart_line_filter(item.product_id, item.size, item.color)
+    amount = product["price"] * item.quantity
+    now = datetime.utcnow()
     
-    return await get_cart(session_id)
+    # A concurrent first add can win the cart upsert (unique session_id);
+    # retry once against the cart it created, then give up with a 409
+    for _ in range(2):
+        # Existing line: bump its quantity in place, pricing the added units at
+        # the line's stored unit price so later set/remove deltas cancel out exactly
+        before = await db.carts.find_one_and_update(
+            {"session_id": session_id, "items": {"$elemMatch": line}},
+            {"$inc": {"items.$.quantity": item.quantity}, "$set": {"updated_at": now}},
+            projection={"items": {"$elemMatch": line}}
+        )
+        if before is not None:
+            price = await cart_line_price(before["items"][0])
+            cart = await adjust_cart_total(session_id, price * item.quantity)
+            break
+        # New line (creating the cart if needed)
+        try:
+            cart = await db.carts.find_one_and_update(
+                {"session_id": session_id, "items": {"$not": {"$elemMatch": line}}},
+                {
+                    "$push": {"items": {**line, "quantity": item.quantity, "unit_price": product["price"]}},
+                    "$inc": {"total": amount},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            continue
+    else:
+        raise HTTPException(status_code=409, detail="Cart was changed concurrently, please retry")
+    return await cart_response(cart)
+
+@api_router.put("/cart/{session_id}/items")
+async def set_cart_item_quantity(session_id: str, item: CartItem):
+    """Set the quantity of a cart line; zero removes it"""
+    if item.quantity <= 0:
+        return await remove_cart_item(session_id, item.product_id, item.size, item.color)
+    
+    line = cart_line_filter(item.product_id, item.size, item.color)
+    before = await db.carts.find_one_and_update(
+        {"session_id": session_id, "items": {"$elemMatch": line}},
+        {"$set": {"items.$.quantity": item.quantity}},
+        projection={"items": {"$elemMatch": line}}
+    )
+    if before is None:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    
+    previous = before["items"][0]
+    price = await cart_line_price(previous)
+    cart = await adjust_cart_total(session_id, price * (item.quantity - previous["quantity"]))
+    return await cart_response(cart)
+
+@api_router.delete("/cart/{session_id}/items")
+async def remove_cart_item(session_id: str, product_id: str, size: str = "M", color: str = "Black"):
+    """Remove one product/size/color line from the cart"""
+    line = cart_line_filter(product_id, size, color)
+    before = await db.carts.find_one_and_update(
+        {"session_id": session_id, "items": {"$elemMatch": line}},
+        {"$pull": {"items": line}},
+        projection={"items": {"$elemMatch": line}}
+    )
+    if before is None:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    
+    removed = before["items"][0]
+    price = await cart_line_price(removed)
+    cart = await adjust_cart_total(session_id, -price * removed["quantity"])
+    return await cart_response(cart)
 
 @api_router.delete("/cart/{session_id}")
 async def clear_cart(session_id: str):
@@ -260,27 +924,25 @@ async def clear_cart(session_id: str):
 
 # ===================== CHECKOUT ENDPOINTS =====================
 
+def get_payment_gateway(request):
+    """The payment gateway created at startup"""
+    return request.app.state.payment_gateway
+
 @api_router.post("/checkout/create-session")
 async def create_checkout_session(request: Request, checkout_request: CheckoutRequest):
     """Create a Stripe checkout session"""
-    from emergentintegrations.payments.stripe.checkout import (
-        StripeCheckout, CheckoutSessionRequest, CheckoutSessionResponse
-    )
-    
     # Get cart
     cart = await db.carts.find_one({"session_id": checkout_request.session_id})
     if not cart or not cart.get("items"):
         raise HTTPException(status_code=400, detail="Cart is empty")
     
-    # Calculate subtotal from backend (security - don't trust frontend)
-    subtotal = 0.0
-    for item in cart.get("items", []):
-        try:
-            product = await db.products.find_one({"_id": ObjectId(item["product_id"])})
-            if product:
-                subtotal += product["price"] * item["quantity"]
-        except:
-            continue
+    # Price the cart from the backend (security - don't trust frontend)
+    items = cart.get("items", [])
+    products = await fetch_products_by_ids(
+        (item.get("product_id") for item in items), ORDER_ITEM_PROJECTION
+    )
+    order_items = snapshot_order_items(items, products)
+    subtotal = sum(item["line_total"] for item in order_items)
     
     if subtotal <= 0:
         raise HTTPException(status_code=400, detail="Invalid cart total")
@@ -309,18 +971,16 @@ async def create_checkout_session(request: Request, checkout_request: CheckoutRe
     success_url = f"{origin_url}/checkout-success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{origin_url}/cart"
     
-    # Initialize Stripe
     host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    webhook_url = f"{host_url}/api/webhook/stripe"
     
     # Create checkout session
-    checkout_req = CheckoutSessionRequest(
+    session = await get_payment_gateway(request).create_checkout_session(
         amount=float(total),
         currency="usd",
         success_url=success_url,
         cancel_url=cancel_url,
+        webhook_url=webhook_url,
         metadata={
             "cart_session_id": checkout_request.session_id,
             "customer_email": checkout_request.shipping_info.email,
@@ -333,38 +993,16 @@ async def create_checkout_session(request: Request, checkout_request: CheckoutRe
         }
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_req)
-    
-    # Generate order number
-    import random
-    order_number = f"ORD-{random.randint(100000, 999999)}"
-    
-    # Create payment transaction record
-    transaction = {
-        "stripe_session_id": session.session_id,
-        "cart_session_id": checkout_request.session_id,
-        "order_number": order_number,
-        "subtotal": subtotal,
-        "discount_code": checkout_request.discount_code,
-        "discount_amount": discount_amount,
-        "shipping_method": checkout_request.shipping_method,
-        "shipping_cost": shipping_cost,
-        "total": total,
-        "currency": "usd",
-        "status": "pending",
-        "payment_status": "initiated",
-        "shipping_info": checkout_request.shipping_info.dict(),
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
-    await db.payment_transactions.insert_one(transaction)
+    order_number = await order_numbers.allocate()
+    now = datetime.utcnow()
     
-    # Create order record
+    # The order carries the full checkout snapshot
     order = {
+        "_id": ObjectId(),
         "order_number": order_number,
         "cart_session_id": checkout_request.session_id,
         "stripe_session_id": session.session_id,
-        "items": cart.get("items", []),
+        "items": order_items,
         "subtotal": subtotal,
         "discount_code": checkout_request.discount_code,
         "discount_amount": discount_amount,
@@ -373,59 +1011,151 @@ async def create_checkout_session(request: Request, checkout_request: CheckoutRe
         "total": total,
         "shipping_info": checkout_request.shipping_info.dict(),
         "status": "pending",
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
+    }
+    # The payment transaction only tracks the provider session
+    transaction = {
+        "_id": ObjectId(),
+        "stripe_session_id": session.session_id,
+        "cart_session_id": checkout_request.session_id,
+        "order_id": order["_id"],
+        "order_number": order_number,
+        "total": total,
+        "currency": "usd",
+        "status": "pending",
+        "payment_status": "initiated",
+        "created_at": now,
+        "updated_at": now
     }
-    await db.orders.insert_one(order)
+    await insert_order_records(order, transaction)
     
     return {"url": session.url, "session_id": session.session_id, "order_number": order_number}
 
-@api_router.get("/checkout/status/{stripe_session_id}")
-async def get_checkout_status(stripe_session_id: str):
-    """Get checkout session status"""
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY)
+# Transactions need a replica set or sharded cluster. "auto" asks the server once.
+ORDER_TRANSACTIONS = os.environ.get('ORDER_TRANSACTIONS', 'auto').lower()
+_transactions_supported = None
+
+async def transactions_supported():
+    global _transactions_supported
+    if ORDER_TRANSACTIONS in ('on', 'off'):
+        return ORDER_TRANSACTIONS == 'on'
+    if _transactions_supported is None:
+        try:
+            hello = await db.client.admin.command("hello")
+            _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except Exception as e:
+            logger.warning(f"Could not detect transaction support: {e}")
+            _transactions_supported = False
+    return _transactions_supported
+
+async def insert_order_records(order, transaction):
+    """Write an order and its payment transaction together, or neither"""
+    if await transactions_supported():
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                await db.orders.insert_one(order, session=session)
+                await db.payment_transactions.insert_one(transaction, session=session)
+        read_router.wrote(HISTORY)
+        return
     
-    try:
-        status = await stripe_checkout.get_checkout_status(stripe_session_id)
-        
-        # Update payment transaction
-        update_data = {
-            "status": status.status,
-            "payment_status": status.payment_status,
-            "updated_at": datetime.utcnow()
+    # Without transactions: insert both concurrently and undo whichever landed if the other failed
+    results = await asyncio.gather(
+        db.orders.insert_one(order),
+        db.payment_transactions.insert_one(transaction),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        for collection, doc, result in zip((db.orders, db.payment_transactions), (order, transaction), results):
+            if not isinstance(result, Exception):
+                await collection.delete_one({"_id": doc["_id"]})
+        raise errors[0]
+    read_router.wrote(HISTORY)
+
+# A checkout session in one of these states never changes again
+TERMINAL_PAYMENT_STATUSES = {"paid"}
+TERMINAL_SESSION_STATUSES = {"expired"}
+
+def is_terminal_status(status, payment_status):
+    return payment_status in TERMINAL_PAYMENT_STATUSES or status in TERMINAL_SESSION_STATUSES
+
+async def mark_checkouts_paid(stripe_session_ids, fields):
+    """Record paid checkouts on their transactions and orders, and clear their carts"""
+    session_filter = {"stripe_session_id": {"$in": list(stripe_session_ids)}}
+    await db.payment_transactions.update_many(
+        session_filter,
+        {"$set": {**fields, "payment_status": "paid", "updated_at": datetime.utcnow()}}
+    )
+    await db.orders.update_many(
+        session_filter,
+        {"$set": {"status": "paid", "updated_at": datetime.utcnow()}}
+    )
+    read_router.wrote(HISTORY)
+    transactions = await db.payment_transactions.find(
+        session_filter, {"cart_session_id": 1}
+    ).to_list(None)
+    cart_session_ids = [t["cart_session_id"] for t in transactions if t.get("cart_session_id")]
+    if cart_session_ids:
+        await db.carts.update_many(
+            {"session_id": {"$in": cart_session_ids}},
+            {"$set": {"items": [], "total": 0.0, "updated_at": datetime.utcnow()}}
+        )
+
+async def refresh_checkout_status(gateway, stripe_session_id):
+    """Answer terminal sessions from our record, otherwise ask the provider"""
+    transaction = await db.payment_transactions.find_one(
+        {"stripe_session_id": stripe_session_id},
+        {"status": 1, "payment_status": 1, "amount_total": 1, "total": 1, "currency": 1}
+    )
+    if transaction and is_terminal_status(transaction.get("status"), transaction.get("payment_status")):
+        amount_total = transaction.get("amount_total")
+        if amount_total is None:
+            amount_total = int(round(transaction.get("total", 0) * 100))
+        return {
+            "status": transaction.get("status"),
+            "payment_status": transaction.get("payment_status"),
+            "amount_total": amount_total,
+            "currency": transaction.get("currency")
         }
-        
+    
+    status = await gateway.get_checkout_status(stripe_session_id)
+    
+    update_data = {"status": status.status, "amount_total": status.amount_total}
+    if status.payment_status == "paid":
+        await mark_checkouts_paid([stripe_session_id], update_data)
+    elif transaction and (transaction.get("status"), transaction.get("payment_status")) != (status.status, status.payment_status):
+        # Only write when the provider reports a change
         await db.payment_transactions.update_one(
             {"stripe_session_id": stripe_session_id},
-            {"$set": update_data}
+            {"$set": {**update_data, "payment_status": status.payment_status, "updated_at": datetime.utcnow()}}
+        )
+    
+    return {
+        "status": status.status,
+        "payment_status": status.payment_status,
+        "amount_total": status.amount_total,
+        "currency": status.currency
+    }
+
+@api_router.get("/checkout/status/{stripe_session_id}")
+async def get_checkout_status(stripe_session_id: str, request: Request):
+    """Get checkout session status"""
+    cached = checkout_status_cache.get(stripe_session_id)
+    if cached is not None:
+        return cached
+    
+    gateway = get_payment_gateway(request)
+    try:
+        result = await checkout_status_lookups.do(
+            stripe_session_id, lambda: refresh_checkout_status(gateway, stripe_session_id)
         )
-        
-        # If paid, update order status
-        if status.payment_status == "paid":
-            await db.orders.update_one(
-                {"stripe_session_id": stripe_session_id},
-                {"$set": {"status": "paid", "updated_at": datetime.utcnow()}}
-            )
-            
-            # Clear the cart
-            transaction = await db.payment_transactions.find_one({"stripe_session_id": stripe_session_id})
-            if transaction:
-                await db.carts.update_one(
-                    {"session_id": transaction.get("cart_session_id")},
-                    {"$set": {"items": [], "total": 0.0, "updated_at": datetime.utcnow()}}
-                )
-        
-        return {
-            "status": status.status,
-            "payment_status": status.payment_status,
-            "amount_total": status.amount_total,
-            "currency": status.currency
-        }
     except Exception as e:
         logger.error(f"Error checking checkout status: {e}")
         raise HTTPException(status_code=400, detail=str(e))
+    
+    checkout_status_cache.set(stripe_session_id, result)
+    return result
 
 @api_router.get("/payment-transaction/{stripe_session_id}")
 async def get_payment_transaction(stripe_session_id: str):
@@ -434,76 +1164,207 @@ async def get_payment_transaction(stripe_session_id: str):
         transaction = await db.payment_transactions.find_one({"stripe_session_id": stripe_session_id})
         if not transaction:
             raise HTTPException(status_code=404, detail="Transaction not found")
-        return serialize_doc(transaction)
+        return MongoJSONResponse(transaction)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+async def apply_webhook_events(events):
+    """Apply a batch of queued webhook events to transactions, orders and carts"""
+    paid = {event["session_id"] for event in events if event.get("payment_status") == "paid"}
+    if paid:
+        await mark_checkouts_paid(paid, {"status": "complete"})
+        checkout_status_cache.invalidate(lambda key: key in paid)
+
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
-    """Handle Stripe webhooks"""
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
-    
+    """Verify a Stripe webhook and queue it for the background worker"""
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY)
-    
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        # Update transaction and order based on webhook
-        if webhook_response.payment_status == "paid":
-            await db.payment_transactions.update_one(
-                {"stripe_session_id": webhook_response.session_id},
-                {"$set": {
-                    "status": "complete",
-                    "payment_status": "paid",
-                    "updated_at": datetime.utcnow()
-                }}
-            )
-            
-            await db.orders.update_one(
-                {"stripe_session_id": webhook_response.session_id},
-                {"$set": {"status": "paid", "updated_at": datetime.utcnow()}}
-            )
-        
-        return {"received": True}
+        webhook_response = await get_payment_gateway(request).handle_webhook(body, signature)
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
+    
+    await request.app.state.webhook_queue.enqueue(webhook_response, body.decode("utf-8", "replace"))
+    return {"received": True}
+
+@api_router.get("/webhook/metrics")
+async def get_webhook_metrics(request: Request):
+    """Webhook queue depth, processing lag and counters"""
+    return await request.app.state.webhook_queue.metrics()
 
 # ===================== ORDERS ENDPOINTS =====================
 
+async def fetch_orders_page(query, limit, after, sort, fields, database=None):
+    """Fetch a page of orders sorted by created_at, returning (orders, next_cursor)"""
+    try:
+        return await fetch_page(
+            (database or read_router.database(HISTORY)).orders, query, limit, after,
+            descending=sort == "desc", sort_field="created_at",
+            projection=parse_fields(fields, always=("created_at",)),
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @api_router.get("/orders")
-async def get_orders():
-    """Get all orders (Admin)"""
-    orders = await db.orders.find().sort("created_at", -1).to_list(100)
-    return serialize_doc(orders)
+async def get_orders(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None,
+):
+    """Get all orders, newest first by default (Admin)"""
+    orders, next_cursor = await fetch_orders_page({}, limit, after, sort, fields)
+    return MongoJSONResponse(orders, headers=next_cursor_headers(next_cursor))
+
+def utc_naive(value):
+    """Stored timestamps are naive UTC; convert aware query datetimes to match"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def order_range_query(start, end, status):
+    """Orders created in [start, end), optionally with one status ("all" for any)"""
+    query = {}
+    created = {}
+    if start is not None:
+        created["$gte"] = utc_naive(start)
+    if end is not None:
+        created["$lt"] = utc_naive(end)
+    if created:
+        query["created_at"] = created
+    if status and status != "all":
+        query["status"] = status
+    return query
+
+@api_router.get("/orders/export")
+async def export_orders(
+    format: str = Query(NDJSON, pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: str = "all",
+):
+    """Stream orders created in [start, end) as NDJSON or CSV, oldest first (Admin)"""
+    query = order_range_query(start, end, status)
+    projection = ORDER_CSV_PROJECTION if format == CSV else None
+    history = read_router.database(HISTORY)
+    cursor = history.orders.find(query, projection).sort(
+        [("created_at", 1), ("_id", 1)]
+    ).batch_size(BULK_CHUNK_SIZE)
+    
+    async def rows():
+        if format == CSV:
+            yield csv_header(ORDER_CSV_FIELDS)
+        async for order in cursor:
+            yield order_csv_row(order) if format == CSV else encode_json(order) + b"\n"
+    
+    media_type = "text/csv" if format == CSV else "application/x-ndjson"
+    return StreamingResponse(
+        rows(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+# UTC offsets such as +02:00 or -0530, which $dateToString accepts besides Olson names
+UTC_OFFSET = re.compile(r"^[+-]\d{2}(:?\d{2})?$")
+
+def valid_timezone(tz):
+    if UTC_OFFSET.match(tz):
+        return True
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+def order_stats_pipeline(query, tz):
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": tz}},
+            "orders": {"$sum": 1},
+            "revenue": {"$sum": "$total"},
+            "discounted_orders": {"$sum": {"$cond": [{"$gt": ["$discount_amount", 0]}, 1, 0]}},
+            "discount_total": {"$sum": {"$ifNull": ["$discount_amount", 0]}},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+def summarize_orders(orders, revenue, discounted_orders, discount_total):
+    return {
+        "orders": orders,
+        "revenue": round(revenue, 2),
+        "average_order_value": round(revenue / orders, 2) if orders else 0.0,
+        "discounted_orders": discounted_orders,
+        "discount_total": round(discount_total, 2),
+        "discount_usage_rate": round(discounted_orders / orders, 4) if orders else 0.0,
+    }
+
+@api_router.get("/orders/stats")
+async def get_order_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: str = "paid",
+    tz: str = "UTC",
+):
+    """Revenue, order count, average order value and discount usage per day (Admin)"""
+    if not valid_timezone(tz):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+    query = order_range_query(start, end, status)
+    history = read_router.database(HISTORY)
+    days = await history.orders.aggregate(order_stats_pipeline(query, tz)).to_list(None)
+    
+    totals = [0, 0.0, 0, 0.0]
+    for day in days:
+        for i, key in enumerate(("orders", "revenue", "discounted_orders", "discount_total")):
+            totals[i] += day[key]
+    return MongoJSONResponse({
+        "start": utc_naive(start),
+        "end": utc_naive(end),
+        "status": status,
+        "timezone": tz,
+        "days": [
+            {"date": day["_id"], **summarize_orders(
+                day["orders"], day["revenue"], day["discounted_orders"], day["discount_total"]
+            )}
+            for day in days
+        ],
+        "totals": summarize_orders(*totals),
+    })
 
 @api_router.get("/orders/session/{session_id}")
-async def get_orders_by_session(session_id: str):
+async def get_orders_by_session(
+    session_id: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None,
+    lang: Optional[str] = None,
+):
     """Get orders by cart session ID (for user's order history)"""
-    orders = await db.orders.find({"cart_session_id": session_id}).sort("created_at", -1).to_list(100)
+    # A shopper's own orders come from the primary: they have usually just
+    # checked out, possibly through another worker than the one serving this
+    orders, next_cursor = await fetch_orders_page(
+        {"cart_session_id": session_id}, limit, after, sort, fields, database=db
+    )
     
-    # Populate product details for each order
+    # Populate product details across all orders with a single query
+    products = await fetch_products_by_ids(
+        (item.get("product_id") for order in orders for item in order.get("items", [])),
+        database=read_router.database(HISTORY),
+    )
+    lang = resolve_lang(lang, request.headers.get("accept-language"))
+    for product in products.values():
+        localize(product, lang)
     for order in orders:
         if "items" in order:
-            populated_items = []
-            for item in order["items"]:
-                try:
-                    product = await db.products.find_one({"_id": ObjectId(item["product_id"])})
-                    if product:
-                        populated_items.append({
-                            **item,
-                            "product": serialize_doc(product)
-                        })
-                except:
-                    continue
-            order["items"] = populated_items
-    
-    return serialize_doc(orders)
+            order["items"] = populate_items(order["items"], products)
+    
+    return MongoJSONResponse(orders, headers=catalog_headers(next_cursor))
 
 @api_router.get("/orders/{order_id}")
 async def get_order(order_id: str):
@@ -512,7 +1373,7 @@ async def get_order(order_id: str):
         order = await db.orders.find_one({"_id": ObjectId(order_id)})
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-        return serialize_doc(order)
+        return MongoJSONResponse(order)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -531,11 +1392,16 @@ SHIPPING_METHODS = {
     "express": {"name": "Express Shipping (2-3 days)", "price": 25.0},
     "overnight": {"name": "Overnight Shipping (1 day)", "price": 50.0},
 }
+SHIPPING_METHODS_BODY = encode_json(SHIPPING_METHODS)
+SHIPPING_METHODS_ETAG = make_etag(SHIPPING_METHODS_BODY)
 
 @api_router.get("/shipping-methods")
-async def get_shipping_methods():
+async def get_shipping_methods(request: Request):
     """Get available shipping methods"""
-    return SHIPPING_METHODS
+    # Only changes with a deploy, so clients may keep it for an hour
+    return conditional_response(
+        request, SHIPPING_METHODS_BODY, SHIPPING_METHODS_ETAG, "public, max-age=3600"
+    )
 
 @api_router.post("/validate-discount")
 async def validate_discount(code: str):
@@ -653,19 +1519,36 @@ async def seed_products():
     ]
     
     result = await db.products.insert_many(products)
+    invalidate_catalog()
     return {"message": "Products seeded successfully", "count": len(result.inserted_ids)}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(CompressionMiddleware, settings=compression_settings, variants=compressed_variants)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+app.add_middleware(ProfilingMiddleware, settings=profiling_settings)
+
+# Outermost, so request latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request and Mongo metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+async def provision_indexes():
+    """Create the indexes declared in indexes.py (report only with INDEX_DRY_RUN=1)"""
+    try:
+        await ensure_indexes(db, dry_run=INDEX_DRY_RUN)
+    except Exception as e:
+        logger.error(f"Index provisioning failed: {e}")
@@ -0,0 +1,29 @@
+"""
+Coalesce concurrent calls for the same key into one in-flight task, so a
+burst of identical requests costs a single upstream call.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """Await fn() once per key; callers arriving while it runs share its result"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield so one cancelled caller doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+    def inflight(self):
+        return len(self._inflight)
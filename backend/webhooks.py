@@ -0,0 +1,188 @@
+"""
+Durable webhook ingestion.
+
+The webhook endpoint only verifies the signature and persists the event to
+the webhook_events collection, keyed by the provider's event id so retries
+are deduplicated, then acknowledges. A background worker claims pending
+events in batches and hands them to an apply callback. Events survive
+restarts; a claimed batch whose worker died is picked up again once its lease
+expires, so the apply callback must be idempotent. Processed events are
+expired by a TTL index on processed_at (see indexes.py).
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+PROCESSED = "processed"
+FAILED = "failed"
+
+
+class WebhookQueue:
+    def __init__(self, collection, apply_batch, batch_size=None, poll_interval=None,
+                 lease_seconds=None, max_attempts=None):
+        env = os.environ
+        self.collection = collection
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size or int(env.get('WEBHOOK_BATCH_SIZE', '100'))
+        self.poll_interval = poll_interval or float(env.get('WEBHOOK_POLL_SECONDS', '5'))
+        self.lease_seconds = lease_seconds or float(env.get('WEBHOOK_LEASE_SECONDS', '60'))
+        self.max_attempts = max_attempts or int(env.get('WEBHOOK_MAX_ATTEMPTS', '5'))
+        self.worker_id = uuid.uuid4().hex
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.received = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.failures = 0
+        self.batches = 0
+        self.last_lag_seconds = None
+        self.max_lag_seconds = 0.0
+
+    async def enqueue(self, event, payload=None):
+        """Persist a verified event; returns False if it was already received"""
+        event_id = event.event_id or f"{event.session_id}:{event.event_type}:{event.payment_status}"
+        try:
+            await self.collection.insert_one({
+                "_id": event_id,
+                "event_type": event.event_type,
+                "session_id": event.session_id,
+                "payment_status": event.payment_status,
+                "metadata": event.metadata,
+                "payload": payload,
+                "status": PENDING,
+                "attempts": 0,
+                "received_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return False
+        self.received += 1
+        self._wakeup.set()
+        return True
+
+    async def _claim_batch(self):
+        now = datetime.utcnow()
+        claimable = {"$or": [
+            {"status": PENDING},
+            {"status": PROCESSING, "claimed_at": {"$lt": now - timedelta(seconds=self.lease_seconds)}},
+        ]}
+        candidates = await self.collection.find(claimable, {"_id": 1}).sort(
+            "received_at", 1
+        ).to_list(self.batch_size)
+        if not candidates:
+            return []
+        ids = [doc["_id"] for doc in candidates]
+        await self.collection.update_many(
+            {"$and": [{"_id": {"$in": ids}}, claimable]},
+            {"$set": {"status": PROCESSING, "claimed_by": self.worker_id, "claimed_at": now},
+             "$inc": {"attempts": 1}},
+        )
+        return await self.collection.find(
+            {"_id": {"$in": ids}, "status": PROCESSING, "claimed_by": self.worker_id}
+        ).sort("received_at", 1).to_list(len(ids))
+
+    async def process_batch(self):
+        """Claim and apply one batch; returns the number of events handled"""
+        events = await self._claim_batch()
+        if not events:
+            return 0
+        ids = [event["_id"] for event in events]
+        try:
+            await self.apply_batch(events)
+        except Exception as e:
+            logger.error(f"Webhook batch failed ({len(events)} events): {e}")
+            self.failures += len(events)
+            retry = [event["_id"] for event in events if event.get("attempts", 0) < self.max_attempts]
+            given_up = [i for i in ids if i not in retry]
+            if retry:
+                await self.collection.update_many(
+                    {"_id": {"$in": retry}}, {"$set": {"status": PENDING, "last_error": str(e)}}
+                )
+            if given_up:
+                await self.collection.update_many(
+                    {"_id": {"$in": given_up}}, {"$set": {"status": FAILED, "last_error": str(e)}}
+                )
+            raise
+
+        now = datetime.utcnow()
+        await self.collection.update_many(
+            {"_id": {"$in": ids}}, {"$set": {"status": PROCESSED, "processed_at": now}}
+        )
+        lags = [(now - event["received_at"]).total_seconds() for event in events]
+        self.last_lag_seconds = round(max(lags), 3)
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        self.processed += len(events)
+        self.batches += 1
+        return len(events)
+
+    async def drain(self):
+        """Process batches until nothing is claimable"""
+        total = 0
+        while True:
+            handled = await self.process_batch()
+            if not handled:
+                return total
+            total += handled
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            # Clear before draining so an event enqueued mid-drain still wakes us
+            self._wakeup.clear()
+            try:
+                await self.drain()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook worker error: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def metrics(self):
+        depth = await self.collection.count_documents({"status": {"$in": [PENDING, PROCESSING]}})
+        oldest = await self.collection.find(
+            {"status": {"$in": [PENDING, PROCESSING]}}, {"received_at": 1}
+        ).sort("received_at", 1).to_list(1)
+        oldest_age = None
+        if oldest:
+            oldest_age = round((datetime.utcnow() - oldest[0]["received_at"]).total_seconds(), 3)
+        return {
+            "queue_depth": depth,
+            "oldest_pending_age_seconds": oldest_age,
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "failures": self.failures,
+            "batches": self.batches,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "worker_running": self._task is not None and not self._task.done(),
+        }
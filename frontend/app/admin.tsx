@@ -18,6 +18,7 @@ import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { Ionicons } from '@expo/vector-icons';
 import * as ImagePicker from 'expo-image-picker';
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import { imageUri } from '../src/lib/imageUri';
 
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
 
@@ -101,7 +102,7 @@ export default function AdminScreen() {
 
     const fetchProducts = async () => {
         try {
-            const response = await fetch(`${API_URL}/api/products`);
+            const response = await fetch(`${API_URL}/api/products`, { cache: 'no-store' });
             const data = await response.json();
             setProducts(data);
         } catch (error) {
@@ -353,7 +354,7 @@ export default function AdminScreen() {
                             <View style={styles.productImageContainer}>
                                 {(product.images?.[0] || product.image) ? (
                                     <Image
-                                        source={{ uri: product.images?.[0] || product.image }}
+                                        source={{ uri: imageUri(product.images?.[0] || product.image) }}
                                         style={styles.productImage}
                                     />
                                 ) : (
@@ -421,7 +422,7 @@ export default function AdminScreen() {
                                 <View style={styles.imagesRow}>
                                     {form.images.map((img, index) => (
                                         <View key={index} style={styles.imageThumb}>
-                                            <Image source={{ uri: img }} style={styles.thumbImage} />
+                                            <Image source={{ uri: imageUri(img) }} style={styles.thumbImage} />
                                             <TouchableOpacity
                                                 style={styles.removeImageBtn}
                                                 onPress={() => removeImage(index)}
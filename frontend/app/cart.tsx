@@ -13,6 +13,7 @@ import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { AppHeader } from '../src/components/AppHeader';
 import { useCartStore } from '../src/store/cartStore';
 import { useLanguageStore } from '../src/store/languageStore';
+import { imageUri } from '../src/lib/imageUri';
 
 const placeholderImages: Record<string, string> = {
     'Hoodies': 'https://images.unsplash.com/photo-1556821840-3a63f95609a7?w=400',
@@ -45,14 +46,11 @@ export default function CartScreen() {
     const getProductImage = (item: any) => {
         // Check for multiple images first
         if (item.product?.images && item.product.images.length > 0) {
-            return { uri: item.product.images[0] };
+            return { uri: imageUri(item.product.images[0]) };
         }
         // Fallback to single image
-        if (item.product?.image && item.product.image.startsWith('data:')) {
-            return { uri: item.product.image };
-        }
         if (item.product?.image) {
-            return { uri: item.product.image };
+            return { uri: imageUri(item.product.image) };
         }
         const category = item.product?.category || 'T-Shirts';
         return { uri: placeholderImages[category] || placeholderImages['T-Shirts'] };
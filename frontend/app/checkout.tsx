@@ -15,6 +15,7 @@ import {
 import { router } from 'expo-router';
 import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { useCartStore } from '../src/store/cartStore';
+import { fetchJsonCached } from '../src/lib/cachedFetch';
 
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
 
@@ -59,8 +60,7 @@ export default function CheckoutScreen() {
 
     const fetchShippingMethods = async () => {
         try {
-            const response = await fetch(`${API_URL}/api/shipping-methods`);
-            const data = await response.json();
+            const data = await fetchJsonCached(`${API_URL}/api/shipping-methods`);
             setShippingMethods(data);
         } catch (error) {
             console.error('Failed to fetch shipping methods:', error);
@@ -13,6 +13,7 @@ import { router } from 'expo-router';
 import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { useCartStore } from '../src/store/cartStore';
 import { AppHeader } from '../src/components/AppHeader';
+import { imageUri } from '../src/lib/imageUri';
 
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
 
@@ -143,7 +144,7 @@ export default function OrdersScreen() {
                                         <View key={index} style={styles.orderItem}>
                                             {item.product?.image && (
                                                 <Image
-                                                    source={{ uri: item.product.image }}
+                                                    source={{ uri: imageUri(item.product.image) }}
                                                     style={styles.itemImage}
                                                     resizeMode="cover"
                                                 />
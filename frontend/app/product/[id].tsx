@@ -17,6 +17,8 @@ import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { AppHeader } from '../../src/components/AppHeader';
 import { useCartStore } from '../../src/store/cartStore';
 import { useLanguageStore } from '../../src/store/languageStore';
+import { fetchJsonCached } from '../../src/lib/cachedFetch';
+import { imageUri } from '../../src/lib/imageUri';
 
 const { width } = Dimensions.get('window');
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
@@ -57,12 +59,11 @@ export default function ProductDetailScreen() {
 
     useEffect(() => {
         fetchProduct();
-    }, [id]);
+    }, [id, language]);
 
     const fetchProduct = async () => {
         try {
-            const response = await fetch(`${API_URL}/api/products/${id}`);
-            const data = await response.json();
+            const data = await fetchJsonCached(`${API_URL}/api/products/${id}?lang=${language}`);
             setProduct(data);
             if (data.sizes?.length > 0) setSelectedSize(data.sizes[0]);
             if (data.colors?.length > 0) setSelectedColor(data.colors[0]);
@@ -94,10 +95,10 @@ export default function ProductDetailScreen() {
     const getProductImages = (): string[] => {
         if (!product) return [];
         if (product.images && product.images.length > 0) {
-            return product.images;
+            return product.images.map(imageUri);
         }
         if (product.image) {
-            return [product.image];
+            return [imageUri(product.image)];
         }
         return [placeholderImages[product.category] || placeholderImages['T-Shirts']];
     };
@@ -130,8 +131,9 @@ export default function ProductDetailScreen() {
         );
     }
 
-    const displayName = product.translations?.[language]?.name || product.name;
-    const displayDescription = product.translations?.[language]?.description || product.description;
+    // Already localized by the API (?lang=)
+    const displayName = product.name;
+    const displayDescription = product.description;
     const images = getProductImages();
 
     return (
@@ -13,6 +13,8 @@ import {
 import { useLocalSearchParams, router } from 'expo-router';
 import { AppHeader } from '../src/components/AppHeader';
 import { useLanguageStore } from '../src/store/languageStore';
+import { fetchJsonCached } from '../src/lib/cachedFetch';
+import { imageUri } from '../src/lib/imageUri';
 
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
 
@@ -36,13 +38,19 @@ const placeholderImages = [
     'https://images.unsplash.com/photo-1515886657613-9f3515b0c78f?w=800',
 ];
 
-const categories = ['All', 'Hoodies', 'T-Shirts', 'Pants', 'Jackets'];
+const defaultCategories = ['Hoodies', 'T-Shirts', 'Pants', 'Jackets'];
+
+interface CategorySummary {
+    name: string;
+    product_count: number;
+}
 
 export default function ShopScreen() {
     const { width } = useWindowDimensions();
     const params = useLocalSearchParams();
     const [products, setProducts] = useState<Product[]>([]);
     const [loading, setLoading] = useState(true);
+    const [categoryNames, setCategoryNames] = useState<string[]>(defaultCategories);
     const [selectedCategory, setSelectedCategory] = useState(
         (params.category as string) || 'All'
     );
@@ -52,12 +60,26 @@ export default function ShopScreen() {
 
     useEffect(() => {
         fetchProducts();
+    }, [language]);
+
+    useEffect(() => {
+        fetchCategories();
     }, []);
 
+    const fetchCategories = async () => {
+        try {
+            const data: CategorySummary[] = await fetchJsonCached(`${API_URL}/api/categories`);
+            setCategoryNames(data.filter(c => c.product_count > 0).map(c => c.name));
+        } catch (error) {
+            console.error('Failed to fetch categories:', error);
+        }
+    };
+
+    const categories = ['All', ...categoryNames];
+
     const fetchProducts = async () => {
         try {
-            const response = await fetch(`${API_URL}/api/products`);
-            const data = await response.json();
+            const data = await fetchJsonCached(`${API_URL}/api/products?lang=${language}`);
             setProducts(data);
         } catch (error) {
             console.error('Failed to fetch products:', error);
@@ -72,20 +94,16 @@ export default function ShopScreen() {
 
     const getProductImage = (product: Product, index: number) => {
         if (product.images && product.images.length > 0) {
-            return { uri: product.images[0] };
-        }
-        if (product.image && product.image.startsWith('data:')) {
-            return { uri: product.image };
+            return { uri: imageUri(product.images[0]) };
         }
         if (product.image) {
-            return { uri: product.image };
+            return { uri: imageUri(product.image) };
         }
         return { uri: placeholderImages[index % placeholderImages.length] };
     };
 
-    const getProductName = (product: Product) => {
-        return product.translations?.[language]?.name || product.name;
-    };
+    // The API returns products already flattened to the app language
+    const getProductName = (product: Product) => product.name;
 
     return (
         <View style={styles.container}>
@@ -2,6 +2,7 @@ import React from 'react';
 import { View, Text, TouchableOpacity, StyleSheet, Image, Platform } from 'react-native';
 import { router } from 'expo-router';
 import { useLanguageStore } from '../store/languageStore';
+import { imageUri } from '../lib/imageUri';
 
 interface Product {
   id: string;
@@ -31,8 +32,8 @@ export const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
   // Get translated name or fallback to default
   const displayName = product.translations?.[language]?.name || product.name;
   
-  const imageSource = product.image 
-    ? (product.image.startsWith('data:') ? { uri: product.image } : { uri: product.image })
+  const imageSource = product.image
+    ? { uri: imageUri(product.image) }
     : { uri: placeholderImages[product.category] || placeholderImages['T-Shirts'] };
 
   const handlePress = () => {
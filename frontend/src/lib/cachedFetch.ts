@@ -0,0 +1,19 @@
+// GET JSON with ETag revalidation: the last response for each URL is kept in
+// memory and a 304 from the API reuses it instead of downloading it again.
+const cache = new Map<string, { etag: string; data: any }>();
+
+export async function fetchJsonCached(url: string): Promise<any> {
+  const cached = cache.get(url);
+  const response = await fetch(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (response.ok && etag) {
+    cache.set(url, { etag, data });
+  }
+  return data;
+}
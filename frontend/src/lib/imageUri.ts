@@ -0,0 +1,7 @@
+const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
+
+// Images moved into the image store are served by the API under a relative
+// /api/... path; resolve those against the backend, not the app's origin.
+export function imageUri(image: string): string {
+  return image.startsWith('/') ? `${API_URL}${image}` : image;
+}
@@ -66,6 +66,7 @@ export const useCartStore = create<CartState>((set, get) => ({
     set({ isLoading: true });
     try {
       const response = await fetch(`${API_URL}/api/cart/${sessionId}`);
+      if (!response.ok) throw new Error(`Cart request failed: ${response.status}`);
       const data = await response.json();
       set({ 
         items: data.items || [], 
@@ -79,38 +80,17 @@ export const useCartStore = create<CartState>((set, get) => ({
   },
 
   addItem: async (newItem: CartItem) => {
-    const { sessionId, items } = get();
+    const { sessionId } = get();
     if (!sessionId) return;
 
-    // Check if item already exists
-    const existingIndex = items.findIndex(
-      item => item.product_id === newItem.product_id && 
-              item.size === newItem.size && 
-              item.color === newItem.color
-    );
-
-    let updatedItems: CartItem[];
-    if (existingIndex >= 0) {
-      updatedItems = items.map((item, index) => 
-        index === existingIndex 
-          ? { ...item, quantity: item.quantity + newItem.quantity }
-          : item
-      );
-    } else {
-      updatedItems = [...items, newItem];
-    }
-
-    // Send to API
     try {
-      const response = await fetch(`${API_URL}/api/cart/${sessionId}`, {
+      const { product_id, quantity, size, color } = newItem;
+      const response = await fetch(`${API_URL}/api/cart/${sessionId}/items`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
-          items: updatedItems.map(({ product_id, quantity, size, color }) => ({
-            product_id, quantity, size, color
-          }))
-        }),
+        body: JSON.stringify({ product_id, quantity, size, color }),
       });
+      if (!response.ok) throw new Error(`Cart request failed: ${response.status}`);
       const data = await response.json();
       set({ items: data.items || [], total: data.total || 0 });
     } catch (error) {
@@ -119,25 +99,18 @@ export const useCartStore = create<CartState>((set, get) => ({
   },
 
   updateQuantity: async (productId: string, size: string, color: string, quantity: number) => {
-    const { sessionId, items } = get();
+    const { sessionId } = get();
     if (!sessionId) return;
 
-    const updatedItems = items.map(item => 
-      (item.product_id === productId && item.size === size && item.color === color)
-        ? { ...item, quantity: Math.max(1, quantity) }
-        : item
-    );
-
     try {
-      const response = await fetch(`${API_URL}/api/cart/${sessionId}`, {
-        method: 'POST',
+      const response = await fetch(`${API_URL}/api/cart/${sessionId}/items`, {
+        method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
-          items: updatedItems.map(({ product_id, quantity, size, color }) => ({
-            product_id, quantity, size, color
-          }))
+          product_id: productId, quantity: Math.max(1, quantity), size, color
         }),
       });
+      if (!response.ok) throw new Error(`Cart request failed: ${response.status}`);
       const data = await response.json();
       set({ items: data.items || [], total: data.total || 0 });
     } catch (error) {
@@ -146,23 +119,15 @@ export const useCartStore = create<CartState>((set, get) => ({
   },
 
   removeItem: async (productId: string, size: string, color: string) => {
-    const { sessionId, items } = get();
+    const { sessionId } = get();
     if (!sessionId) return;
 
-    const updatedItems = items.filter(item => 
-      !(item.product_id === productId && item.size === size && item.color === color)
-    );
-
+    const params = new URLSearchParams({ product_id: productId, size, color });
     try {
-      const response = await fetch(`${API_URL}/api/cart/${sessionId}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
-          items: updatedItems.map(({ product_id, quantity, size, color }) => ({
-            product_id, quantity, size, color
-          }))
-        }),
+      const response = await fetch(`${API_URL}/api/cart/${sessionId}/items?${params}`, {
+        method: 'DELETE',
       });
+      if (!response.ok) throw new Error(`Cart request failed: ${response.status}`);
       const data = await response.json();
       set({ items: data.items || [], total: data.total || 0 });
     } catch (error) {
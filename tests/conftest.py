@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "sierra97_test")
+
+from tests.fakes import FakeDatabase  # noqa: E402
+
+
+@pytest.fixture
+def fake_db(monkeypatch, tmp_path):
+    import server
+    from image_store import LocalDiskImageStore
+
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "catalog_cache", server.CatalogCache())
+    monkeypatch.setattr(server, "search_index", server.ProductSearchIndex())
+    read_router = server.ReadRouter()
+    read_router.bind(db)
+    monkeypatch.setattr(server, "read_router", read_router)
+    monkeypatch.setattr(server, "_transactions_supported", False)
+    monkeypatch.setattr(server, "order_numbers", server.OrderNumberAllocator(db.counters))
+    monkeypatch.setattr(server, "checkout_status_cache", server.CatalogCache(ttl_seconds=60))
+    monkeypatch.setattr(server, "image_store", LocalDiskImageStore(tmp_path / "images"))
+    return db
+
+
+@pytest.fixture
+def run():
+    return asyncio.run
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    import server
+    from payments import FakeGateway
+
+    fake = FakeGateway()
+    monkeypatch.setattr(server.app.state, "payment_gateway", fake, raising=False)
+    return fake
+
+
+@pytest.fixture
+def webhook_queue(monkeypatch, fake_db):
+    import server
+    from webhooks import WebhookQueue
+
+    queue = WebhookQueue(fake_db.webhook_events, server.apply_webhook_events, batch_size=10)
+    monkeypatch.setattr(server.app.state, "webhook_queue", queue, raising=False)
+    return queue
+
+
+def make_request(path="/", headers=None, query_string=b"", method="GET", body=b""):
+    """Minimal Starlette request for calling handlers directly"""
+    import server
+    from starlette.requests import Request
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "root_path": "",
+        "app": server.app,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def read_body(response):
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+    return b"".join(chunks)
+
+
+def json_body(response):
+    # 304 Not Modified responses have no body
+    return json.loads(response.body) if response.body else None
+
+
+async def call_json(handler, *args, **kwargs):
+    """Await a handler returning a JSON response and decode its body"""
+    return json_body(await handler(*args, **kwargs))
+
+
+async def list_products(**params):
+    """Call get_products with the endpoint's defaults, returning (body, response)"""
+    import server
+
+    params = {"request": make_request("/api/products"), "category": None, "limit": 100,
+              "after": None, "sort": "asc", "fields": None, "lang": None, **params}
+    response = await server.get_products(**params)
+    return json_body(response), response
+
+
+async def list_orders(session_id=None, **params):
+    """Call get_orders (or get_orders_by_session) with defaults, returning (body, response)"""
+    import server
+
+    params = {"limit": 100, "after": None, "sort": "desc", "fields": None, **params}
+    if session_id is None:
+        response = await server.get_orders(**params)
+    else:
+        params.setdefault("lang", None)
+        params.setdefault("request", make_request())
+        response = await server.get_orders_by_session(session_id, **params)
+    return json_body(response), response
@@ -0,0 +1,469 @@
+"""
+In-memory stand-in for the Motor database used by the backend unit tests.
+Every collection operation is recorded so tests can assert on round trips.
+"""
+
+import asyncio
+import copy
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+_MISSING = object()
+
+
+def _get_path(doc, path, default=None):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _matches_condition(value, condition):
+    if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if op == "$in":
+                if isinstance(value, list):
+                    if not any(v in arg for v in value):
+                        return False
+                elif value not in arg:
+                    return False
+            elif op == "$nin":
+                if isinstance(value, list):
+                    if any(v in arg for v in value):
+                        return False
+                elif value in arg:
+                    return False
+            elif op == "$elemMatch":
+                if not isinstance(value, list) or not any(
+                    isinstance(v, dict) and matches(v, arg) for v in value
+                ):
+                    return False
+            elif op == "$not":
+                if _matches_condition(value, arg):
+                    return False
+            elif op == "$ne" and value == arg:
+                return False
+            elif op == "$exists" and (value is not _MISSING) != arg:
+                return False
+            elif op == "$gt" and not (value is not None and value > arg):
+                return False
+            elif op == "$gte" and not (value is not None and value >= arg):
+                return False
+            elif op == "$lt" and not (value is not None and value < arg):
+                return False
+            elif op == "$lte" and not (value is not None and value <= arg):
+                return False
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and "$exists" in condition:
+            if not _matches_condition(_get_path(doc, key, _MISSING), condition):
+                return False
+        elif not _matches_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    elem_matches = {k: v["$elemMatch"] for k, v in projection.items()
+                    if isinstance(v, dict) and "$elemMatch" in v}
+    if elem_matches:
+        result = {"_id": doc["_id"]}
+        for key, condition in elem_matches.items():
+            found = [v for v in doc.get(key, []) if matches(v, condition)][:1]
+            if found:
+                result[key] = copy.deepcopy(found)
+        return result
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {}
+        for key in include:
+            _include_path(result, doc, key.split("."))
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _include_path(result, doc, parts):
+    """Copy one (possibly dotted, array-spanning) projected path into result"""
+    head, rest = parts[0], parts[1:]
+    if head not in doc:
+        return
+    value = doc[head]
+    if not rest:
+        result[head] = copy.deepcopy(value)
+    elif isinstance(value, list):
+        target = result.setdefault(head, [{} for _ in value])
+        for source, item in zip(value, target):
+            if isinstance(source, dict):
+                _include_path(item, source, rest)
+    elif isinstance(value, dict):
+        _include_path(result.setdefault(head, {}), value, rest)
+
+
+def _positional_index(doc, array_field, query):
+    condition = (query or {}).get(array_field)
+    for i, element in enumerate(doc.get(array_field, [])):
+        if isinstance(condition, dict) and "$elemMatch" in condition:
+            if matches(element, condition["$elemMatch"]):
+                return i
+        elif _matches_condition(element, condition):
+            return i
+    raise ValueError(f"positional operator did not match on {array_field}")
+
+
+def _resolve(doc, path, query):
+    """Container and final key for a dotted path, resolving the positional $"""
+    parts = path.split(".")
+    target = doc
+    for i, part in enumerate(parts[:-1]):
+        if part == "$":
+            continue
+        if i + 1 < len(parts) and parts[i + 1] == "$":
+            target = target[part][_positional_index(doc, ".".join(parts[:i + 1]), query)]
+        else:
+            target = target.setdefault(part, {})
+    return target, parts[-1]
+
+
+def _apply_update(doc, update, inserting=False, query=None):
+    for key, value in update.get("$set", {}).items():
+        target, last = _resolve(doc, key, query)
+        target[last] = copy.deepcopy(value)
+    if inserting:
+        for key, value in update.get("$setOnInsert", {}).items():
+            doc[key] = copy.deepcopy(value)
+    for key, value in update.get("$inc", {}).items():
+        target, last = _resolve(doc, key, query)
+        target[last] = target.get(last, 0) + value
+    for key in update.get("$unset", {}):
+        target, last = _resolve(doc, key, query)
+        target.pop(last, None)
+    for key, value in update.get("$push", {}).items():
+        doc.setdefault(key, []).append(copy.deepcopy(value))
+    for key, condition in update.get("$pull", {}).items():
+        doc[key] = [v for v in doc.get(key, []) if not matches(v, condition)]
+
+
+def _expr(doc, expr):
+    """Evaluate a (small subset of) aggregation expressions"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get_path(doc, expr[1:])
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            (op, args), = expr.items()
+            if op == "$dateToString":
+                return _expr(doc, args["date"]).strftime(args["format"])
+            if op == "$cond":
+                condition, then, otherwise = args
+                return _expr(doc, then) if _expr(doc, condition) else _expr(doc, otherwise)
+            if op == "$gt":
+                left, right = (_expr(doc, a) for a in args)
+                return left is not None and left > right
+            if op == "$ifNull":
+                value = _expr(doc, args[0])
+                return _expr(doc, args[1]) if value is None else value
+        return {key: _expr(doc, value) for key, value in expr.items()}
+    return expr
+
+
+def _accumulate(docs, accumulator):
+    (op, expr), = accumulator.items()
+    values = [_expr(doc, expr) for doc in docs]
+    present = [v for v in values if v is not None]
+    if op == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)))
+    if op == "$avg":
+        return sum(present) / len(present) if present else None
+    if op == "$min":
+        return min(present) if present else None
+    if op == "$max":
+        return max(present) if present else None
+    if op == "$push":
+        return values
+    if op == "$addToSet":
+        unique = []
+        for value in values:
+            if value not in unique:
+                unique.append(value)
+        return unique
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    raise NotImplementedError(op)
+
+
+def aggregate(docs, pipeline):
+    docs = [copy.deepcopy(d) for d in docs]
+    for stage in pipeline:
+        (op, spec), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if matches(d, spec)]
+        elif op == "$group":
+            groups = {}
+            for doc in docs:
+                key = _expr(doc, spec["_id"])
+                groups.setdefault(repr(key), (key, []))[1].append(doc)
+            docs = [
+                {"_id": key, **{name: _accumulate(members, acc) for name, acc in spec.items() if name != "_id"}}
+                for key, members in groups.values()
+            ]
+        elif op == "$sort":
+            for field, order in reversed(list(spec.items())):
+                docs.sort(key=lambda d: (_get_path(d, field) is not None, _get_path(d, field)), reverse=order < 0)
+        elif op == "$unwind":
+            field = (spec["path"] if isinstance(spec, dict) else spec)[1:]
+            docs = [{**d, field: v} for d in docs for v in (_get_path(d, field) or [])]
+        elif op == "$project":
+            docs = [
+                {key: (d.get(key) if value in (1, True) else _expr(d, value))
+                 for key, value in spec.items() if value not in (0, False)}
+                for d in docs
+            ]
+        elif op == "$limit":
+            docs = docs[:spec]
+        else:
+            raise NotImplementedError(op)
+    return docs
+
+
+class FakeCursor:
+    def __init__(self, collection, docs):
+        self._collection = collection
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(
+                key=lambda d: (_get_path(d, field) is not None, _get_path(d, field)),
+                reverse=order < 0,
+            )
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def skip(self, count):
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        self._collection.calls.append("to_list")
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        self._collection.calls.append("iterate")
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self.docs = []
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+
+    def _record(self, op):
+        self.calls.append(f"{self.name}.{op}")
+
+    def _find(self, query, projection=None):
+        return [project(d, projection) for d in self.docs if matches(d, query)]
+
+    def find(self, query=None, projection=None):
+        self._record("find")
+        return FakeCursor(self, self._find(query, projection))
+
+    async def find_one(self, query=None, projection=None):
+        self._record("find_one")
+        found = self._find(query, projection)
+        return found[0] if found else None
+
+    def _check_duplicate(self, doc):
+        """Enforce _id and the unique indexes created on this collection"""
+        for name, spec in self.indexes.items():
+            if name != "_id_" and not spec.get("unique"):
+                continue
+            fields = [field for field, _ in spec["key"]]
+            if spec.get("sparse") and any(_get_path(doc, f, _MISSING) is _MISSING for f in fields):
+                continue
+            key = [_get_path(doc, f) for f in fields]
+            if any(d is not doc and [_get_path(d, f) for f in fields] == key for d in self.docs):
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {name} dup key: {key}")
+
+    async def insert_one(self, doc):
+        self._record("insert_one")
+        doc.setdefault("_id", ObjectId())
+        self._check_duplicate(doc)
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self._record("insert_many")
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self._check_duplicate(doc)
+            self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in docs])
+
+    async def update_one(self, query, update, upsert=False):
+        self._record("update_one")
+        for doc in self.docs:
+            if matches(doc, query):
+                _apply_update(doc, update, query=query)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = {k: v for k, v in query.items()
+                   if not k.startswith("$") and not (isinstance(v, dict) and any(op.startswith("$") for op in v))}
+            doc.setdefault("_id", ObjectId())
+            _apply_update(doc, update, inserting=True, query=query)
+            self._check_duplicate(doc)
+            self.docs.append(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query, update, upsert=False):
+        self._record("update_many")
+        matched = [doc for doc in self.docs if matches(doc, query)]
+        for doc in matched:
+            _apply_update(doc, update, query=query)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=None)
+
+    async def delete_one(self, query):
+        self._record("delete_one")
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=False):
+        self._record("find_one_and_update")
+        # yield like a real round trip so concurrent callers interleave
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if matches(doc, query):
+                before = project(doc, projection)
+                _apply_update(doc, update, query=query)
+                return project(doc, projection) if return_document else before
+        if upsert:
+            doc = {k: v for k, v in query.items()
+                   if not k.startswith("$") and not (isinstance(v, dict) and any(op.startswith("$") for op in v))}
+            doc.setdefault("_id", ObjectId())
+            _apply_update(doc, update, inserting=True, query=query)
+            self._check_duplicate(doc)
+            self.docs.append(doc)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def find_one_and_delete(self, query, projection=None):
+        self._record("find_one_and_delete")
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                return project(doc, projection)
+        return None
+
+    async def count_documents(self, query):
+        self._record("count_documents")
+        return len(self._find(query))
+
+    async def index_information(self):
+        self._record("index_information")
+        return copy.deepcopy(self.indexes)
+
+    async def create_indexes(self, models):
+        self._record("create_indexes")
+        names = []
+        for model in models:
+            spec = dict(model.document)
+            name = spec.pop("name")
+            spec["key"] = list(spec["key"].items())
+            self.indexes[name] = spec
+            names.append(name)
+        return names
+
+    async def create_index(self, keys, **options):
+        from pymongo import IndexModel
+
+        return (await self.create_indexes([IndexModel(keys, **options)]))[0]
+
+    def aggregate(self, pipeline, **kwargs):
+        self._record("aggregate")
+        return FakeCursor(self, aggregate(self.docs, pipeline))
+
+    async def distinct(self, key, query=None):
+        self._record("distinct")
+        values = []
+        for doc in self._find(query):
+            value = doc.get(key)
+            if value not in values:
+                values.append(value)
+        return values
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.calls = []
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.calls)
+        return self._collections[name]
+
+    def with_options(self, **options):
+        # One in-memory node: every read preference reads the same data
+        return self
+
+    async def command(self, name, **kwargs):
+        self.calls.append(f"command.{name}")
+        return {"ok": 1.0}
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def round_trips(self, collection=None):
+        """Number of recorded operations that reach the server"""
+        ops = [c for c in self.calls if c != "to_list" and c != "iterate"]
+        if collection:
+            ops = [c for c in ops if c.startswith(f"{collection}.")]
+        return len(ops)
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+import server
+from tests.conftest import make_request, read_body
+
+
+def _import(run, body, content_type="application/x-ndjson", format=None):
+    request = make_request("/api/products/bulk", {"Content-Type": content_type}, method="POST", body=body)
+    return run(server.bulk_import_products(request, format))
+
+
+def _ndjson(*records):
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records).encode()
+
+
+PRODUCT = {"name": "Tee", "description": "Cotton tee", "price": 25, "category": "T-Shirts"}
+
+
+def test_ndjson_import_reports_row_errors_and_inserts_in_chunks(fake_db, run, monkeypatch):
+    monkeypatch.setattr(server, "BULK_CHUNK_SIZE", 2)
+    body = _ndjson(
+        PRODUCT,
+        {**PRODUCT, "name": "Hoodie", "price": 80, "translations": {"cs": {"name": "Mikina", "description": "d"}}},
+        "{not json",
+        {**PRODUCT, "price": "free"},
+        "",
+        {**PRODUCT, "name": "Pants"},
+    )
+
+    result = _import(run, body)
+
+    assert result["inserted"] == 3
+    assert result["failed"] == 2
+    assert [e["line"] for e in result["errors"]] == [3, 4]
+    assert "price" in result["errors"][1]["error"]
+    assert [p["name"] for p in fake_db.products.docs] == ["Tee", "Hoodie", "Pants"]
+    assert fake_db.calls.count("products.insert_many") == 2
+
+
+def test_csv_import_with_lists_translations_and_multiline_fields(fake_db, run):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "description", "price", "category", "sizes", "colors", "translations"])
+    writer.writerow(["Hoodie", "Warm,\nsoft", "80", "Hoodies", "S|M", "Black", '{"de": {"name": "Kapuzenpulli", "description": "d"}}'])
+    writer.writerow(["Broken", "x", "1", "Hoodies", "S", "Black", "{oops"])
+
+    result = _import(run, buffer.getvalue().encode(), content_type="text/csv")
+
+    assert result["inserted"] == 1
+    assert result["errors"] == [{"line": 4, "error": result["errors"][0]["error"]}]
+    (doc,) = fake_db.products.docs
+    assert doc["description"] == "Warm,\nsoft"
+    assert doc["sizes"] == ["S", "M"]
+    assert doc["translations"]["de"]["name"] == "Kapuzenpulli"
+
+
+def test_export_round_trips_through_import(fake_db, run):
+    _import(run, _ndjson(PRODUCT, {**PRODUCT, "name": "Hoodie", "sizes": ["L"]}))
+
+    ndjson = run(read_body(run(server.export_products("ndjson"))))
+    exported_csv = run(read_body(run(server.export_products("csv"))))
+
+    lines = [json.loads(line) for line in ndjson.splitlines()]
+    assert [p["name"] for p in lines] == ["Tee", "Hoodie"]
+    assert exported_csv.splitlines()[0] == b"id,name,description,price,category,image,sizes,colors,translations"
+
+    fake_db.products.docs.clear()
+    result = _import(run, exported_csv, content_type="text/csv")
+    assert result == {"inserted": 2, "failed": 0, "errors": []}
+    assert fake_db.products.docs[1]["sizes"] == ["L"]
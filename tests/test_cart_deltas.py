@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+import server
+from server import CartItem
+from tests.conftest import call_json
+
+
+def _products(fake_db, *prices):
+    ids = []
+    for price in prices:
+        oid = ObjectId()
+        fake_db.products.docs.append({"_id": oid, "name": "P", "price": price, "category": "Hoodies"})
+        ids.append(str(oid))
+    return ids
+
+
+def _add(run, product_id, quantity=1, size="M", color="Black"):
+    return run(call_json(server.add_cart_item, "s1", CartItem(
+        product_id=product_id, quantity=quantity, size=size, color=color
+    )))
+
+
+def test_add_pushes_new_lines_and_increments_existing(fake_db, run):
+    a, b = _products(fake_db, 10.0, 2.5)
+
+    _add(run, a)
+    _add(run, b, 2)
+    _add(run, b, 2, color="White")
+    cart = _add(run, a, 3)
+
+    assert [(i["product_id"], i["color"], i["quantity"]) for i in cart["items"]] == [
+        (a, "Black", 4), (b, "Black", 2), (b, "White", 2)
+    ]
+    assert cart["total"] == 50.0
+    assert cart["items"][0]["product"]["price"] == 10.0
+
+
+def test_set_quantity_and_remove_keep_total_in_step(fake_db, run):
+    a, b = _products(fake_db, 19.99, 5.0)
+    _add(run, a, 2)
+    _add(run, b, 1)
+
+    cart = run(call_json(server.set_cart_item_quantity, "s1", CartItem(product_id=a, quantity=5)))
+    assert cart["total"] == round(5 * 19.99 + 5.0, 2)
+
+    cart = run(call_json(server.remove_cart_item, "s1", b, "M", "Black"))
+    assert [i["product_id"] for i in cart["items"]] == [a]
+    assert cart["total"] == round(5 * 19.99, 2)
+
+    cart = run(call_json(server.set_cart_item_quantity, "s1", CartItem(product_id=a, quantity=0)))
+    assert cart["items"] == []
+    assert cart["total"] == 0.0
+
+
+def test_edits_cost_constant_round_trips(fake_db, run):
+    ids = _products(fake_db, *[float(p) for p in range(1, 41)])
+    for pid in ids:
+        _add(run, pid)
+    fake_db.reset_calls()
+
+    _add(run, ids[7], 2)
+    run(server.set_cart_item_quantity("s1", CartItem(product_id=ids[3], quantity=4)))
+    run(server.remove_cart_item("s1", ids[9], "M", "Black"))
+
+    # Each edit: one line update plus the total adjustment at the line's price
+    assert fake_db.round_trips("carts") == 6
+    assert fake_db.round_trips("products") == 4
+
+
+def test_price_change_between_adds_does_not_drift_the_total(fake_db, run):
+    (a,) = _products(fake_db, 10.0)
+    _add(run, a)
+    fake_db.products.docs[0]["price"] = 12.0
+
+    cart = _add(run, a)
+    assert cart["total"] == 20.0
+
+    cart = run(call_json(server.remove_cart_item, "s1", a, "M", "Black"))
+    assert cart["items"] == []
+    assert cart["total"] == 0.0
+
+
+def test_unknown_lines_and_products_are_rejected(fake_db, run):
+    with pytest.raises(HTTPException) as exc:
+        _add(run, str(ObjectId()))
+    assert exc.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc:
+        run(server.remove_cart_item("s1", str(ObjectId()), "M", "Black"))
+    assert exc.value.status_code == 404
+
+
+def test_legacy_lines_without_cached_price_fall_back_to_product(fake_db, run):
+    (a,) = _products(fake_db, 12.0)
+    fake_db.carts.docs.append({
+        "_id": ObjectId(), "session_id": "s1", "total": 24.0,
+        "items": [{"product_id": a, "quantity": 2, "size": "M", "color": "Black"}],
+    })
+
+    cart = run(call_json(server.set_cart_item_quantity, "s1", CartItem(product_id=a, quantity=3)))
+
+    assert cart["total"] == 36.0
+
+
+def test_reading_an_unknown_cart_does_not_write(fake_db, run):
+    cart = run(call_json(server.get_cart, "visitor"))
+
+    assert cart["items"] == [] and cart["total"] == 0.0
+    assert fake_db.carts.docs == []
+    assert [c for c in fake_db.calls if c.startswith("carts.")] == ["carts.find_one"]
+
+
+def test_first_write_creates_the_cart(fake_db, run):
+    (a,) = _products(fake_db, 4.0)
+    _add(run, a)
+
+    (doc,) = fake_db.carts.docs
+    assert doc["session_id"] == "s1" and doc["total"] == 4.0
+    assert "updated_at" in doc and "created_at" in doc
+
+
+def test_concurrent_first_adds_share_one_cart(fake_db, run):
+    (a,) = _products(fake_db, 4.0)
+    run(fake_db.carts.create_index("session_id", unique=True))
+    item = CartItem(product_id=a, quantity=1, size="M", color="Black")
+
+    async def add_twice():
+        return await asyncio.gather(server.add_cart_item("s1", item), server.add_cart_item("s1", item))
+
+    run(add_twice())
+
+    (doc,) = fake_db.carts.docs
+    assert doc["items"][0]["quantity"] == 2
+    assert doc["total"] == 8.0
+
+
+def test_add_gives_up_with_409_when_the_cart_keeps_changing(fake_db, run, monkeypatch):
+    (a,) = _products(fake_db, 4.0)
+
+    async def find_one_and_update(query, update, upsert=False, **kwargs):
+        if upsert:
+            raise DuplicateKeyError("E11000 duplicate key error")
+
+    monkeypatch.setattr(fake_db.carts, "find_one_and_update", find_one_and_update)
+
+    with pytest.raises(HTTPException) as exc:
+        _add(run, a)
+    assert exc.value.status_code == 409
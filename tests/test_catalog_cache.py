@@ -0,0 +1,99 @@
+from bson import ObjectId
+
+import server
+from catalog_cache import CatalogCache
+from server import ProductUpdate
+from tests.conftest import call_json, list_products, make_request
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = CatalogCache(ttl_seconds=10, clock=clock)
+    cache.set("k", [1])
+    clock.now = 9.9
+    assert cache.get("k") == [1]
+    clock.now = 10.0
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CatalogCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def _add_product(fake_db, **fields):
+    oid = ObjectId()
+    fake_db.products.docs.append({"_id": oid, "name": "Tee", "price": 10.0, "category": "T-Shirts", **fields})
+    return str(oid)
+
+
+def test_catalog_reads_are_served_from_cache(fake_db, run):
+    product_id = _add_product(fake_db)
+
+    run(list_products())
+    run(list_products())
+    run(server.get_product(product_id, make_request()))
+    run(server.get_product(product_id, make_request()))
+    run(server.get_categories(make_request()))
+    run(server.get_categories(make_request()))
+
+    assert fake_db.round_trips("products") == 3
+
+
+def test_product_update_invalidates_product_and_listings(fake_db, run):
+    product_id = _add_product(fake_db)
+    run(list_products())
+    run(list_products(category="T-Shirts"))
+    run(server.get_product(product_id, make_request()))
+
+    run(server.update_product(product_id, ProductUpdate(name="New Tee")))
+
+    assert run(call_json(server.get_product, product_id, make_request()))["name"] == "New Tee"
+    assert run(list_products())[0][0]["name"] == "New Tee"
+    assert run(list_products(category="T-Shirts"))[0][0]["name"] == "New Tee"
+
+
+def test_create_and_delete_invalidate_listings(fake_db, run):
+    product_id = _add_product(fake_db)
+    assert len(run(list_products())[0]) == 1
+
+    run(server.create_product(server.ProductCreate(name="Hoodie", description="d", price=50, category="Hoodies")))
+    assert len(run(list_products())[0]) == 2
+    categories = run(call_json(server.get_categories, make_request()))
+    assert [c["name"] for c in categories] == ["Hoodies", "T-Shirts"]
+
+    run(server.delete_product(product_id))
+    assert len(run(list_products())[0]) == 1
+
+
+def test_categories_summarize_counts_prices_sizes_and_colors(fake_db, run):
+    _add_product(fake_db, price=20.0, sizes=["S", "M"], colors=["Black"])
+    _add_product(fake_db, price=35.0, sizes=["M", "L"], colors=["White", "Black"])
+    _add_product(fake_db, category="Hoodies", price=80.0, sizes=["L"], colors=["Gray"])
+
+    categories = run(call_json(server.get_categories, make_request()))
+
+    assert categories == [
+        {"name": "Hoodies", "product_count": 1, "min_price": 80.0, "max_price": 80.0,
+         "sizes": ["L"], "colors": ["Gray"]},
+        {"name": "T-Shirts", "product_count": 2, "min_price": 20.0, "max_price": 35.0,
+         "sizes": ["S", "M", "L"], "colors": ["Black", "White"]},
+    ]
+    assert fake_db.round_trips("products") == 1
@@ -0,0 +1,89 @@
+import pytest
+from bson import ObjectId
+
+import server
+from server import CheckoutRequest, ShippingInfo
+from tests.conftest import make_request
+
+SHIPPING = ShippingInfo(
+    full_name="Jane Doe", email="jane@example.com", address="1 Main St",
+    city="Prague", postal_code="11000", country="CZ",
+)
+
+
+def _cart_with_products(fake_db, session_id="s1"):
+    ids = []
+    for price in (20.0, 30.0):
+        oid = ObjectId()
+        fake_db.products.docs.append({"_id": oid, "name": "P", "price": price, "category": "Hoodies"})
+        ids.append(str(oid))
+    fake_db.carts.docs.append({
+        "_id": ObjectId(),
+        "session_id": session_id,
+        "items": [{"product_id": pid, "quantity": 2, "size": "M", "color": "Black"} for pid in ids],
+        "total": 100.0,
+    })
+
+
+def _checkout(run, session_id="s1", **fields):
+    checkout = CheckoutRequest(
+        session_id=session_id, shipping_info=SHIPPING, origin_url="https://shop.example/", **fields
+    )
+    return run(server.create_checkout_session(make_request(), checkout))
+
+
+def test_checkout_flow_runs_against_fake_gateway(fake_db, gateway, run):
+    _cart_with_products(fake_db)
+
+    result = _checkout(run, discount_code="welcome10")
+
+    assert result["url"] == f"https://shop.example/checkout-success?session_id={result['session_id']}"
+    session = gateway.sessions[result["session_id"]]
+    # (2*20 + 2*30) * 0.9 + 10 standard shipping
+    assert session["amount_total"] == 10000
+    assert session["metadata"]["cart_session_id"] == "s1"
+    assert fake_db.orders.docs[0]["order_number"] == result["order_number"]
+
+    status = run(server.get_checkout_status(result["session_id"], make_request()))
+
+    assert status["payment_status"] == "paid"
+    assert fake_db.orders.docs[0]["status"] == "paid"
+    assert fake_db.carts.docs[0]["items"] == []
+
+
+def test_gateway_is_reused_across_requests(fake_db, gateway, run):
+    _cart_with_products(fake_db)
+    _checkout(run)
+    _checkout(run)
+
+    assert gateway.calls == ["create_checkout_session", "create_checkout_session"]
+
+
+def test_order_snapshots_line_item_prices(fake_db, gateway, run):
+    _cart_with_products(fake_db)
+    fake_db.carts.docs[0]["items"].append({"product_id": "missing", "quantity": 1})
+    fake_db.reset_calls()
+
+    _checkout(run)
+
+    order = fake_db.orders.docs[0]
+    assert [(i["unit_price"], i["quantity"], i["line_total"]) for i in order["items"]] == [(20.0, 2, 40.0), (30.0, 2, 60.0)]
+    assert order["subtotal"] == 100.0
+    transaction = fake_db.payment_transactions.docs[0]
+    assert transaction["order_id"] == order["_id"]
+    assert "shipping_info" not in transaction
+    assert fake_db.round_trips("products") == 1
+
+
+def test_failed_order_write_leaves_no_partial_records(fake_db, gateway, run, monkeypatch):
+    _cart_with_products(fake_db)
+
+    async def broken_insert(doc):
+        raise RuntimeError("write conflict")
+
+    monkeypatch.setattr(fake_db.payment_transactions, "insert_one", broken_insert)
+
+    with pytest.raises(RuntimeError):
+        _checkout(run)
+
+    assert fake_db.orders.docs == []
@@ -0,0 +1,81 @@
+import asyncio
+
+from bson import ObjectId
+
+import server
+from tests.conftest import make_request
+
+
+def _transaction(fake_db, session_id, status="open", payment_status="unpaid"):
+    fake_db.payment_transactions.docs.append({
+        "_id": ObjectId(),
+        "stripe_session_id": session_id,
+        "cart_session_id": "cart-1",
+        "total": 99.5,
+        "currency": "usd",
+        "status": status,
+        "payment_status": payment_status,
+    })
+
+
+def _pending_session(gateway, session_id):
+    gateway.auto_pay_after = 0
+    gateway.sessions[session_id] = {
+        "amount_total": 9950, "currency": "usd", "metadata": {},
+        "payment_status": "unpaid", "checks": 0,
+    }
+
+
+def test_terminal_status_is_answered_without_provider_call(fake_db, gateway, run):
+    _transaction(fake_db, "cs_1", status="complete", payment_status="paid")
+
+    result = run(server.get_checkout_status("cs_1", make_request()))
+
+    assert result == {"status": "complete", "payment_status": "paid", "amount_total": 9950, "currency": "usd"}
+    assert gateway.calls == []
+
+
+def test_pending_status_is_cached_and_not_rewritten(fake_db, gateway, run):
+    _transaction(fake_db, "cs_1")
+    _pending_session(gateway, "cs_1")
+
+    for _ in range(5):
+        result = run(server.get_checkout_status("cs_1", make_request()))
+
+    assert result["payment_status"] == "unpaid"
+    assert gateway.calls == ["get_checkout_status"]
+    assert fake_db.round_trips("payment_transactions") == 1
+
+
+def test_concurrent_polls_share_one_provider_call(fake_db, gateway, run):
+    _transaction(fake_db, "cs_1")
+    _pending_session(gateway, "cs_1")
+    gateway.latency = 0.01
+
+    async def poll_many():
+        return await asyncio.gather(*[
+            server.get_checkout_status("cs_1", make_request()) for _ in range(20)
+        ])
+
+    results = run(poll_many())
+
+    assert len({r["payment_status"] for r in results}) == 1
+    assert gateway.calls == ["get_checkout_status"]
+
+
+def test_paid_status_updates_records_once(fake_db, gateway, run):
+    _transaction(fake_db, "cs_1")
+    _pending_session(gateway, "cs_1")
+    fake_db.orders.docs.append({"_id": ObjectId(), "stripe_session_id": "cs_1", "status": "pending"})
+    fake_db.carts.docs.append({"_id": ObjectId(), "session_id": "cart-1", "items": [{"product_id": "x"}]})
+    gateway.mark_paid("cs_1")
+
+    run(server.get_checkout_status("cs_1", make_request()))
+    server.checkout_status_cache.invalidate()
+    result = run(server.get_checkout_status("cs_1", make_request()))
+
+    assert result["payment_status"] == "paid"
+    assert result["amount_total"] == 9950
+    assert gateway.calls == ["get_checkout_status"]
+    assert fake_db.orders.docs[0]["status"] == "paid"
+    assert fake_db.carts.docs[0]["items"] == []
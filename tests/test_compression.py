@@ -0,0 +1,84 @@
+import asyncio
+import gzip
+
+from compression import CompressionMiddleware, CompressionSettings, negotiate
+from serialization import MongoJSONResponse, make_etag
+
+
+def _settings(**overrides):
+    return CompressionSettings(**{"encodings": ["gzip"], "min_size": 100, **overrides})
+
+
+def _call(app, accept_encoding="gzip, deflate, br"):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, *bodies = messages
+    return dict(start["headers"]), b"".join(m.get("body", b"") for m in bodies)
+
+
+def _json_app(content, etag=False):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(1)
+        body = MongoJSONResponse(content).body
+        headers = {"ETag": make_etag(body)} if etag else None
+        await MongoJSONResponse(body, headers=headers)(scope, receive, send)
+
+    return app, calls
+
+
+CATALOG = [{"name": f"Urban Black Hoodie {i}", "price": 89.99} for i in range(50)]
+
+
+def test_large_json_is_gzipped_with_weak_etag():
+    app, _ = _json_app(CATALOG, etag=True)
+    headers, body = _call(CompressionMiddleware(app, _settings()))
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert headers[b"etag"].startswith(b'W/"')
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == MongoJSONResponse(CATALOG).body
+
+
+def test_small_bodies_and_identity_clients_are_left_alone():
+    app, _ = _json_app({"ok": True})
+    headers, body = _call(CompressionMiddleware(app, _settings()))
+    assert b"content-encoding" not in headers and body == b'{"ok":true}'
+
+    app, _ = _json_app(CATALOG)
+    headers, _ = _call(CompressionMiddleware(app, _settings()), accept_encoding="identity")
+    assert b"content-encoding" not in headers
+
+
+def test_compressed_variants_of_etagged_bodies_are_reused(monkeypatch):
+    import compression
+
+    compressed = []
+    real = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda *a: compressed.append(1) or real(*a))
+    app, _ = _json_app(CATALOG, etag=True)
+    middleware = CompressionMiddleware(app, _settings())
+
+    first = _call(middleware)[1]
+    second = _call(middleware)[1]
+
+    assert first == second
+    assert len(compressed) == 1
+    assert middleware.variants.stats()["hits"] == 1
+
+
+def test_negotiation_respects_q_values_and_preference():
+    assert negotiate("gzip;q=0.5, br", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1, br;q=0.1", ["br", "gzip"]) == "gzip"
+    assert negotiate("br;q=0, *", ["br", "gzip"]) == "gzip"
+    assert negotiate("", ["gzip"]) is None
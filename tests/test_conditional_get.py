@@ -0,0 +1,64 @@
+from bson import ObjectId
+
+import server
+from serialization import etag_matches
+from server import ProductUpdate
+from tests.conftest import list_products, make_request
+
+
+def _product(fake_db):
+    oid = ObjectId()
+    fake_db.products.docs.append({"_id": oid, "name": "Tee", "price": 10.0, "category": "T-Shirts"})
+    return str(oid)
+
+
+def _if_none_match(etag):
+    return make_request(headers={"If-None-Match": etag})
+
+
+def test_matching_etag_gets_empty_304(fake_db, run):
+    product_id = _product(fake_db)
+    first = run(server.get_product(product_id, make_request()))
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == server.CATALOG_CACHE_CONTROL
+
+    again = run(server.get_product(product_id, _if_none_match(etag)))
+
+    assert again.status_code == 304
+    assert again.body == b""
+    assert again.headers["etag"] == etag
+    assert fake_db.round_trips("products") == 1
+
+
+def test_listing_etag_changes_with_catalog_and_keeps_cursor(fake_db, run):
+    product_id = _product(fake_db)
+    _product(fake_db)
+    _, first = run(list_products(limit=1))
+    etag = first.headers["etag"]
+
+    _, unchanged = run(list_products(limit=1, request=_if_none_match(etag)))
+    assert unchanged.status_code == 304
+    assert unchanged.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+
+    run(server.update_product(product_id, ProductUpdate(price=12.0)))
+    _, changed = run(list_products(limit=1, request=_if_none_match(etag)))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_categories_and_shipping_methods_revalidate(fake_db, run):
+    _product(fake_db)
+    categories = run(server.get_categories(make_request()))
+    shipping = run(server.get_shipping_methods(make_request()))
+
+    assert run(server.get_categories(_if_none_match(categories.headers["etag"]))).status_code == 304
+    assert run(server.get_shipping_methods(_if_none_match(shipping.headers["etag"]))).status_code == 304
+    assert run(server.get_shipping_methods(_if_none_match('"stale"'))).status_code == 200
+
+
+def test_if_none_match_parsing():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
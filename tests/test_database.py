@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import server
+from tests.conftest import json_body
+from database import MongoSettings, PoolMonitor, warm_pool
+
+ADDRESS = ("db-1", 27017)
+
+
+def test_client_options_only_include_configured_settings(monkeypatch):
+    for name in ("MONGO_MAX_POOL_SIZE", "MONGO_MIN_POOL_SIZE", "MONGO_CONNECT_TIMEOUT_MS", "MONGO_COMPRESSORS"):
+        monkeypatch.delenv(name, raising=False)
+    assert MongoSettings().client_options() == {"maxPoolSize": 100, "minPoolSize": 0}
+
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "5")
+    monkeypatch.setenv("MONGO_CONNECT_TIMEOUT_MS", "2000")
+    monkeypatch.setenv("MONGO_READ_PREFERENCE", "primaryPreferred")
+    # Compressors whose packages are missing are dropped
+    monkeypatch.setenv("MONGO_COMPRESSORS", "lz4,zlib")
+    settings = MongoSettings()
+
+    assert settings.warm_connections == 5
+    assert settings.client_options() == {
+        "maxPoolSize": 20, "minPoolSize": 5, "connectTimeoutMS": 2000,
+        "readPreference": "primaryPreferred", "compressors": "zlib",
+    }
+
+
+def test_warm_pool_pings_concurrently():
+    in_flight = []
+    peak = []
+
+    async def command(name):
+        in_flight.append(name)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+
+    client = SimpleNamespace(admin=SimpleNamespace(command=command))
+    asyncio.run(warm_pool(client, 4))
+
+    # One ping to discover the topology, then three needing their own connections
+    assert len(peak) == 4
+    assert max(peak) == 3
+
+
+def test_pool_monitor_tracks_connection_usage():
+    monitor = PoolMonitor()
+    event = SimpleNamespace(address=ADDRESS)
+    monitor.pool_created(event)
+    for _ in range(3):
+        monitor.connection_created(event)
+    for _ in range(2):
+        monitor.connection_check_out_started(event)
+        monitor.connection_checked_out(event)
+    monitor.connection_check_out_started(event)
+    monitor.connection_checked_in(event)
+    monitor.connection_closed(event)
+
+    assert monitor.stats() == {"db-1:27017": {
+        "open": 2, "checked_out": 1, "waiting": 1,
+        "created_total": 3, "closed_total": 1, "checkout_failures_total": 0,
+    }}
+
+
+def test_health_reports_ping_and_pool(fake_db, monkeypatch):
+    monitor = PoolMonitor()
+    monitor.connection_created(SimpleNamespace(address=ADDRESS))
+    monkeypatch.setattr(server, "pool_monitor", monitor)
+
+    body = asyncio.run(server.health())
+
+    assert body["status"] == "ok"
+    assert body["pool"]["servers"]["db-1:27017"]["open"] == 1
+    assert "command.ping" in fake_db.calls
+
+
+def test_health_is_503_when_mongo_is_unreachable(fake_db, monkeypatch):
+    async def command(name):
+        raise ConnectionError("No servers available")
+
+    monkeypatch.setattr(fake_db, "command", command)
+    response = asyncio.run(server.health())
+
+    assert response.status_code == 503
+    assert json_body(response)["error"] == "No servers available"
+
+
+def test_lifespan_connects_before_serving(fake_db, monkeypatch, tmp_path):
+    events = []
+
+    async def connect_database():
+        events.append("connect")
+        server.use_database(fake_db)
+
+    async def provision_indexes():
+        events.append("indexes")
+
+    monkeypatch.setattr(server, "connect_database", connect_database)
+    monkeypatch.setattr(server, "provision_indexes", provision_indexes)
+    monkeypatch.setenv("PAYMENT_GATEWAY", "fake")
+    monkeypatch.setenv("IMAGE_STORE", "local")
+    monkeypatch.setenv("IMAGE_STORE_PATH", str(tmp_path))
+
+    async def serve():
+        async with server.lifespan(server.app):
+            events.append("serving")
+            assert server.order_numbers is not None
+            assert server.app.state.webhook_queue is not None
+
+    asyncio.run(serve())
+    assert events == ["connect", "indexes", "serving"]
@@ -0,0 +1,47 @@
+from indexes import REQUIRED_INDEXES, IndexSpec, ensure_indexes, plan_indexes
+
+
+def test_missing_indexes_are_created(fake_db, run):
+    report = run(ensure_indexes(fake_db))
+
+    assert len(report["created"]) == len(REQUIRED_INDEXES)
+    assert fake_db.carts.indexes["session_id_1"]["unique"] is True
+    assert fake_db.orders.indexes["order_number_1"]["unique"] is True
+    assert "cart_session_id_1_created_at_-1__id_-1" in fake_db.orders.indexes
+
+    again = run(plan_indexes(fake_db))
+    assert again["missing"] == []
+    assert len(again["present"]) == len(REQUIRED_INDEXES)
+
+
+def test_dry_run_only_reports(fake_db, run):
+    report = run(ensure_indexes(fake_db, dry_run=True))
+
+    assert report["created"] == []
+    assert len(report["missing"]) == len(REQUIRED_INDEXES)
+    assert list(fake_db.carts.indexes) == ["_id_"]
+
+
+def test_extra_and_conflicting_indexes_are_reported(fake_db, run):
+    fake_db.carts.indexes["legacy_1"] = {"key": [("legacy", 1)]}
+    fake_db.carts.indexes["session_id_1"] = {"key": [("session_id", 1)]}
+    specs = [IndexSpec("carts", [("session_id", 1)], unique=True)]
+
+    report = run(plan_indexes(fake_db, specs))
+
+    assert report["extra"] == ["carts.legacy_1"]
+    assert [s.describe() for s in report["conflicting"]] == ["carts.session_id_1 unique"]
+
+
+def test_abandoned_carts_expire_via_ttl_index(fake_db, run):
+    import indexes
+
+    run(ensure_indexes(fake_db))
+    assert fake_db.carts.indexes["updated_at_1"]["expireAfterSeconds"] == indexes.CART_TTL_SECONDS
+    assert fake_db.webhook_events.indexes["processed_at_1"]["expireAfterSeconds"] == indexes.WEBHOOK_EVENT_TTL_SECONDS
+
+    fake_db.carts.indexes["updated_at_1"]["expireAfterSeconds"] = 60
+    report = run(plan_indexes(fake_db))
+    assert [s.describe() for s in report["conflicting"]] == [
+        f"carts.updated_at_1 ttl={indexes.CART_TTL_SECONDS}s"
+    ]
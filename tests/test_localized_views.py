@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+import server
+from pagination import resolve_lang
+from server import ProductUpdate
+from tests.conftest import call_json, list_orders, list_products, make_request
+
+TRANSLATIONS = {
+    "cs": {"name": "Černá mikina", "description": "Mikina"},
+    "de": {"name": "Schwarzer Hoodie", "description": "Hoodie"},
+}
+
+
+def _product(fake_db):
+    oid = ObjectId()
+    fake_db.products.docs.append({
+        "_id": oid, "name": "Black Hoodie", "description": "Hoodie", "price": 80.0,
+        "category": "Hoodies", "translations": TRANSLATIONS,
+    })
+    return str(oid)
+
+
+def test_listing_is_flattened_to_the_requested_language(fake_db, run):
+    _product(fake_db)
+
+    (cs,), _ = run(list_products(lang="cs"))
+    (en,), _ = run(list_products(lang="en"))
+    (full,), _ = run(list_products())
+
+    assert cs["name"] == "Černá mikina" and "translations" not in cs
+    assert en["name"] == "Black Hoodie" and "translations" not in en
+    assert full["translations"] == TRANSLATIONS
+
+
+def test_accept_language_is_used_only_for_lang_auto(fake_db, run):
+    product_id = _product(fake_db)
+    request = make_request(headers={"Accept-Language": "de-AT,de;q=0.9,en;q=0.5"})
+
+    response = run(server.get_product(product_id, request, "auto"))
+
+    assert response.headers["vary"] == "Accept-Language"
+    assert run(call_json(server.get_product, product_id, request, "auto"))["name"] == "Schwarzer Hoodie"
+    assert run(call_json(server.get_product, product_id, request, "cs"))["name"] == "Černá mikina"
+
+
+def test_no_lang_returns_full_documents_whatever_the_browser_sends(fake_db, run):
+    product_id = _product(fake_db)
+    request = make_request(headers={"Accept-Language": "cs-CZ,cs;q=0.9"})
+
+    product = run(call_json(server.get_product, product_id, request))
+    (listed,), _ = run(list_products(request=request))
+
+    for doc in (product, listed):
+        assert doc["name"] == "Black Hoodie"
+        assert doc["translations"] == TRANSLATIONS
+
+
+def test_order_history_honours_accept_language_for_lang_auto(fake_db, run):
+    product_id = _product(fake_db)
+    fake_db.orders.docs.append({
+        "_id": ObjectId(), "cart_session_id": "s1", "created_at": datetime(2024, 3, 1),
+        "items": [{"product_id": product_id, "quantity": 1}],
+    })
+    request = make_request(headers={"Accept-Language": "cs-CZ,cs;q=0.9"})
+
+    (auto,), response = run(list_orders("s1", request=request, lang="auto"))
+    (full,), _ = run(list_orders("s1", request=request))
+
+    assert auto["items"][0]["product"]["name"] == "Černá mikina"
+    assert full["items"][0]["product"]["translations"] == TRANSLATIONS
+    assert response.headers["vary"] == "Accept-Language"
+
+
+def test_every_language_view_comes_from_one_query_and_is_invalidated(fake_db, run):
+    product_id = _product(fake_db)
+    for lang in server.LANGUAGES:
+        run(list_products(lang=lang))
+        run(server.get_product(product_id, make_request(), lang))
+    assert fake_db.round_trips("products") == 2
+
+    run(server.update_product(product_id, ProductUpdate(translations={"cs": {"name": "Nová", "description": "d"}})))
+
+    assert run(call_json(server.get_product, product_id, make_request(), "cs"))["name"] == "Nová"
+    assert run(list_products(lang="cs"))[0][0]["name"] == "Nová"
+
+
+def test_resolve_lang():
+    assert resolve_lang("CS") == "cs"
+    assert resolve_lang("fr") is None
+    assert resolve_lang("auto", "fr-FR, es;q=0.8, de;q=0.9") == "de"
+    assert resolve_lang("auto", None) is None
+    assert resolve_lang(None, "de") is None
@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+import functools
+from types import SimpleNamespace
+
+import server
+from metrics import MetricsMiddleware, MongoCommandListener, Registry, registry as default_registry
+
+
+def _get(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": [], "scheme": "http", "server": ("testserver", 80), "root_path": ""}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"]
+
+
+def _fresh_registry():
+    fresh = Registry()
+    for name in default_registry._types:
+        fresh.describe(name, default_registry._types[name], default_registry._help[name],
+                       default_registry._buckets.get(name))
+    return fresh
+
+
+def test_requests_are_counted_per_route_template(fake_db):
+    registry = _fresh_registry()
+    app = MetricsMiddleware(server.app.router, registry)
+
+    assert _get(app, "/api/categories") == 200
+    assert _get(app, "/api/nope") == 404
+
+    assert registry.get("http_requests_total", method="GET", route="/api/categories", status=200) == 1
+    assert registry.get("http_requests_total", method="GET", route="<unmatched>", status=404) == 1
+    assert registry.get("http_requests_in_flight") == 0
+    assert registry.histogram("http_request_duration_seconds", method="GET", route="/api/categories")[2] == 1
+
+
+def test_mongo_commands_are_attributed_to_the_issuing_route():
+    registry = _fresh_registry()
+    listener = MongoCommandListener(registry)
+    reply = {"cursor": {"firstBatch": [{}, {}, {}]}}
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/api/orders/session/{session_id}")
+        loop = asyncio.get_running_loop()
+        for _ in range(4):
+            # Motor runs pymongo on a thread with the caller's context copied
+            event = SimpleNamespace(command_name="find", duration_micros=1500, reply=reply)
+            context = contextvars.copy_context()
+            await loop.run_in_executor(None, functools.partial(context.run, listener.succeeded, event))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    _get(MetricsMiddleware(endpoint, registry), "/api/orders/session/s1")
+    listener.succeeded(SimpleNamespace(command_name="update", duration_micros=10, reply={}))
+
+    route = "/api/orders/session/{session_id}"
+    assert registry.get("mongo_commands_total", route=route, command="find") == 4
+    assert registry.get("mongo_documents_returned_total", route=route, command="find") == 12
+    assert registry.get("mongo_commands_total", route="<background>", command="update") == 1
+    counts, total, count = registry.histogram("mongo_round_trips_per_request", route=route)
+    assert (total, count) == (4, 1)
+
+    text = registry.render()
+    assert '# TYPE mongo_round_trips_per_request histogram' in text
+    assert f'mongo_commands_total{{command="find",route="{route}"}} 4' in text
+    assert f'mongo_round_trips_per_request_bucket{{route="{route}",le="5"}} 1' in text
@@ -0,0 +1,62 @@
+import asyncio
+
+import server
+from order_numbers import OrderNumberAllocator
+from tests.test_checkout import SHIPPING, _cart_with_products
+from tests.conftest import make_request
+
+
+def test_numbers_start_above_legacy_range(fake_db, run):
+    allocator = OrderNumberAllocator(fake_db.counters, block_size=10)
+
+    async def allocate_three():
+        return await asyncio.gather(*[allocator.allocate() for _ in range(3)])
+
+    numbers = run(allocate_three())
+
+    assert numbers == ["ORD-1000001", "ORD-1000002", "ORD-1000003"]
+    assert fake_db.counters.docs[0]["value"] == 1000010
+
+
+def test_blocks_cost_one_round_trip_each(fake_db, run):
+    allocator = OrderNumberAllocator(fake_db.counters, block_size=25)
+
+    async def allocate_many():
+        return [await allocator.allocate() for _ in range(100)]
+
+    run(allocate_many())
+
+    assert fake_db.calls.count("counters.find_one_and_update") == 4
+
+
+def test_many_workers_never_collide(fake_db, run):
+    workers = [OrderNumberAllocator(fake_db.counters, block_size=7) for _ in range(8)]
+
+    async def checkout_storm():
+        return await asyncio.gather(*[
+            workers[i % len(workers)].allocate() for i in range(2000)
+        ])
+
+    numbers = run(checkout_storm())
+
+    assert len(set(numbers)) == 2000
+
+
+def test_concurrent_checkouts_get_unique_order_numbers(fake_db, gateway, run):
+    for i in range(50):
+        _cart_with_products(fake_db, session_id=f"s{i}")
+    gateway.latency = 0.001
+
+    async def checkout_all():
+        return await asyncio.gather(*[
+            server.create_checkout_session(make_request(), server.CheckoutRequest(
+                session_id=f"s{i}", shipping_info=SHIPPING, origin_url="https://shop.example",
+            ))
+            for i in range(50)
+        ])
+
+    results = run(checkout_all())
+
+    numbers = {r["order_number"] for r in results}
+    assert len(numbers) == 50
+    assert {o["order_number"] for o in fake_db.orders.docs} == numbers
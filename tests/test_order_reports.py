@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import server
+from tests.conftest import call_json, read_body
+
+DAY = datetime(2024, 3, 1, 9, 0)
+
+
+def _order(fake_db, created_at, total, status="paid", discount=0.0, code=None):
+    fake_db.orders.docs.append({
+        "_id": ObjectId(), "order_number": f"ORD-{len(fake_db.orders.docs)}", "status": status,
+        "created_at": created_at, "total": total, "subtotal": total, "discount_amount": discount,
+        "discount_code": code, "shipping_method": "standard", "shipping_cost": 0.0,
+        "items": [{"product_id": "p", "quantity": 2}, {"product_id": "q", "quantity": 1}],
+        "shipping_info": {"email": "a@example.com", "full_name": "A"},
+        "stripe_session_id": "cs_1", "cart_session_id": "s1",
+    })
+
+
+def _seed(fake_db):
+    _order(fake_db, DAY, 100.0)
+    _order(fake_db, DAY + timedelta(hours=3), 50.0, discount=10.0, code="SAVE10")
+    _order(fake_db, DAY + timedelta(days=1), 30.0)
+    _order(fake_db, DAY + timedelta(days=1), 999.0, status="pending")
+    _order(fake_db, DAY + timedelta(days=5), 70.0)
+
+
+def test_stats_group_paid_orders_per_day(fake_db, run):
+    _seed(fake_db)
+
+    stats = run(call_json(server.get_order_stats, DAY, DAY + timedelta(days=2), "paid", "UTC"))
+
+    assert [d["date"] for d in stats["days"]] == ["2024-03-01", "2024-03-02"]
+    first = stats["days"][0]
+    assert first["orders"] == 2 and first["revenue"] == 150.0
+    assert first["average_order_value"] == 75.0
+    assert first["discounted_orders"] == 1 and first["discount_total"] == 10.0
+    assert first["discount_usage_rate"] == 0.5
+    assert stats["totals"]["orders"] == 3 and stats["totals"]["revenue"] == 180.0
+    assert fake_db.round_trips("orders") == 1
+
+
+def test_export_streams_a_date_range_in_order(fake_db, run):
+    _seed(fake_db)
+    start = datetime(2024, 3, 1, 10, 0, tzinfo=timezone(timedelta(hours=1)))  # 09:00 UTC
+
+    ndjson = run(read_body(run(server.export_orders("ndjson", start, DAY + timedelta(days=2), "all"))))
+    orders = [json.loads(line) for line in ndjson.splitlines()]
+    assert [o["total"] for o in orders] == [100.0, 50.0, 30.0, 999.0]
+
+    body = run(read_body(run(server.export_orders("csv", None, None, "paid"))))
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+    assert len(rows) == 4
+    assert rows[1]["discount_code"] == "SAVE10"
+    assert rows[1]["customer_email"] == "a@example.com"
+    assert rows[1]["item_count"] == "3"
+    assert rows[0]["created_at"] == DAY.isoformat()
+
+
+def test_stats_reject_unknown_timezones(fake_db, run):
+    with pytest.raises(HTTPException) as exc:
+        run(server.get_order_stats(DAY, DAY + timedelta(days=1), "paid", "Europe/Prag"))
+    assert exc.value.status_code == 400
+
+    for tz in ("Europe/Prague", "+02:00", "-0530"):
+        run(server.get_order_stats(DAY, DAY + timedelta(days=1), "paid", tz))
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from tests.conftest import list_orders, list_products
+
+
+def _seed_products(fake_db, count, category="Hoodies"):
+    for i in range(count):
+        fake_db.products.docs.append({
+            "_id": ObjectId(),
+            "name": f"P{i}",
+            "description": "d",
+            "price": float(i),
+            "category": category,
+            "image": None,
+            "translations": {"cs": {"name": f"CS{i}", "description": "d"},
+                             "de": {"name": f"DE{i}", "description": "d"}},
+        })
+
+
+def _walk(run, fetch, **params):
+    pages, after = [], None
+    while True:
+        body, response = run(fetch(after=after, **params))
+        pages.append(body)
+        after = response.headers.get("x-next-cursor")
+        if not after:
+            return pages
+
+
+def test_products_are_paged_past_the_old_cap(fake_db, run):
+    _seed_products(fake_db, 250)
+
+    pages = _walk(run, list_products, limit=100)
+
+    assert [len(p) for p in pages] == [100, 100, 50]
+    names = [p["name"] for page in pages for p in page]
+    assert names == [f"P{i}" for i in range(250)]
+
+
+def test_product_pages_respect_category_and_sort(fake_db, run):
+    _seed_products(fake_db, 5, "Hoodies")
+    _seed_products(fake_db, 5, "Pants")
+
+    pages = _walk(run, list_products, category="Pants", limit=2, sort="desc")
+
+    products = [p for page in pages for p in page]
+    assert [p["category"] for p in products] == ["Pants"] * 5
+    assert [p["name"] for p in products] == ["P4", "P3", "P2", "P1", "P0"]
+
+
+def test_fields_and_lang_shape_products(fake_db, run):
+    _seed_products(fake_db, 1)
+
+    body, _ = run(list_products(fields="name", lang="cs"))
+
+    assert body == [{"id": body[0]["id"], "name": "CS0"}]
+
+
+def test_invalid_cursor_is_rejected(fake_db, run):
+    with pytest.raises(HTTPException) as exc:
+        run(list_products(after="garbage"))
+    assert exc.value.status_code == 400
+
+
+def test_orders_paged_newest_first_with_ties(fake_db, run):
+    start = datetime(2024, 1, 1)
+    for i in range(7):
+        fake_db.orders.docs.append({
+            "_id": ObjectId(),
+            "order_number": f"ORD-{i}",
+            "cart_session_id": "s1",
+            "items": [],
+            # pairs of orders share a timestamp
+            "created_at": start + timedelta(minutes=i // 2),
+        })
+
+    pages = _walk(run, list_orders, session_id="s1", limit=3)
+
+    numbers = [o["order_number"] for page in pages for o in page]
+    assert numbers == [f"ORD-{i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_order_fields_projection(fake_db, run):
+    fake_db.orders.docs.append({"_id": ObjectId(), "order_number": "ORD-1", "total": 5.0,
+                                "items": [], "created_at": datetime(2024, 1, 1)})
+
+    body, _ = run(list_orders(fields="order_number"))
+
+    assert set(body[0]) == {"id", "order_number", "created_at"}
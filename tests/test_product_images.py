@@ -0,0 +1,121 @@
+import base64
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import server
+from server import ProductCreate, ProductUpdate
+from tests.conftest import call_json, make_request, read_body
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+def _data_url(data, content_type="image/png"):
+    return f"data:{content_type};base64," + base64.b64encode(data).decode()
+
+
+def _create(run, image):
+    return run(call_json(server.create_product, ProductCreate(
+        name="Tee", description="d", price=10, category="T-Shirts", image=image
+    )))
+
+
+def test_created_product_carries_url_and_hash_only(fake_db, run):
+    product = _create(run, _data_url(PNG))
+
+    assert product["image_url"].startswith(f"/api/products/{product['id']}/image?v=")
+    assert product["image"] == product["image_url"]
+    assert len(product["image_hash"]) == 64
+    stored = fake_db.products.docs[0]
+    assert not stored["image"].startswith("data:")
+
+
+def test_image_endpoint_streams_full_body(fake_db, run):
+    product = _create(run, _data_url(PNG))
+
+    response = run(server.get_product_image(product["id"], make_request()))
+
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(PNG))
+    assert response.headers["content-type"] == "image/png"
+    assert run(read_body(response)) == PNG
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=100-", 100, len(PNG) - 1),
+    ("bytes=-16", len(PNG) - 16, len(PNG) - 1),
+])
+def test_image_endpoint_serves_byte_ranges(fake_db, run, header, start, end):
+    product = _create(run, _data_url(PNG))
+
+    response = run(server.get_product_image(product["id"], make_request(headers={"Range": header})))
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(PNG)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert run(read_body(response)) == PNG[start:end + 1]
+
+
+def test_unsatisfiable_range_is_rejected(fake_db, run):
+    product = _create(run, _data_url(PNG))
+
+    with pytest.raises(HTTPException) as exc:
+        run(server.get_product_image(product["id"], make_request(headers={"Range": f"bytes={len(PNG)}-"})))
+    assert exc.value.status_code == 416
+
+
+def test_replaced_and_deleted_images_are_released(fake_db, run, tmp_path):
+    product = _create(run, _data_url(PNG))
+    old_hash = product["image_hash"]
+
+    updated = run(call_json(server.update_product, product["id"], ProductUpdate(image=_data_url(PNG[::-1]))))
+    assert updated["image_hash"] != old_hash
+    assert run(server.image_store.stat(old_hash)) is None
+
+    run(server.delete_product(product["id"]))
+    assert run(server.image_store.stat(updated["image_hash"])) is None
+
+
+def test_external_image_url_detaches_the_stored_image(fake_db, run):
+    product = _create(run, _data_url(PNG))
+    old_hash = product["image_hash"]
+
+    # Saving the form back unchanged keeps the stored image
+    run(server.update_product(product["id"], ProductUpdate(image=product["image"])))
+    assert fake_db.products.docs[0]["image_hash"] == old_hash
+
+    external = ProductUpdate(image="https://cdn.example.com/tee.png")
+    updated = run(call_json(server.update_product, product["id"], external))
+    assert updated["image"] == "https://cdn.example.com/tee.png"
+    assert "image_hash" not in updated and "image_url" not in updated
+    assert run(server.image_store.stat(old_hash)) is None
+
+
+def test_migration_moves_inline_images(fake_db, run):
+    legacy_id = ObjectId()
+    fake_db.products.docs.append({"_id": legacy_id, "name": "Old", "image": base64.b64encode(PNG).decode()})
+    fake_db.products.docs.append({"_id": ObjectId(), "name": "External", "image": "https://cdn.example/x.png"})
+    fake_db.products.docs.append({"_id": ObjectId(), "name": "None", "image": None})
+
+    result = run(server.migrate_inline_images(batch_size=1))
+
+    assert result == {"migrated": 1, "failed": []}
+    legacy = fake_db.products.docs[0]
+    assert legacy["image_url"].startswith(f"/api/products/{legacy_id}/image")
+    assert fake_db.products.docs[1]["image"] == "https://cdn.example/x.png"
+    response = run(server.get_product_image(str(legacy_id), make_request()))
+    assert run(read_body(response)) == PNG
+
+
+@pytest.mark.parametrize("image", [
+    "not base64!",
+    _data_url(b"<script>alert(1)</script>", "text/html"),
+    base64.b64encode(b"plain text, no image signature").decode(),
+])
+def test_invalid_images_are_rejected(fake_db, run, image):
+    with pytest.raises(HTTPException) as exc:
+        _create(run, image)
+    assert exc.value.status_code == 400
+    assert fake_db.products.docs == []
@@ -0,0 +1,68 @@
+from bson import ObjectId
+
+import server
+from server import CartItem, CartUpdate
+from tests.conftest import call_json, list_orders
+
+
+def _seed_products(fake_db, count):
+    ids = []
+    for i in range(count):
+        oid = ObjectId()
+        fake_db.products.docs.append({
+            "_id": oid,
+            "name": f"Product {i}",
+            "description": "desc",
+            "price": 10.0 + i,
+            "category": "Hoodies",
+        })
+        ids.append(str(oid))
+    return ids
+
+
+def test_get_cart_fetches_products_in_one_query(fake_db, run):
+    ids = _seed_products(fake_db, 10)
+    fake_db.carts.docs.append({
+        "_id": ObjectId(),
+        "session_id": "s1",
+        "items": [{"product_id": pid, "quantity": 1, "size": "M", "color": "Black"} for pid in ids],
+        "total": 0.0,
+    })
+
+    cart = run(call_json(server.get_cart, "s1"))
+
+    assert len(cart["items"]) == 10
+    assert cart["items"][3]["product"]["name"] == "Product 3"
+    assert fake_db.round_trips("products") == 1
+
+
+def test_update_cart_skips_unknown_and_malformed_ids(fake_db, run):
+    ids = _seed_products(fake_db, 3)
+    items = [CartItem(product_id=pid, quantity=2) for pid in ids]
+    items.append(CartItem(product_id="not-an-id"))
+    items.append(CartItem(product_id=str(ObjectId())))
+
+    cart = run(call_json(server.update_cart, "s1", CartUpdate(items=items)))
+
+    assert [item["product_id"] for item in cart["items"]] == ids
+    assert cart["total"] == round(2 * (10.0 + 11.0 + 12.0), 2)
+    # one priced lookup for the update, one for the returned cart
+    assert fake_db.round_trips("products") == 2
+
+
+def test_order_history_fetches_products_once_for_all_orders(fake_db, run):
+    ids = _seed_products(fake_db, 5)
+    for n in range(20):
+        fake_db.orders.docs.append({
+            "_id": ObjectId(),
+            "order_number": f"ORD-{n}",
+            "cart_session_id": "s1",
+            "items": [{"product_id": pid, "quantity": 1} for pid in ids],
+            "created_at": n,
+        })
+
+    orders, _ = run(list_orders("s1"))
+
+    assert len(orders) == 20
+    assert all(len(order["items"]) == 5 for order in orders)
+    assert fake_db.round_trips("products") == 1
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+from profiling import ProfilingMiddleware, ProfilingSettings, list_profiles, load_profile
+
+
+async def busy_then_wait(scope, receive, send):
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    await asyncio.sleep(0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _call(app, headers=None, query_string=b""):
+    scope = {"type": "http", "method": "POST", "path": "/api/checkout/create-session",
+             "query_string": query_string, "headers": [(k.encode(), v.encode()) for k, v in (headers or {}).items()]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return dict(messages[0]["headers"])
+
+
+def _middleware(tmp_path, **settings):
+    return ProfilingMiddleware(busy_then_wait, ProfilingSettings(
+        **{"token": "secret", "sample_rate": 0, "interval_ms": 1, "directory": tmp_path, **settings}
+    ))
+
+
+def test_token_triggers_profile_with_cpu_and_wait_breakdown(tmp_path):
+    headers = _call(_middleware(tmp_path), {"x-profile-token": "secret"})
+
+    profile_id = headers[b"x-profile-id"].decode()
+    assert b"cpu;dur=" in headers[b"server-timing"]
+    document = load_profile(tmp_path, profile_id)
+    summary = document["summary"]
+    assert summary["requested"] is True and summary["samples"] > 0
+    assert 20 <= summary["cpu_ms"] <= summary["wall_ms"]
+    assert summary["other_wait_ms"] >= 30
+    speedscope = document["speedscope"]
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    names = {speedscope["shared"]["frames"][i]["name"] for s in speedscope["profiles"][0]["samples"] for i in s}
+    assert "busy_then_wait" in names
+    json.dumps(speedscope)
+
+
+def test_requests_without_a_valid_token_are_not_profiled(tmp_path):
+    assert b"x-profile-id" not in _call(_middleware(tmp_path), {"x-profile-token": "wrong"})
+    assert b"x-profile-id" not in _call(_middleware(tmp_path))
+    assert list_profiles(tmp_path) == []
+
+    _call(_middleware(tmp_path), query_string=b"profile_token=secret")
+    assert len(list_profiles(tmp_path)) == 1
+
+
+def test_sampled_live_traffic_is_stored_quietly(tmp_path):
+    headers = _call(_middleware(tmp_path, token="", sample_rate=1.0))
+
+    assert b"x-profile-id" not in headers
+    (summary,) = list_profiles(tmp_path)
+    assert summary["requested"] is False
+    assert load_profile(tmp_path, "../etc/passwd") is None
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    app = _middleware(tmp_path, token="", sample_rate=1.0, max_profiles=2)
+    for _ in range(4):
+        _call(app)
+
+    stored = sorted(path.stem for path in tmp_path.glob("*.json"))
+    assert len(stored) == 2
+    assert [summary["id"] for summary in list_profiles(tmp_path)] == stored[::-1]
+    assert [summary["id"] for summary in list_profiles(tmp_path, limit=1)] == stored[-1:]
@@ -0,0 +1,124 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import server
+from read_routing import CATALOG, HISTORY, ReadRouter, ReadRoutingSettings
+from server import ProductUpdate
+from tests.conftest import call_json, list_products, make_request
+from tests.fakes import FakeDatabase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_catalog_and_history_default_to_secondaries_with_bounded_staleness(monkeypatch):
+    for name in ("READ_PREFERENCE_CATALOG", "READ_PREFERENCE_HISTORY", "READ_MAX_STALENESS_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("READ_PREFERENCE_HISTORY", "primary")
+    settings = ReadRoutingSettings()
+
+    assert settings.read_preference(CATALOG).document == {"mode": "secondaryPreferred", "maxStalenessSeconds": 90}
+    assert settings.read_preference(HISTORY).document == {"mode": "primary"}
+    assert settings.pin_after_write == 90
+
+
+def test_invalid_routing_settings_are_rejected():
+    with pytest.raises(ValueError):
+        ReadRoutingSettings(max_staleness=30)
+    with pytest.raises(ValueError):
+        ReadRoutingSettings(modes={CATALOG: "secondaryOnly"})
+
+
+def test_writes_pin_reads_to_the_primary_for_a_while():
+    clock = FakeClock()
+    router = ReadRouter(ReadRoutingSettings(modes={CATALOG: "secondary", HISTORY: "nearest"}, pin_after_write=5),
+                        clock=clock)
+    primary = SimpleNamespace(with_options=lambda read_preference: SimpleNamespace(read_preference=read_preference))
+    router.bind(primary)
+
+    assert router.database(CATALOG).read_preference.mode == 2  # secondary
+    router.wrote(CATALOG)
+    assert router.database(CATALOG) is primary
+    assert router.database(HISTORY) is not primary
+    clock.now = 5.0
+    assert router.database(CATALOG) is not primary
+
+
+@pytest.fixture
+def secondary(fake_db, monkeypatch):
+    """A lagging secondary: catalog and history reads see its data, other paths see the primary's"""
+    replica = FakeDatabase()
+    monkeypatch.setattr(fake_db, "with_options", lambda **options: replica)
+    router = ReadRouter(ReadRoutingSettings(max_staleness=90))
+    router.bind(fake_db)
+    monkeypatch.setattr(server, "read_router", router)
+    return replica
+
+
+def test_catalog_and_history_reads_go_to_the_secondary(fake_db, secondary, run):
+    product = {"_id": ObjectId(), "name": "Tee", "price": 10.0, "category": "T-Shirts"}
+    order = {
+        "_id": ObjectId(), "cart_session_id": "s1", "created_at": datetime(2024, 3, 1),
+        "items": [{"product_id": str(product["_id"]), "quantity": 1}],
+    }
+    for database in (fake_db, secondary):
+        database.products.docs.append(dict(product))
+        database.orders.docs.append(dict(order))
+
+    assert len(run(list_products())[0]) == 1
+    assert [c["name"] for c in run(call_json(server.get_categories, make_request()))] == ["T-Shirts"]
+    assert len(run(call_json(server.get_orders, limit=100, after=None, sort="desc", fields=None))) == 1
+    # Carts price against the primary
+    run(server.add_cart_item("s1", server.CartItem(product_id=str(product["_id"]))))
+
+    assert {"products.find", "products.aggregate", "orders.find"} <= set(secondary.calls)
+    assert not [c for c in fake_db.calls if c.startswith(("orders.", "products.aggregate"))]
+    assert "products.find" in fake_db.calls
+
+
+def test_shoppers_read_their_own_orders_from_the_primary(fake_db, secondary, run):
+    product = {"_id": ObjectId(), "name": "Tee", "price": 10.0, "category": "T-Shirts"}
+    for database in (fake_db, secondary):
+        database.products.docs.append(dict(product))
+    # Just placed: the secondary hasn't replicated the order yet
+    order_id = ObjectId()
+    fake_db.orders.docs.append({
+        "_id": order_id, "cart_session_id": "s1", "created_at": datetime(2024, 3, 1),
+        "items": [{"product_id": str(product["_id"]), "quantity": 1}],
+    })
+
+    orders = run(call_json(server.get_orders_by_session, "s1", make_request(), limit=100, after=None, sort="desc", fields=None))
+    assert orders[0]["items"][0]["product"]["name"] == "Tee"
+    assert run(call_json(server.get_order, str(order_id)))["cart_session_id"] == "s1"
+    assert not [c for c in secondary.calls if c.startswith("orders.")]
+
+
+def test_order_history_is_read_from_the_primary_after_a_payment(fake_db, secondary, run):
+    order = {"_id": ObjectId(), "stripe_session_id": "cs_1", "status": "pending", "created_at": datetime(2024, 3, 1)}
+    fake_db.orders.docs.append(dict(order))
+    secondary.orders.docs.append(dict(order))
+
+    run(server.mark_checkouts_paid(["cs_1"], {"status": "complete"}))
+
+    orders = run(call_json(server.get_orders, limit=100, after=None, sort="desc", fields=None))
+    assert orders[0]["status"] == "paid"
+
+
+def test_catalog_is_read_from_the_primary_after_a_write(fake_db, secondary, run):
+    product_id = ObjectId()
+    fake_db.products.docs.append({"_id": product_id, "name": "Tee", "price": 10.0, "category": "T-Shirts"})
+    secondary.products.docs.append({"_id": product_id, "name": "Tee", "price": 10.0, "category": "T-Shirts"})
+
+    run(server.update_product(str(product_id), ProductUpdate(name="New Tee")))
+
+    # The secondary hasn't replicated the rename yet; the edit must not be cached stale
+    assert run(call_json(server.get_product, str(product_id), make_request()))["name"] == "New Tee"
+    assert run(list_products())[0][0]["name"] == "New Tee"
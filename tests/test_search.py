@@ -0,0 +1,93 @@
+from bson import ObjectId
+
+import server
+from search_index import ProductSearchIndex
+from server import ProductUpdate
+from tests.conftest import call_json, make_request
+
+CATALOG = [
+    ("Urban Black Hoodie", "Hoodies", 89.99, ["S", "M", "L"], ["Black"], {"cs": {"name": "Městská černá mikina", "description": "Mikina"}}),
+    ("Classic White Tee", "T-Shirts", 29.99, ["M", "L"], ["White", "Black"], {"cs": {"name": "Klasické bílé tričko", "description": "Tričko"}}),
+    ("Black Cargo Pants", "Pants", 69.99, ["M"], ["Black", "Gray"], None),
+    ("Gray Zip Hoodie", "Hoodies", 99.99, ["L", "XL"], ["Gray"], None),
+]
+
+
+def _seed(fake_db):
+    ids = []
+    for name, category, price, sizes, colors, translations in CATALOG:
+        oid = ObjectId()
+        fake_db.products.docs.append({
+            "_id": oid, "name": name, "description": f"{name} in premium cotton", "category": category,
+            "price": price, "sizes": sizes, "colors": colors, "translations": translations,
+        })
+        ids.append(str(oid))
+    return ids
+
+
+async def _search(q=None, **params):
+    params = {"request": make_request(), "q": q, "category": None, "size": None, "color": None, "min_price": None, "max_price": None,
+              "limit": 20, "offset": 0, "lang": None, **params}
+    return await call_json(server.search_products, **params)
+
+
+def test_text_search_matches_names_translations_and_prefixes(fake_db, run):
+    _seed(fake_db)
+
+    names = lambda body: [p["name"] for p in body["results"]]  # noqa: E731
+    assert names(run(_search("hoodie"))) == ["Gray Zip Hoodie", "Urban Black Hoodie"]
+    assert names(run(_search("black hood"))) == ["Urban Black Hoodie"]
+    # accent-folded translation match
+    assert names(run(_search("cerna"))) == ["Urban Black Hoodie"]
+    assert run(_search("tricko"))["total"] == 1
+    assert run(_search("nothing-like-this"))["results"] == []
+
+
+def test_facet_filters_and_counts(fake_db, run):
+    _seed(fake_db)
+
+    body = run(_search(color=["Black"], size=["M,L"]))
+
+    assert body["total"] == 3
+    assert body["facets"]["category"] == {"Hoodies": 1, "Pants": 1, "T-Shirts": 1}
+    # color counts ignore the color filter itself
+    assert body["facets"]["color"] == {"Black": 3, "Gray": 2, "White": 1}
+    assert body["facets"]["price"] == {"min": 29.99, "max": 89.99}
+
+    priced = run(_search(category=["Hoodies"], max_price=90))
+    assert [p["name"] for p in priced["results"]] == ["Urban Black Hoodie"]
+
+
+def test_queries_do_not_touch_mongo_once_built(fake_db, run):
+    _seed(fake_db)
+    run(_search("hoodie"))
+    fake_db.reset_calls()
+
+    run(_search("tee"))
+    run(_search(color=["Gray"]))
+
+    assert fake_db.round_trips("products") == 0
+
+
+def test_writes_update_the_index_incrementally(fake_db, run):
+    ids = _seed(fake_db)
+    run(_search("hoodie"))
+
+    run(server.update_product(ids[0], ProductUpdate(name="Urban Black Sweater")))
+    run(server.delete_product(ids[3]))
+    run(server.create_product(server.ProductCreate(name="Oversized Hoodie", description="d", price=79, category="Hoodies")))
+
+    # name matches outrank the old description of the renamed product
+    assert [p["name"] for p in run(_search("hoodie"))["results"]] == ["Oversized Hoodie", "Urban Black Sweater"]
+    assert run(_search("sweater"))["total"] == 1
+    assert server.search_index.stats()["rebuilds"] == 1
+
+
+def test_removing_a_product_drops_its_terms():
+    index = ProductSearchIndex(ttl_seconds=60)
+    index.build([{"_id": ObjectId(), "name": "Tee", "category": "T-Shirts", "price": 1}])
+
+    assert index.search("tee")[1] == 1
+    index.remove(next(iter(index.products)))
+    assert index.search("tee")[1] == 0
+    assert index.stats()["terms"] == 0
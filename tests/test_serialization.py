@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from server import serialize_doc
+from serialization import MongoJSONResponse, encode_json
+
+
+def _reference(doc):
+    """What a handler returning serialize_doc(doc) sends over the wire"""
+    return JSONResponse(jsonable_encoder(serialize_doc(doc))).body
+
+
+PRODUCT = {
+    "_id": ObjectId(),
+    "name": "Městská Černá Mikina",
+    "description": "Quote \" backslash \\ newline \n tab \t emoji 🧥",
+    "price": 89.99,
+    "category": "Hoodies",
+    "sizes": ["S", "M"],
+    "image": None,
+    "featured": True,
+    "translations": {"cs": {"name": "Mikina", "description": "ž"}},
+    "created_at": datetime(2024, 5, 1, 12, 30, 45, 123456),
+    "updated_at": datetime(2024, 5, 1),
+}
+
+ORDER = {
+    "_id": ObjectId(),
+    "order_number": "ORD-1",
+    "items": [
+        {"product_id": "abc", "quantity": 2, "product": PRODUCT},
+        {"product_id": "def", "quantity": 1, "product": {**PRODUCT, "_id": ObjectId()}},
+    ],
+    "owner": ObjectId(),
+    "totals": [1e16, 1e-7, 0.1 + 0.2, -0.0, 10, 2 ** 70],
+    "history": [{"at": datetime(2024, 1, 1), "events": [[{"_id": ObjectId()}]]}],
+    "id": "overridden",
+}
+
+
+@pytest.mark.parametrize("doc", [
+    PRODUCT,
+    ORDER,
+    [PRODUCT, ORDER],
+    [],
+    {},
+    None,
+    {"id": "first", "_id": ObjectId()},
+])
+def test_output_is_byte_identical_to_serialize_doc(doc):
+    assert encode_json(doc) == _reference(doc)
+
+
+def test_response_passes_through_pre_encoded_bytes():
+    body = encode_json([PRODUCT])
+    response = MongoJSONResponse(body)
+    assert response.body is body
+    assert response.headers["content-type"] == "application/json"
+    assert MongoJSONResponse([PRODUCT]).body == body
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import server
+from tests.conftest import make_request
+
+
+def _checkout(fake_db, session_id, cart_session_id):
+    fake_db.payment_transactions.docs.append({
+        "_id": ObjectId(), "stripe_session_id": session_id, "cart_session_id": cart_session_id,
+        "status": "open", "payment_status": "unpaid",
+    })
+    fake_db.orders.docs.append({"_id": ObjectId(), "stripe_session_id": session_id, "status": "pending"})
+    fake_db.carts.docs.append({"_id": ObjectId(), "session_id": cart_session_id, "items": [{"product_id": "x"}]})
+
+
+def _post(run, **payload):
+    body = json.dumps(payload).encode()
+    return run(server.stripe_webhook(make_request(method="POST", body=body)))
+
+
+def test_webhook_is_persisted_and_acknowledged_before_applying(fake_db, gateway, webhook_queue, run):
+    _checkout(fake_db, "cs_1", "cart-1")
+
+    assert _post(run, id="evt_1", session_id="cs_1", payment_status="paid") == {"received": True}
+
+    assert fake_db.webhook_events.docs[0]["status"] == "pending"
+    assert fake_db.orders.docs[0]["status"] == "pending"
+
+    assert run(webhook_queue.drain()) == 1
+    assert fake_db.webhook_events.docs[0]["status"] == "processed"
+    assert fake_db.payment_transactions.docs[0]["payment_status"] == "paid"
+    assert fake_db.orders.docs[0]["status"] == "paid"
+    assert fake_db.carts.docs[0]["items"] == []
+
+
+def test_retried_events_are_deduplicated(fake_db, gateway, webhook_queue, run):
+    _checkout(fake_db, "cs_1", "cart-1")
+
+    for _ in range(3):
+        _post(run, id="evt_1", session_id="cs_1", payment_status="paid")
+
+    assert len(fake_db.webhook_events.docs) == 1
+    assert webhook_queue.duplicates == 2
+
+
+def test_events_are_applied_in_batches(fake_db, gateway, webhook_queue, run):
+    for i in range(25):
+        _checkout(fake_db, f"cs_{i}", f"cart-{i}")
+        _post(run, id=f"evt_{i}", session_id=f"cs_{i}", payment_status="paid")
+    fake_db.reset_calls()
+
+    assert run(webhook_queue.drain()) == 25
+
+    assert webhook_queue.batches == 3
+    assert all(order["status"] == "paid" for order in fake_db.orders.docs)
+    # orders are updated once per batch, not once per event
+    assert fake_db.calls.count("orders.update_many") == 3
+
+
+def test_failed_batch_is_retried(fake_db, gateway, webhook_queue, run):
+    _checkout(fake_db, "cs_1", "cart-1")
+    _post(run, id="evt_1", session_id="cs_1", payment_status="paid")
+    apply = webhook_queue.apply_batch
+    calls = []
+
+    async def flaky(events):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise RuntimeError("mongo is slow")
+        await apply(events)
+
+    webhook_queue.apply_batch = flaky
+    with pytest.raises(RuntimeError):
+        run(webhook_queue.drain())
+    assert fake_db.webhook_events.docs[0]["status"] == "pending"
+
+    run(webhook_queue.drain())
+    assert fake_db.webhook_events.docs[0]["status"] == "processed"
+    assert fake_db.webhook_events.docs[0]["attempts"] == 2
+
+
+def test_expired_claims_are_reclaimed(fake_db, gateway, webhook_queue, run):
+    _checkout(fake_db, "cs_1", "cart-1")
+    _post(run, id="evt_1", session_id="cs_1", payment_status="paid")
+    fake_db.webhook_events.docs[0].update(
+        status="processing", claimed_by="dead-worker",
+        claimed_at=datetime.utcnow() - timedelta(seconds=webhook_queue.lease_seconds + 1),
+    )
+
+    assert run(webhook_queue.drain()) == 1
+    assert fake_db.orders.docs[0]["status"] == "paid"
+
+
+def test_metrics_report_depth_and_lag(fake_db, gateway, webhook_queue, run):
+    _checkout(fake_db, "cs_1", "cart-1")
+    _post(run, id="evt_1", session_id="cs_1", payment_status="paid")
+    _post(run, id="evt_2", session_id="cs_1", payment_status="paid")
+
+    before = run(server.get_webhook_metrics(make_request()))
+    run(webhook_queue.drain())
+    after = run(server.get_webhook_metrics(make_request()))
+
+    assert before["queue_depth"] == 2
+    assert before["oldest_pending_age_seconds"] is not None
+    assert after["queue_depth"] == 0
+    assert after["processed"] == 2
+    assert after["last_lag_seconds"] >= 0
+
+
+def test_event_enqueued_during_a_drain_wakes_the_worker(webhook_queue, run):
+    drains = []
+
+    async def drain():
+        drains.append(len(drains))
+        if len(drains) == 1:
+            # An enqueue landing after the drain's last (empty) claim
+            webhook_queue._wakeup.set()
+        return 0
+
+    webhook_queue.drain = drain
+    webhook_queue.poll_interval = 60
+
+    async def work():
+        webhook_queue.start()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await webhook_queue.stop()
+
+    run(work())
+    assert len(drains) >= 2